@@ -0,0 +1,80 @@
+# artifacts.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+ARTIFACT_ROOT = "artifacts"
+PARTITION_COLS = ["Symbol", "Month"]
+CATEGORICAL_COLUMNS = ["Sentiment", "EventType", "Source"]
+TIMESTAMP_COLUMNS = ["Datetime", "Price Date"]
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+MISSING_TS = np.iinfo("int64").min
+
+
+def artifact_path(name, root=ARTIFACT_ROOT):
+    return os.path.join(root, name)
+
+
+def compact_dtypes(df):
+    """Cast to compact dtypes: categorical labels, int64 epoch-second timestamps, float32 prices"""
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in TIMESTAMP_COLUMNS:
+        if col in df.columns and not pd.api.types.is_integer_dtype(df[col]):
+            values = df[col]
+            if not pd.api.types.is_datetime64_any_dtype(values):
+                values = values.astype(str).str.replace(" UTC", "", regex=False)
+            ts = pd.to_datetime(values, errors="coerce", utc=True)
+            seconds = (ts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+            df[col] = seconds.fillna(MISSING_TS).astype("int64")
+    for col in df.columns:
+        if col in PRICE_COLUMNS or pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    return df
+
+
+def write_artifact(df, name, symbol, month_column="Datetime", root=ARTIFACT_ROOT):
+    """Write df as a Parquet dataset partitioned by Symbol and Month (YYYY-MM of month_column).
+
+    Partitions present in df replace the ones already on disk; other symbols/months are kept.
+    """
+    df = compact_dtypes(df)
+    df["Symbol"] = symbol
+    month_ts = pd.to_datetime(df[month_column].mask(df[month_column] == MISSING_TS), unit="s", utc=True)
+    df["Month"] = month_ts.dt.strftime("%Y-%m").fillna("unknown")
+    df.to_parquet(
+        artifact_path(name, root),
+        engine="pyarrow",
+        partition_cols=PARTITION_COLS,
+        index=False,
+        existing_data_behavior="delete_matching",
+    )
+    return artifact_path(name, root)
+
+
+def read_artifact(name, symbol=None, columns=None, months=None, parse_dates=True, root=ARTIFACT_ROOT):
+    """Read only the requested columns/partitions of an artifact.
+
+    `months` is an iterable of "YYYY-MM" strings. With parse_dates, int64 timestamp
+    columns are returned as UTC datetimes (missing values as NaT).
+    """
+    filters = []
+    if symbol is not None:
+        filters.append(("Symbol", "=", symbol))
+    if months is not None:
+        filters.append(("Month", "in", list(months)))
+    df = pd.read_parquet(
+        artifact_path(name, root),
+        engine="pyarrow",
+        columns=columns,
+        filters=filters or None,
+    )
+    if parse_dates:
+        for col in TIMESTAMP_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col].mask(df[col] == MISSING_TS), unit="s", utc=True)
+    return df
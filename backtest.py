@@ -0,0 +1,146 @@
+# backtest.py
+
+import itertools
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from price_cache import get_daily_bars
+from watchlist import wide_panel
+
+MA_PAIRS = [(fast, slow) for fast, slow in itertools.product([5, 9, 12, 15, 20], [20, 30, 50, 100, 200]) if fast < slow]
+BB_PARAMS = list(itertools.product([10, 20, 30, 50], [1.5, 2.0, 2.5, 3.0]))
+HORIZONS = [1, 5, 20]
+API_KEY = ""
+RESULT_COLUMNS = ["Symbol", "hypothesis", "fast", "slow", "bb_window", "bb_k", "horizon",
+                  "signals", "hit_rate", "mean_fwd_return"]
+
+
+def load_daily_panel(symbols, api_key=""):
+    """Wide (date x symbol) Open/Close frames from the local daily price cache"""
+    return wide_panel({symbol: get_daily_bars(symbol, api_key) for symbol in symbols})
+
+
+def rolling_mean_std(values, window):
+    """Rolling mean and sample std down axis 0 from prefix sums, NaN until `window` valid rows"""
+    mean_out = np.full(values.shape, np.nan)
+    std_out = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return mean_out, std_out
+    valid = ~np.isnan(values)
+    # Centre each column first so the sum-of-squares difference doesn't lose precision
+    with np.errstate(invalid="ignore"):
+        offset = np.nan_to_num(np.nanmean(values, axis=0))
+    filled = np.where(valid, values - offset, 0.0)
+    zeros = np.zeros((1,) + values.shape[1:])
+    s1 = np.concatenate([zeros, filled.cumsum(axis=0)])
+    s2 = np.concatenate([zeros, (filled * filled).cumsum(axis=0)])
+    count = np.concatenate([zeros, valid.cumsum(axis=0)])
+    s1 = s1[window:] - s1[:-window]
+    s2 = s2[window:] - s2[:-window]
+    full = (count[window:] - count[:-window]) == window
+    mean = s1 / window
+    var = np.maximum(s2 - s1 * mean, 0.0) / (window - 1)
+    mean_out[window - 1:] = np.where(full, mean + offset, np.nan)
+    std_out[window - 1:] = np.where(full, np.sqrt(var), np.nan)
+    return mean_out, std_out
+
+
+def forward_returns(close, horizon):
+    """close[t + horizon] / close[t] - 1, NaN past the end of the series"""
+    fwd = np.full_like(close, np.nan)
+    fwd[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    return fwd
+
+
+def _summarize(signal, hit, fwd):
+    """Per-column signal count, hit rate and mean forward return for boolean masks"""
+    signals = signal.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hit_rate = (signal & hit).sum(axis=0) / signals
+        has_fwd = signal & ~np.isnan(fwd)
+        mean_fwd = np.where(has_fwd, fwd, 0.0).sum(axis=0) / has_fwd.sum(axis=0)
+    return signals, hit_rate, mean_fwd
+
+
+def evaluate_shard(symbols, open_, close, ma_pairs, bb_params, horizons):
+    """Evaluate every parameter set on one block of symbols; returns a tidy results DataFrame.
+
+    MA hypothesis: while fast MA > slow MA most non-doji candles are green (hit = green),
+    and while below most are red. Bollinger hypothesis: a close outside the bands keeps
+    moving the same way over the horizon (hit = forward return with the breach's sign).
+    """
+    open_ = np.asarray(open_, dtype="float64")
+    close = np.asarray(close, dtype="float64")
+    green, red = close > open_, close < open_
+    fwds = {h: forward_returns(close, h) for h in horizons}
+    stats = {}
+
+    def window_stats(window):
+        if window not in stats:
+            stats[window] = rolling_mean_std(close, window)
+        return stats[window]
+
+    frames = []
+
+    def add(hypothesis, params, horizon, signal, hit):
+        signals, hit_rate, mean_fwd = _summarize(signal, hit, fwds[horizon])
+        frames.append(pd.DataFrame({
+            "Symbol": symbols, "hypothesis": hypothesis, **params, "horizon": horizon,
+            "signals": signals, "hit_rate": hit_rate, "mean_fwd_return": mean_fwd,
+        }))
+
+    for fast, slow in ma_pairs:
+        ma_fast, ma_slow = window_stats(fast)[0], window_stats(slow)[0]
+        defined = ~np.isnan(ma_fast) & ~np.isnan(ma_slow)
+        above = defined & (ma_fast > ma_slow)
+        below = defined & ~(ma_fast > ma_slow)
+        params = {"fast": fast, "slow": slow, "bb_window": np.nan, "bb_k": np.nan}
+        for h in horizons:
+            add("ma_above", params, h, above & (green | red), green)
+            add("ma_below", params, h, below & (green | red), red)
+
+    for window, k in bb_params:
+        mean, std = window_stats(window)
+        upper_breach = close > mean + k * std
+        lower_breach = close < mean - k * std
+        params = {"fast": np.nan, "slow": np.nan, "bb_window": window, "bb_k": k}
+        for h in horizons:
+            add("bb_above", params, h, upper_breach, fwds[h] > 0)
+            add("bb_below", params, h, lower_breach, fwds[h] < 0)
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+
+
+def run_sweep(panel, ma_pairs=MA_PAIRS, bb_params=BB_PARAMS, horizons=HORIZONS, shard_size=50, max_workers=None):
+    """Sweep all parameter sets over every symbol in a wide Open/Close panel.
+
+    Symbols are split into shards of `shard_size` columns that run in a process pool; each
+    shard computes every rolling window once and reuses it across parameter sets.
+    """
+    symbols = list(panel["Close"].columns)
+    open_ = panel["Open"].to_numpy(dtype="float64")
+    close = panel["Close"].to_numpy(dtype="float64")
+    shards = [slice(i, i + shard_size) for i in range(0, len(symbols), shard_size)]
+    if max_workers == 1 or len(shards) == 1:
+        results = [evaluate_shard(symbols[s], open_[:, s], close[:, s], ma_pairs, bb_params, horizons) for s in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(evaluate_shard, symbols[s], open_[:, s], close[:, s], ma_pairs, bb_params, horizons)
+                       for s in shards]
+            results = [f.result() for f in futures]
+    return pd.concat(results, ignore_index=True)[RESULT_COLUMNS]
+
+
+if __name__ == "__main__":
+    symbols = sys.argv[1:] or ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA"]
+    panel = load_daily_panel(symbols, API_KEY)
+    started = time.perf_counter()
+    results = run_sweep(panel)
+    print(f"{len(symbols)} symbols x {len(MA_PAIRS) + len(BB_PARAMS)} parameter sets in {time.perf_counter() - started:.1f}s")
+    results.to_csv("backtest_results.csv", index=False)
+    best = results[results["signals"] >= 30].groupby(["hypothesis", "fast", "slow", "bb_window", "bb_k", "horizon"], dropna=False)
+    print(best[["hit_rate", "mean_fwd_return"]].mean().sort_values("hit_rate", ascending=False).head(20))
@@ -0,0 +1,233 @@
+# bar_buffer.py
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from rate_limit import call_with_retry
+
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+DEFAULT_CAPACITY = 5000
+# Yahoo only serves 1m bars for the last ~7 days; older starts need a full period fetch
+MAX_DELTA_AGE = pd.Timedelta(days=7)
+
+
+def fetch_yfinance_bars(ticker, interval, period=None, start=None):
+    """Intraday OHLCV from Yahoo for a period, or from `start` (inclusive) onwards"""
+    import yfinance as yf
+
+    stock = yf.Ticker(ticker)
+    if start is None:
+        return call_with_retry("yahoo", stock.history, period=period, interval=interval, max_retries=2)
+    return call_with_retry("yahoo", stock.history, start=start, interval=interval, max_retries=2)
+
+
+def fetch_yfinance_panel(tickers, interval, period=None, start=None):
+    """Bars for many tickers in one batched Yahoo download, as {ticker: OHLCV DataFrame}"""
+    import yfinance as yf
+
+    kwargs = {"period": period} if start is None else {"start": start}
+    wide = call_with_retry("yahoo", yf.download, tickers, interval=interval, group_by="ticker", auto_adjust=False,
+                           threads=True, progress=False, max_retries=2, **kwargs)
+    if wide.empty:
+        return {}
+    if not isinstance(wide.columns, pd.MultiIndex):
+        return {tickers[0]: wide}
+    return {t: wide[t].dropna(how="all") for t in tickers if t in wide.columns.get_level_values(0)}
+
+
+class BarBuffer:
+    """Fixed-size ring buffer of OHLCV bars for one (ticker, interval).
+
+    Timestamps are kept as int64 ns (UTC) next to a float64 column block; the oldest bars
+    are overwritten once `capacity` is reached.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype="int64")
+        self.values = np.zeros((capacity, len(OHLCV)), dtype="float64")
+        self.size = 0
+        self.head = 0  # slot the next bar is written to
+        self.tz = None
+
+    @property
+    def last_ts(self):
+        if not self.size:
+            return None
+        return pd.Timestamp(int(self.ts[(self.head - 1) % self.capacity]), tz="UTC")
+
+    def merge(self, bars):
+        """Rewrite the last stored bar if it reappears and append strictly newer bars.
+
+        Returns the number of bars written; re-sent bars with unchanged values don't count.
+        """
+        if bars is None or bars.empty:
+            return 0
+        index = pd.DatetimeIndex(bars.index)
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+        self.tz = self.tz or index.tz
+        ts = index.tz_convert("UTC").as_unit("ns").asi8
+        values = bars[OHLCV].to_numpy(dtype="float64")
+
+        written = 0
+        last = int(self.ts[(self.head - 1) % self.capacity]) if self.size else None
+        for t, row in zip(ts, values):
+            if last is not None and t < last:
+                continue
+            if last is not None and t == last:
+                slot = (self.head - 1) % self.capacity
+                if np.array_equal(self.values[slot], row, equal_nan=True):
+                    continue
+                self.values[slot] = row
+            else:
+                self.ts[self.head] = t
+                self.values[self.head] = row
+                self.head = (self.head + 1) % self.capacity
+                self.size = min(self.size + 1, self.capacity)
+            last = t
+            written += 1
+        return written
+
+    def frame(self, since=None):
+        """Stored bars in time order as a DataFrame, optionally only those at or after `since`"""
+        order = (np.arange(self.size) + self.head - self.size) % self.capacity
+        ts = self.ts[order]
+        if since is not None:
+            keep = ts >= pd.Timestamp(since).tz_convert("UTC").value
+            order, ts = order[keep], ts[keep]
+        index = pd.DatetimeIndex(ts.astype("datetime64[ns]")).tz_localize("UTC")
+        if self.tz is not None:
+            index = index.tz_convert(self.tz)
+        return pd.DataFrame(self.values[order], index=index, columns=OHLCV)
+
+
+class BarStore:
+    """BarBuffers keyed by (ticker, interval) that fetch only bars newer than the last one stored.
+
+    A buffer is refreshed at most once per `min_refresh` seconds; concurrent callers for the
+    same key share one fetch.
+    """
+
+    def __init__(self, fetch=fetch_yfinance_bars, capacity=DEFAULT_CAPACITY, min_refresh=30,
+                 fetch_many=fetch_yfinance_panel):
+        self.fetch = fetch
+        self.fetch_many = fetch_many
+        self.capacity = capacity
+        self.min_refresh = min_refresh
+        self.buffers = {}
+        self.refreshed_at = {}
+        self.covered_days = {}
+        self.generation = {}  # bumped whenever a buffer is rebuilt from a full fetch
+        self.fetches = 0
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+                self.buffers[key] = BarBuffer(self.capacity)
+            return self._locks[key]
+
+    def refresh(self, ticker, interval, period, period_days, force=False):
+        """Fetch new bars for (ticker, interval) if due; returns the number of bars written.
+
+        A full `period` fetch only happens for a new key, a longer period than already
+        covered, or a buffer too stale for a delta request.
+        """
+        key = (ticker, interval)
+        with self._key_lock(key):
+            buffer = self.buffers[key]
+            now = time.monotonic()
+            widen = period_days > self.covered_days.get(key, 0)
+            if not force and not widen and now - self.refreshed_at.get(key, -np.inf) < self.min_refresh:
+                metrics.inc("cache_lookups_total", cache="bars", result="hit")
+                return 0
+            last = buffer.last_ts
+            if widen or last is None or pd.Timestamp.now(tz="UTC") - last > MAX_DELTA_AGE:
+                metrics.inc("cache_lookups_total", cache="bars", result="miss")
+                bars = self.fetch(ticker, interval, period=period)
+                buffer = self.buffers[key] = BarBuffer(self.capacity)
+                self.covered_days[key] = period_days
+                self.generation[key] = self.generation.get(key, -1) + 1
+            else:
+                metrics.inc("cache_lookups_total", cache="bars", result="delta")
+                # Start at the last stored bar so a still-forming bar gets its final values
+                bars = self.fetch(ticker, interval, start=last)
+            self.fetches += 1
+            self.refreshed_at[key] = now
+            return buffer.merge(bars)
+
+    def refresh_many(self, tickers, interval, period, period_days, force=False):
+        """Refresh due tickers with at most two batched fetches: one full, one delta.
+
+        The delta batch starts at the oldest last-stored bar among its tickers, so each
+        buffer still sees its own forming bar again. Returns the number of bars written.
+        """
+        keys = sorted((t, interval) for t in set(tickers))
+        locks = [self._key_lock(key) for key in keys]
+        for lock in locks:
+            lock.acquire()
+        try:
+            now = time.monotonic()
+            utc_now = pd.Timestamp.now(tz="UTC")
+            full, delta = [], []
+            for key in keys:
+                buffer = self.buffers[key]
+                widen = period_days > self.covered_days.get(key, 0)
+                if not force and not widen and now - self.refreshed_at.get(key, -np.inf) < self.min_refresh:
+                    continue
+                last = buffer.last_ts
+                if widen or last is None or utc_now - last > MAX_DELTA_AGE:
+                    full.append(key[0])
+                else:
+                    delta.append(key[0])
+
+            metrics.inc("cache_lookups_total", len(keys) - len(full) - len(delta), cache="bars", result="hit")
+            metrics.inc("cache_lookups_total", len(full), cache="bars", result="miss")
+            metrics.inc("cache_lookups_total", len(delta), cache="bars", result="delta")
+            written = 0
+            if full:
+                bars = self.fetch_many(full, interval, period=period)
+                self.fetches += 1
+                for t in full:
+                    key = (t, interval)
+                    self.buffers[key] = BarBuffer(self.capacity)
+                    self.covered_days[key] = period_days
+                    self.generation[key] = self.generation.get(key, -1) + 1
+                    self.refreshed_at[key] = now
+                    written += self.buffers[key].merge(bars.get(t))
+            if delta:
+                start = min(self.buffers[(t, interval)].last_ts for t in delta)
+                bars = self.fetch_many(delta, interval, start=start)
+                self.fetches += 1
+                for t in delta:
+                    self.refreshed_at[(t, interval)] = now
+                    written += self.buffers[(t, interval)].merge(bars.get(t))
+            return written
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def _frame(self, key, period_days):
+        """Bars from the last `period_days` days, read under the key's lock so a concurrent merge
+        (e.g. the background refresher's) is never seen half-applied"""
+        with self._key_lock(key):
+            buffer = self.buffers[key]
+            last = buffer.last_ts
+            return buffer.frame(since=None if last is None else last - pd.Timedelta(days=period_days))
+
+    def get_many(self, tickers, interval, period, period_days, force=False):
+        """Batched refresh, then {ticker: bars from the last `period_days` days}"""
+        self.refresh_many(tickers, interval, period, period_days, force=force)
+        return {t: self._frame((t, interval), period_days) for t in tickers}
+
+    def get(self, ticker, interval, period, period_days, force=False):
+        """Refresh if due and return the bars from the last `period_days` days"""
+        self.refresh(ticker, interval, period, period_days, force=force)
+        return self._frame((ticker, interval), period_days)
@@ -5,9 +5,11 @@ import numpy as np
 def add_bollinger_bands(data, window=20):
     """Add Bollinger Bands columns to DataFrame"""
     # MA and Rolling Std
-    data['MA_20'] = data['Close'].rolling(window=window, min_periods=1).mean()
-    data['BB_Upper'] = data['MA_20'] + 2 * data['Close'].rolling(window=window, min_periods=1).std()
-    data['BB_Lower'] = data['MA_20'] - 2 * data['Close'].rolling(window=window, min_periods=1).std()
+    rolling = data['Close'].rolling(window=window, min_periods=1)
+    data['MA_20'] = rolling.mean()
+    band = 2 * rolling.std()
+    data['BB_Upper'] = data['MA_20'] + band
+    data['BB_Lower'] = data['MA_20'] - band
     return data
 
 def detect_bband_big_moves(data):
@@ -0,0 +1,125 @@
+# classification_cache.py
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+import metrics
+
+CACHE_DB = "classification_cache.db"
+# Approximate on-disk bytes per row besides the label strings (hex key plus SQLite overhead)
+ENTRY_OVERHEAD = 96
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    key TEXT PRIMARY KEY,
+    sentiment TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_classifications_last_used ON classifications(last_used);
+"""
+
+
+def normalize_summary(summary):
+    """Lowercase and collapse whitespace so trivially different copies of a story share a key"""
+    return re.sub(r"\s+", " ", (summary or "").strip().lower())
+
+
+def cache_key(summary, model_name, prompt_version):
+    text = "\0".join([normalize_summary(summary), model_name, prompt_version])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ClassificationCache:
+    """Persistent (summary, model, prompt version) -> (sentiment, event_type) cache.
+
+    Entries are evicted least-recently-used first once the summed entry size exceeds
+    `max_bytes`. `hits` and `misses` count lookups since the cache was opened.
+    """
+
+    def __init__(self, model_name, prompt_version, path=CACHE_DB, max_bytes=16 * 1024 * 1024):
+        self.model_name = model_name
+        self.prompt_version = prompt_version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def key(self, summary):
+        return cache_key(summary, self.model_name, self.prompt_version)
+
+    def get_many(self, summaries):
+        """Look up summaries, returning a list aligned with the input (None for misses)"""
+        keys = [self.key(summary) for summary in summaries]
+        found = {}
+        with self._lock:
+            unique_keys = list(set(keys))
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, sentiment, event_type FROM classifications WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                found.update((key, (sentiment, event_type)) for key, sentiment, event_type in rows)
+            if found:
+                now = time.time()
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE classifications SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                    )
+            results = [found.get(key) for key in keys]
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        metrics.inc("cache_lookups_total", hits, cache="classification", result="hit")
+        metrics.inc("cache_lookups_total", len(results) - hits, cache="classification", result="miss")
+        return results
+
+    def get(self, summary):
+        return self.get_many([summary])[0]
+
+    def put_many(self, pairs):
+        """Store (summary, (sentiment, event_type)) pairs, then evict down to max_bytes"""
+        now = time.time()
+        records = [
+            (self.key(summary), sentiment, event_type, ENTRY_OVERHEAD + len(sentiment) + len(event_type), now)
+            for summary, (sentiment, event_type) in pairs
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO classifications (key, sentiment, event_type, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?)", records
+            )
+            self._evict()
+
+    def put(self, summary, labels):
+        self.put_many([(summary, labels)])
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM classifications").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in self.conn.execute("SELECT key, size FROM classifications ORDER BY last_used"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM classifications WHERE key = ?", stale)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
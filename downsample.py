@@ -0,0 +1,40 @@
+# downsample.py
+
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of n_out - 2 equal buckets, the point
+    forming the largest triangle with the previously kept point and the next bucket's
+    mean, so peaks and troughs survive. Returns all indices when n_out >= len(x).
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")
+    out = np.empty(n_out, dtype="int64")
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def downsample_frame(data, column="Close", max_points=2000):
+    """Rows of a time-indexed frame picked by LTTB on `column` (NaNs treated as 0 for the choice)"""
+    if len(data) <= max_points:
+        return data
+    x = data.index.asi8 if hasattr(data.index, "asi8") else np.arange(len(data))
+    y = np.nan_to_num(data[column].to_numpy(dtype="float64"))
+    return data.iloc[lttb_indices(x, y, max_points)]
@@ -0,0 +1,62 @@
+# features.py
+
+import pandas as pd
+
+from price_cache import get_daily_bars
+
+FEATURE_COLUMNS = ["Close_Return", "Intraday_Return", "Volatility_5d", "SMA_5", "SMA_20"]
+
+
+def daily_table_from_cache(symbols, api_key=""):
+    """Long (Symbol, Price Date, Open, Close) table of every cached trading day for the symbols"""
+    frames = []
+    for symbol in symbols:
+        bars = get_daily_bars(symbol, api_key)
+        frames.append(pd.DataFrame({
+            "Symbol": symbol,
+            "Price Date": bars.index,
+            "Open": bars["Open"].to_numpy(dtype="float64"),
+            "Close": bars["Close"].to_numpy(dtype="float64"),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def compute_price_features(daily):
+    """Compute returns, 5-day volatility and SMAs once per (Symbol, trading day).
+
+    All symbols are processed together with group-wise shifts and rolling windows, so
+    the cost scales with trading days, not articles. Windows need a full 5/20 days;
+    shorter histories are filled with 0 like the original per-article script.
+    """
+    daily = daily.assign(Symbol=daily["Symbol"].astype(str), **{"Price Date": _as_day(daily["Price Date"])})
+    daily = daily.sort_values(["Symbol", "Price Date"]).reset_index(drop=True)
+    prev_close = daily.groupby("Symbol", sort=False)["Close"].shift(1)
+    daily["Close_Return"] = ((daily["Close"] / prev_close - 1) * 100).fillna(0)
+    daily["Intraday_Return"] = ((daily["Close"] - daily["Open"]) / daily["Open"] * 100).fillna(0)
+
+    def rolling(column, window, stat):
+        rolled = getattr(daily.groupby("Symbol", sort=False)[column].rolling(window, min_periods=window), stat)()
+        return rolled.reset_index(level=0, drop=True).sort_index().fillna(0)
+
+    daily["Volatility_5d"] = rolling("Close_Return", 5, "std")
+    daily["SMA_5"] = rolling("Close", 5, "mean")
+    daily["SMA_20"] = rolling("Close", 20, "mean")
+    return daily
+
+
+def _as_day(values):
+    """Tz-naive midnight timestamps, so cache dates and UTC artifact dates compare equal"""
+    days = pd.to_datetime(values)
+    if getattr(days.dt, "tz", None) is not None:
+        days = days.dt.tz_localize(None)
+    return days.dt.normalize().astype("datetime64[ns]")
+
+
+def join_features(news, features):
+    """Left-join per-day features onto news rows by (Symbol, Price Date)"""
+    news = news.assign(Symbol=news["Symbol"].astype(str), **{"Price Date": _as_day(news["Price Date"])})
+    return news.merge(
+        features[["Symbol", "Price Date"] + FEATURE_COLUMNS],
+        on=["Symbol", "Price Date"],
+        how="left",
+    )
@@ -1,11 +1,14 @@
 import yfinance as yf
 from datetime import datetime
 
+from rate_limit import call_with_retry
+
 ticker = "AAPL"
 date_to_fetch = "2025-10-15"
 
 stock = yf.Ticker(ticker)
-news_list = stock.news
+# Paced and retried under the shared yahoo limiter like the other Yahoo fetchers
+news_list = call_with_retry("yahoo", lambda: stock.news, max_retries=2)
 
 found = False
 for article in news_list:
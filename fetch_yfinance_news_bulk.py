@@ -1,97 +1,142 @@
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import csv
+import sys
 import time
 
-ticker = "AAPL"
+from news_store import NewsStore
+from rate_limit import call_with_retry, get_limiter
+
+SEARCH_URL = "https://query2.finance.yahoo.com/v1/finance/search"
+
+tickers = sys.argv[1:] or ["AAPL"]
 start_date = datetime(2025, 1, 1, tzinfo=timezone.utc)
 end_date = datetime.now(timezone.utc)
 
-articles_data = []
-
-# Yahoo Finance API endpoint for news
-offset = 0
 count = 100  # Fetch 100 articles per request
-max_articles = 1000  # Maximum to fetch
-
-while offset < max_articles:
-    url = f"https://query2.finance.yahoo.com/v1/finance/search"
-    params = {
-        'q': ticker,
-        'quotesCount': 0,
-        'newsCount': count,
-        'enableFuzzyQuery': False,
-        'offset': offset
-    }
-    
-    try:
-        response = requests.get(url, params=params, headers={'User-Agent': 'Mozilla/5.0'})
-        response.raise_for_status()
-        data = response.json()
-        
+max_articles = 1000  # Maximum to fetch per ticker
+max_workers = 16  # Tickers paged concurrently
+max_retries = 5
+
+
+def make_session(pool_size):
+    """One keep-alive session shared by every worker"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.headers['User-Agent'] = 'Mozilla/5.0'
+    return session
+
+
+def get_page(session, params):
+    """GET one search page; 429/503s raise HTTPError so the shared yahoo limiter slows down and retries"""
+    response = session.get(SEARCH_URL, params=params, timeout=15)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_ticker_news(session, ticker):
+    """Page through Yahoo news for one ticker, newest first, until a page reaches before start_date"""
+    articles_data = []
+    offset = 0
+    while offset < max_articles:
+        params = {
+            'q': ticker,
+            'quotesCount': 0,
+            'newsCount': count,
+            'enableFuzzyQuery': False,
+            'offset': offset
+        }
+        attempts = []
+
+        def fetch_page():
+            attempts.append(1)
+            return get_page(session, params)
+
+        try:
+            data = call_with_retry("yahoo", fetch_page, max_retries=max_retries, max_delay=30)
+        except (requests.RequestException, ValueError) as e:
+            # 4xx other than 429 aren't retried, so report the attempts actually made
+            print(f"{ticker}: giving up at offset {offset} after {len(attempts)} attempt(s): {e}")
+            break
+
         news_items = data.get('news', [])
-        
         if not news_items:
-            print(f"No more articles found. Total fetched: {offset}")
             break
-        
+
+        reached_start = False
         for article in news_items:
             pub_time = article.get('providerPublishTime')
-            
-            if pub_time:
-                pub_date = datetime.fromtimestamp(pub_time, tz=timezone.utc)
-                
-                # Filter articles between start and end date
-                if start_date <= pub_date <= end_date:
-                    title = article.get('title', 'No title')
-                    url = article.get('link', 'No URL')
-                    provider = article.get('publisher', 'Unknown')
-                    
-                    articles_data.append({
-                        'Date': pub_date.strftime('%Y-%m-%d'),
-                        'Time': pub_date.strftime('%H:%M:%S'),
-                        'Title': title,
-                        'URL': url,
-                        'Provider': provider,
-                        'Timestamp': pub_time
-                    })
-                elif pub_date < start_date:
-                    # If we've reached articles before our start date, stop
-                    print(f"Reached articles before start date. Stopping.")
-                    offset = max_articles  # Exit loop
-                    break
-        
-        offset += count
-        print(f"Fetched {offset} articles so far...")
-        time.sleep(0.5)  # Rate limiting
-        
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        break
-
-# Remove duplicates based on URL
-seen_urls = set()
-unique_articles = []
-for article in articles_data:
-    if article['URL'] not in seen_urls:
-        seen_urls.add(article['URL'])
-        unique_articles.append(article)
-
-# Sort by timestamp (newest first)
-unique_articles.sort(key=lambda x: x['Timestamp'], reverse=True)
-
-# Save to CSV
-csv_filename = f'{ticker}_news_articles_2025_complete.csv'
-if unique_articles:
-    with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['Date', 'Time', 'Title', 'URL', 'Provider']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for article in unique_articles:
-            writer.writerow({k: v for k, v in article.items() if k != 'Timestamp'})
-    
-    print(f"\nSuccessfully saved {len(unique_articles)} unique articles to {csv_filename}")
-    print(f"Date range: January 1, 2025 to {end_date.strftime('%Y-%m-%d')}")
-else:
-    print(f"No articles found for {ticker} between January 1, 2025 and today")
+            if not pub_time:
+                continue
+            pub_date = datetime.fromtimestamp(pub_time, tz=timezone.utc)
+            if start_date <= pub_date <= end_date:
+                articles_data.append({
+                    'Date': pub_date.strftime('%Y-%m-%d'),
+                    'Time': pub_date.strftime('%H:%M:%S'),
+                    'Title': article.get('title', 'No title'),
+                    'URL': article.get('link', 'No URL'),
+                    'Provider': article.get('publisher', 'Unknown'),
+                    'Timestamp': pub_time
+                })
+            elif pub_date < start_date:
+                reached_start = True
+        if reached_start:
+            # Later pages are only older
+            break
+        # Yahoo may return fewer than newsCount items on a page that isn't the last one
+        offset += len(news_items)
+    return articles_data
+
+
+def save_ticker_news(ticker, articles_data, store=None):
+    """Write the ticker's unique articles to CSV and, given a NewsStore, upsert them with the publisher as source"""
+    # Remove duplicates based on URL
+    seen_urls = set()
+    unique_articles = []
+    for article in articles_data:
+        if article['URL'] not in seen_urls:
+            seen_urls.add(article['URL'])
+            unique_articles.append(article)
+
+    # Sort by timestamp (newest first)
+    unique_articles.sort(key=lambda x: x['Timestamp'], reverse=True)
+
+    csv_filename = f'{ticker}_news_articles_2025_complete.csv'
+    if unique_articles:
+        with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
+            fieldnames = ['Date', 'Time', 'Title', 'URL', 'Provider']
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for article in unique_articles:
+                writer.writerow({k: v for k, v in article.items() if k != 'Timestamp'})
+        print(f"{ticker}: saved {len(unique_articles)} unique articles to {csv_filename}")
+        if store is not None:
+            # Yahoo has no summary, so its copies cluster with other sources on the headline alone
+            added = store.upsert_articles(ticker, (
+                {'datetime': a['Timestamp'], 'headline': a['Title'], 'url': a['URL'], 'source': a['Provider']}
+                for a in unique_articles
+            ))
+            print(f"{ticker}: {added} new articles in {store.path}")
+    else:
+        print(f"No articles found for {ticker} between {start_date.strftime('%Y-%m-%d')} and today")
+    return len(unique_articles)
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    workers = min(max_workers, len(tickers))
+    session = make_session(workers)
+    # Shared pace across tickers (see PROVIDER_BUDGETS["yahoo"]): starts at 20 req/s, gains
+    # ~2 req/s per second of clean responses and halves on Yahoo's 429/503s
+    limiter = get_limiter("yahoo")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(tickers, pool.map(partial(fetch_ticker_news, session), tickers)))
+    store = NewsStore()
+    total = sum(save_ticker_news(ticker, articles, store) for ticker, articles in results.items())
+    store.close()
+    print(f"\n{total} articles for {len(tickers)} tickers in {time.perf_counter() - started:.1f}s "
+          f"(final pace {limiter.rate:.1f} req/s)")
@@ -1,65 +1,49 @@
 import finnhub
-import csv
-from datetime import datetime, timedelta, timezone
-import time
+import sys
+from datetime import datetime, timezone
+
+from finnhub_backfill import AdaptiveWindowPlanner
+from ingest_state import IngestState, ingest
+from news_store import NewsStore
 #main
 api_key = ""
-symbol = "DNA"
-interval_days = 5
+# Pass symbols on the command line, e.g. `python finhub_news_fetch.py DNA AAPL`
+symbols = sys.argv[1:] or ["DNA"]
+interval_days = 5  # initial window width; the planner widens or splits it per symbol
+api_limit_per_sec = 30
+max_workers = 16
 
 # Initialize Finnhub client
 finnhub_client = finnhub.Client(api_key=api_key)
 
-# Set up date ranges
+# Set up date ranges; only days not already settled in the ingest state are requested
 start_dt = datetime(2025, 1, 1)
-end_dt = datetime(2025, 10, 15)
-all_news = []
-request_count = 0
-api_limit_per_sec = 30
-batch_requests = []
+end_dt = datetime.now(timezone.utc)
+state = IngestState("finnhub_ingest_state.json", settle_days=2)
+planner = AdaptiveWindowPlanner(initial_days=interval_days)
+store = NewsStore("news.db")
+
 
-cur_start = start_dt
-while cur_start < end_dt:
-    cur_end = min(cur_start + timedelta(days=interval_days-1), end_dt)
-    batch_requests.append((cur_start.strftime('%Y-%m-%d'), cur_end.strftime('%Y-%m-%d')))
-    cur_start = cur_end + timedelta(days=1)
+def csv_filename_for(symbol):
+    return f"{symbol}_finnhub_news.csv"
 
-for idx, (batch_start, batch_end) in enumerate(batch_requests):
-    news = finnhub_client.company_news(symbol, _from=batch_start, to=batch_end)
-    all_news.extend(news)
-    request_count += 1
-    print(f"Fetched {len(news)} articles from {batch_start} to {batch_end}")
 
-    # Sleep if nearing the API rate limit
-    if request_count % api_limit_per_sec == 0:
-        print("Respecting plan's API call limit. Sleeping for 1 second...")
-        time.sleep(1)
+# Baseline for benchmarking the adaptive planner against fixed-width windows
+fixed_calls = sum(len(state.missing_windows(symbol, start_dt, end_dt, interval_days)) for symbol in symbols)
 
-# Remove duplicates based on url
-seen_urls = set()
-unique_news = []
-for article in all_news:
-    url = article.get('url')
-    if url and url not in seen_urls:
-        seen_urls.add(url)
-        unique_news.append(article)
+# Windows for all symbols run concurrently, paced by a token bucket at the plan's calls/sec.
+# Each finished window is appended to the CSV and checkpointed, so a rerun resumes after a crash.
+added = ingest(
+    finnhub_client, symbols, start_dt, end_dt, csv_filename_for,
+    state=state,
+    interval_days=interval_days,
+    calls_per_sec=api_limit_per_sec,
+    max_workers=max_workers,
+    planner=planner,
+    store=store
+)
 
-csv_filename = f"{symbol}_finnhub_news_20250101_to_20251015.csv"
-with open(csv_filename, "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Datetime", "Headline", "Summary", "URL", "Source"])
-    for article in unique_news:
-        ts = article.get('datetime')
-        if isinstance(ts, (int, float)):
-            pub_date = datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')
-        else:
-            pub_date = ''
-        writer.writerow([
-            pub_date,
-            article.get('headline', ''),
-            article.get('summary', ''),
-            article.get('url', ''),
-            article.get('source', '')
-        ])
+for symbol, count in added.items():
+    print(f"New news articles appended to {csv_filename_for(symbol)}: {count} (settled through {state.high_water(symbol)})")
 
-print(f"Total news articles saved to {csv_filename}: {len(unique_news)}")
+print(f"Finnhub calls made: {planner.calls} (fixed {interval_days}-day windows would have needed {fixed_calls})")
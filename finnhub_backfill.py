@@ -0,0 +1,167 @@
+# finnhub_backfill.py
+
+import csv
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+
+from rate_limit import call_with_retry, get_limiter
+
+NEWS_CSV_HEADER = ["Datetime", "Headline", "Summary", "URL", "Source"]
+
+# company_news silently truncates large responses; a window returning at least this many
+# articles is treated as truncated and split.
+RESPONSE_CAP = 250
+
+
+def fetch_window(finnhub_client, limiter, symbol, window_start, window_end, max_retries=3):
+    """Fetch one company_news window under the finnhub limiter, backing off on 429s and transient errors"""
+    return call_with_retry(limiter, finnhub_client.company_news, symbol, _from=window_start, to=window_end,
+                           max_retries=max_retries)
+
+
+def run_windows(finnhub_client, jobs, calls_per_sec=30, max_workers=16):
+    """Fetch (symbol, window_start, window_end) jobs concurrently under the shared finnhub limiter.
+
+    Yields (job, news) as each request completes; news is None when the window failed.
+    """
+    limiter = get_limiter("finnhub", rate=calls_per_sec, max_rate=calls_per_sec)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_window, finnhub_client, limiter, *job): job for job in jobs}
+        for future in as_completed(futures):
+            symbol, window_start, window_end = job = futures[future]
+            try:
+                news = future.result()
+            except Exception as e:
+                print(f"Failed {symbol} {window_start} to {window_end}: {e}")
+                yield job, None
+                continue
+            print(f"Fetched {len(news)} {symbol} articles from {window_start} to {window_end}")
+            yield job, news
+
+
+class AdaptiveWindowPlanner:
+    """Chooses company_news window widths from the article density seen so far.
+
+    Sparse stretches widen the next window (up to `max_days`), dense ones narrow it towards
+    `target_count` articles per call, and a window whose response reaches `response_cap` is
+    split in half recursively so truncated articles are refetched rather than lost.
+    `calls` counts every request made through the planner.
+    """
+
+    def __init__(self, initial_days=5, min_days=1, max_days=90, response_cap=RESPONSE_CAP, target_count=None):
+        self.initial_days = initial_days
+        self.min_days = min_days
+        self.max_days = max_days
+        self.response_cap = response_cap
+        self.target_count = target_count or response_cap // 2
+        self.calls = 0
+        self.calls_by_symbol = {}
+        self._lock = threading.Lock()
+
+    def _count_call(self, symbol):
+        with self._lock:
+            self.calls += 1
+            self.calls_by_symbol[symbol] = self.calls_by_symbol.get(symbol, 0) + 1
+
+    def next_width(self, width, count, days):
+        """Width for the next window given `count` articles over the last `days` days"""
+        if count == 0:
+            width = width * 4
+        else:
+            width = min(width * 4, int(self.target_count * days / count))
+        return max(self.min_days, min(self.max_days, width))
+
+    def walk(self, fetch, symbol, range_start, range_end, on_window):
+        """Cover [range_start, range_end] for symbol, calling on_window(symbol, from, to, news) per final window"""
+        cur, end = as_date(range_start), as_date(range_end)
+        width = self.initial_days
+        while cur <= end:
+            window_end = min(cur + timedelta(days=width - 1), end)
+            count = self._fetch_split(fetch, symbol, cur, window_end, on_window)
+            width = self.next_width(width, count, (window_end - cur).days + 1)
+            cur = window_end + timedelta(days=1)
+
+    def _fetch_split(self, fetch, symbol, window_start, window_end, on_window):
+        news = fetch(symbol, window_start.isoformat(), window_end.isoformat())
+        self._count_call(symbol)
+        if len(news) >= self.response_cap:
+            if window_start < window_end:
+                mid = window_start + (window_end - window_start) // 2
+                return (self._fetch_split(fetch, symbol, window_start, mid, on_window)
+                        + self._fetch_split(fetch, symbol, mid + timedelta(days=1), window_end, on_window))
+            print(f"Warning: {symbol} {window_start} returned {len(news)} articles in a single day; "
+                  f"response may be truncated")
+        on_window(symbol, window_start.isoformat(), window_end.isoformat(), news)
+        return len(news)
+
+
+def as_date(value):
+    """Coerce a datetime, date or ISO date string to a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def run_adaptive(finnhub_client, ranges, planner, calls_per_sec=30, max_workers=16):
+    """Walk (symbol, range_start, range_end) ranges concurrently with an AdaptiveWindowPlanner.
+
+    Each range is walked sequentially (its widths depend on earlier responses) while ranges
+    run in parallel under the shared finnhub limiter. Yields ((symbol, from, to), news) per window.
+    """
+    limiter = get_limiter("finnhub", rate=calls_per_sec, max_rate=calls_per_sec)
+    results = queue.Queue()
+    done = object()
+
+    def fetch(symbol, window_start, window_end):
+        news = fetch_window(finnhub_client, limiter, symbol, window_start, window_end)
+        print(f"Fetched {len(news)} {symbol} articles from {window_start} to {window_end}")
+        return news
+
+    def work(symbol, range_start, range_end):
+        try:
+            planner.walk(fetch, symbol, range_start, range_end,
+                         lambda symbol, ws, we, news: results.put(((symbol, ws, we), news)))
+        except Exception as e:
+            print(f"Failed {symbol} {range_start} to {range_end}: {e}")
+        finally:
+            results.put(done)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for symbol, range_start, range_end in ranges:
+            pool.submit(work, symbol, range_start, range_end)
+        remaining = len(ranges)
+        while remaining:
+            item = results.get()
+            if item is done:
+                remaining -= 1
+                continue
+            yield item
+
+
+def article_row(article):
+    """Convert a Finnhub article dict into a NEWS_CSV_HEADER row"""
+    ts = article.get('datetime')
+    if isinstance(ts, (int, float)):
+        pub_date = datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')
+    else:
+        pub_date = ''
+    return [
+        pub_date,
+        article.get('headline', ''),
+        article.get('summary', ''),
+        article.get('url', ''),
+        article.get('source', '')
+    ]
+
+
+def write_news_csv(csv_filename, articles):
+    """Write Finnhub articles to csv_filename in the standard news CSV layout"""
+    with open(csv_filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(NEWS_CSV_HEADER)
+        for article in articles:
+            writer.writerow(article_row(article))
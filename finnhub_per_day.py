@@ -1,7 +1,9 @@
 import finnhub
-import csv
 from datetime import datetime, timezone
 
+from ingest_state import IngestState, ingest
+from news_store import NewsStore
+
 api_key = ""
 symbol = "AAPL"
 
@@ -13,25 +15,15 @@ today = "2025-10-16"
 
 finnhub_client = finnhub.Client(api_key=api_key)
 
-# Finnhub API expects a date range, so use the same day for start and end
-news = finnhub_client.company_news(symbol, _from=today, to=today)
-
 csv_filename = f"{symbol}_news_{today}.csv"
-with open(csv_filename, "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Datetime", "Headline", "Summary", "URL", "Source"])
-    for article in news:
-        ts = article.get('datetime')
-        if isinstance(ts, (int, float)):
-            pub_date = datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')
-        else:
-            pub_date = ''
-        writer.writerow([
-            pub_date,
-            article.get('headline', ''),
-            article.get('summary', ''),
-            article.get('url', ''),
-            article.get('source', '')
-        ])
-
-print(f"News for {symbol} on {today} saved to {csv_filename}")
+
+# Finnhub API expects a date range, so use the same day for start and end.
+# Reruns skip the day once it is settled and otherwise only append articles not yet in the CSV.
+added = ingest(
+    finnhub_client, [symbol], today, today,
+    lambda s: csv_filename,
+    state=IngestState("finnhub_ingest_state.json"),
+    store=NewsStore("news.db")
+)
+
+print(f"News for {symbol} on {today} saved to {csv_filename} ({added[symbol]} new)")
@@ -0,0 +1,74 @@
+# hypothesis_stats.py
+
+import numpy as np
+import pandas as pd
+
+CANDLES = ["green", "red", "doji"]
+# Crosstab cell order: (MA state, candle) -> code = above * 3 + candle index
+CELLS = [f"{candle}_{state}" for state in ("below", "above") for candle in CANDLES]
+
+
+def _codes(data):
+    candle = pd.Categorical(data['Candle'], categories=CANDLES).codes.astype("int64")
+    # Unknown candles (NaN) count as doji, like np.select's default in process_data
+    candle = np.where(candle < 0, 2, candle)
+    above = data['MA_Above'].to_numpy(dtype=bool).astype("int64")
+    return above * 3 + candle
+
+
+def _with_percentages(counts):
+    """Add totals, percentages and support flags to green/red x below/above counts"""
+    out = dict(counts)
+    total_below = counts['green_below'] + counts['red_below']
+    total_above = counts['green_above'] + counts['red_above']
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for candle in ("green", "red"):
+            out[f'{candle}_below_pct'] = np.where(total_below > 0, counts[f'{candle}_below'] / total_below * 100, 0)
+            out[f'{candle}_above_pct'] = np.where(total_above > 0, counts[f'{candle}_above'] / total_above * 100, 0)
+    out['total_below'] = total_below
+    out['total_above'] = total_above
+    # Hypothesis 1: red dominates while 9-MA < 20-MA, green dominates while 9-MA > 20-MA
+    out['below_supported'] = counts['red_below'] > counts['green_below']
+    out['above_supported'] = counts['green_above'] > counts['red_above']
+    return out
+
+
+def candle_ma_stats(data):
+    """Green/red/doji x MA_Above counts and percentages in one bincount pass"""
+    counts = np.bincount(_codes(data), minlength=6)
+    stats = _with_percentages({cell: int(n) for cell, n in zip(CELLS, counts)})
+    return {k: (v.item() if isinstance(v, np.ndarray) else v) for k, v in stats.items()}
+
+
+def rolling_candle_ma_stats(data, window):
+    """Hypothesis 1 counts for every window of `window` bars ending at each row (from row window-1 on).
+
+    One-hot crosstab cells are cumulatively summed once; each window is a difference of
+    two prefix sums, so all windows cost about as much as a single pass.
+    """
+    codes = _codes(data)
+    n = len(codes)
+    if n < window:
+        return pd.DataFrame(columns=CELLS + ['below_supported', 'above_supported'])
+    prefix = np.zeros((n + 1, 6), dtype="int64")
+    np.add.at(prefix[1:], (np.arange(n), codes), 1)
+    prefix = prefix.cumsum(axis=0)
+    windows = prefix[window:] - prefix[:-window]
+    stats = _with_percentages({cell: windows[:, i] for i, cell in enumerate(CELLS)})
+    return pd.DataFrame(stats, index=data.index[window - 1:])
+
+
+def rolling_bband_breaches(data, window):
+    """Closes above/below the Bollinger bands in every window of `window` bars, via prefix sums"""
+    above = (data['Close'] > data['BB_Upper']).to_numpy(dtype="int64")
+    below = (data['Close'] < data['BB_Lower']).to_numpy(dtype="int64")
+    if len(above) < window:
+        return pd.DataFrame(columns=['above', 'below', 'total'])
+    above_prefix = np.concatenate([[0], above.cumsum()])
+    below_prefix = np.concatenate([[0], below.cumsum()])
+    out = pd.DataFrame({
+        'above': above_prefix[window:] - above_prefix[:-window],
+        'below': below_prefix[window:] - below_prefix[:-window],
+    }, index=data.index[window - 1:])
+    out['total'] = out['above'] + out['below']
+    return out
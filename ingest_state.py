@@ -0,0 +1,176 @@
+# ingest_state.py
+
+import csv
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from finnhub_backfill import NEWS_CSV_HEADER, article_row, as_date, run_adaptive, run_windows
+
+STATE_PATH = "finnhub_ingest_state.json"
+
+
+def _merge_ranges(ranges):
+    """Merge overlapping or adjacent inclusive (start, end) date ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class IngestState:
+    """Per-symbol record of which days have been fetched and will not change any more.
+
+    Stored as merged inclusive date ranges per symbol; the end of the first range is the
+    symbol's high-water mark. Days within `settle_days` of the fetch date are never marked
+    settled, so recent windows are refetched on the next run to pick up late articles.
+    """
+
+    def __init__(self, path=STATE_PATH, settle_days=2):
+        self.path = path
+        self.settle_days = settle_days
+        self.ranges = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            for symbol, entry in raw.items():
+                self.ranges[symbol] = [(as_date(s), as_date(e)) for s, e in entry.get("ranges", [])]
+
+    def high_water(self, symbol):
+        ranges = self.ranges.get(symbol)
+        return ranges[0][1] if ranges else None
+
+    def is_settled(self, symbol, day):
+        return any(start <= day <= end for start, end in self.ranges.get(symbol, []))
+
+    def mark_fetched(self, symbol, window_start, window_end, fetched_on=None):
+        """Record a completed window, keeping only the part old enough to be final"""
+        fetched_on = fetched_on or datetime.now(timezone.utc).date()
+        settled_end = min(as_date(window_end), fetched_on - timedelta(days=self.settle_days))
+        window_start = as_date(window_start)
+        if settled_end < window_start:
+            return
+        ranges = self.ranges.get(symbol, []) + [(window_start, settled_end)]
+        self.ranges[symbol] = _merge_ranges(ranges)
+
+    def missing_ranges(self, symbol, start_dt, end_dt):
+        """Contiguous (start, end) date runs of unsettled days in [start_dt, end_dt]"""
+        runs = []
+        day, end = as_date(start_dt), as_date(end_dt)
+        run_start = None
+        while day <= end:
+            if self.is_settled(symbol, day):
+                if run_start is not None:
+                    runs.append((run_start, day - timedelta(days=1)))
+                    run_start = None
+            elif run_start is None:
+                run_start = day
+            day += timedelta(days=1)
+        if run_start is not None:
+            runs.append((run_start, end))
+        return runs
+
+    def missing_windows(self, symbol, start_dt, end_dt, interval_days=5):
+        """Plan fixed-width (from, to) windows covering every unsettled day in [start_dt, end_dt]"""
+        windows = []
+        for run_start, run_end in self.missing_ranges(symbol, start_dt, end_dt):
+            windows.extend(_split_run(run_start, run_end, interval_days))
+        return windows
+
+    def save(self):
+        """Atomically write the state file"""
+        raw = {
+            symbol: {
+                "high_water": self.high_water(symbol).isoformat() if ranges else None,
+                "ranges": [[s.isoformat(), e.isoformat()] for s, e in ranges],
+            }
+            for symbol, ranges in self.ranges.items()
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(raw, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _split_run(run_start, run_end, interval_days):
+    windows = []
+    cur_start = run_start
+    while cur_start <= run_end:
+        cur_end = min(cur_start + timedelta(days=interval_days - 1), run_end)
+        windows.append((cur_start.isoformat(), cur_end.isoformat()))
+        cur_start = cur_end + timedelta(days=1)
+    return windows
+
+
+def load_seen_urls(csv_filename):
+    """Return the set of URLs already present in a news CSV (empty if it doesn't exist)"""
+    if not os.path.exists(csv_filename):
+        return set()
+    with open(csv_filename, "r", encoding="utf-8", newline="") as f:
+        return {row["URL"] for row in csv.DictReader(f) if row.get("URL")}
+
+
+def append_news_csv(csv_filename, articles, seen_urls):
+    """Append articles whose url is not in seen_urls, updating seen_urls; returns count written"""
+    new_articles = []
+    for article in articles:
+        url = article.get('url')
+        if url and url not in seen_urls:
+            seen_urls.add(url)
+            new_articles.append(article)
+    if not new_articles and os.path.exists(csv_filename):
+        return 0
+    write_header = not os.path.exists(csv_filename)
+    with open(csv_filename, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(NEWS_CSV_HEADER)
+        for article in new_articles:
+            writer.writerow(article_row(article))
+    return len(new_articles)
+
+
+def ingest(finnhub_client, symbols, start_dt, end_dt, csv_filename_for, state=None,
+           interval_days=5, calls_per_sec=30, max_workers=16, planner=None, store=None):
+    """Fetch only unsettled windows for each symbol and append new unique articles.
+
+    With a `planner` (AdaptiveWindowPlanner) each unsettled run of days is walked with
+    adaptive widths; otherwise it is split into fixed `interval_days` windows.
+    Each window is appended to its symbol's CSV (and upserted into `store`, a NewsStore,
+    when given) and recorded in the state file as soon as it
+    completes, so an interrupted run resumes from the windows it had not finished.
+    Returns a dict of symbol -> number of new articles appended.
+    """
+    state = state or IngestState()
+    seen = {symbol: load_seen_urls(csv_filename_for(symbol)) for symbol in symbols}
+    added = {symbol: 0 for symbol in symbols}
+    if planner is not None:
+        ranges = [
+            (symbol, run_start, run_end)
+            for symbol in symbols
+            for run_start, run_end in state.missing_ranges(symbol, start_dt, end_dt)
+        ]
+        print(f"Planned {len(ranges)} unsettled ranges for {len(symbols)} symbols")
+        completed = run_adaptive(finnhub_client, ranges, planner, calls_per_sec, max_workers)
+    else:
+        jobs = [
+            (symbol, window_start, window_end)
+            for symbol in symbols
+            for window_start, window_end in state.missing_windows(symbol, start_dt, end_dt, interval_days)
+        ]
+        print(f"Planned {len(jobs)} window requests for {len(symbols)} symbols")
+        completed = run_windows(finnhub_client, jobs, calls_per_sec, max_workers)
+
+    for (symbol, window_start, window_end), news in completed:
+        if news is None:
+            continue
+        added[symbol] += append_news_csv(csv_filename_for(symbol), news, seen[symbol])
+        if store is not None:
+            store.upsert_articles(symbol, news)
+        state.mark_fetched(symbol, window_start, window_end)
+        state.save()
+
+    return added
@@ -1,24 +1,43 @@
 # --- Part 2: Write CSV with Sentiment & Event Type ---
 
-import json
 import csv
 
-input_json_filename = "DNA_finnhub_news_structured.json"
+import metrics
+from jsonl_io import iter_records
+
+# Either the streamed .jsonl from llmContext.py or a legacy JSON array file
+input_json_filename = "DNA_finnhub_news_structured.jsonl"
 output_csv_filename = "DNA_finnhub_with_sentiment_event.csv"
 
-with open(input_json_filename, "r", encoding="utf-8") as jf, open(output_csv_filename, "w", newline="", encoding="utf-8") as cf:
-    data = json.load(jf)
-    writer = csv.writer(cf)
-    writer.writerow(["Datetime", "Headline", "Summary", "URL", "Source", "Sentiment", "EventType"])
-    for item in data:
-        writer.writerow([
-            item["Datetime"],
-            item["Headline"],
-            item["Summary"],
-            item["URL"],
-            item["Source"],
-            item["Sentiment"],
-            item["EventType"]
-        ])
 
-print(f"Combined CSV with sentiment and event type saved to {output_csv_filename}")
+def export_csv(input_filename, output_filename):
+    """Write labelled records to CSV, skipping rows the model never answered; returns (written, skipped)"""
+    written = skipped = 0
+    # Records are read and written one at a time, so memory use does not grow with the input
+    with open(output_filename, "w", newline="", encoding="utf-8") as cf, metrics.timer("stage_seconds", stage="json_to_csv"):
+        writer = csv.writer(cf)
+        # LabelKey tells local_classifier.load_labelled which rows the local model labelled itself
+        writer.writerow(["Datetime", "Headline", "Summary", "URL", "Source", "Sentiment", "EventType", "LabelKey"])
+        for item in iter_records(input_filename):
+            if item["Sentiment"] is None or item["EventType"] is None:
+                skipped += 1
+                continue
+            writer.writerow([
+                item["Datetime"],
+                item["Headline"],
+                item["Summary"],
+                item["URL"],
+                item["Source"],
+                item["Sentiment"],
+                item["EventType"],
+                item.get("LabelKey") or ""
+            ])
+            written += 1
+    return written, skipped
+
+
+if __name__ == "__main__":
+    written, skipped = export_csv(input_json_filename, output_csv_filename)
+    if skipped:
+        print(f"Skipped {skipped} unlabelled rows; rerun llmContext.py to retry them")
+    print(f"Combined CSV with sentiment and event type saved to {output_csv_filename} ({written} rows)")
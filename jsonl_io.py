@@ -0,0 +1,178 @@
+# jsonl_io.py
+
+import json
+import os
+
+
+def _repair_tail(path):
+    """Drop a partially written last line (e.g. after a crash mid-write)"""
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            pos -= step
+            f.seek(pos)
+            idx = f.read(step).rfind(b"\n")
+            if idx != -1:
+                f.truncate(pos + idx + 1)
+                return
+        f.truncate(0)
+
+
+def _last_line(path):
+    """Last non-empty line of a file, read backwards from the end"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        tail = b""
+        while pos > 0:
+            step = min(65536, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            lines = tail.rstrip(b"\n").rsplit(b"\n", 1)
+            if len(lines) == 2 or pos == 0:
+                return lines[-1].decode("utf-8") or None
+    return None
+
+
+def _truncate_at(path, predicate):
+    """Cut the file before its first record matching predicate; returns the number of records dropped"""
+    with open(path, "rb+") as f:
+        offset = 0
+        for line in f:
+            if line.strip() and predicate(json.loads(line)):
+                f.seek(offset)
+                dropped = sum(1 for line in f if line.strip())
+                f.truncate(offset)
+                return dropped
+            offset += len(line)
+    return 0
+
+
+def count_lines(path):
+    count = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            count += chunk.count(b"\n")
+    return count
+
+
+class JsonlWriter:
+    """Append-only JSON Lines writer with periodic fsync checkpoints.
+
+    With resume=True an existing file is kept (minus any torn last line), `count` holds
+    the number of records already in it and `last` the last of them (None if empty), so
+    the caller can continue after that record. Given `redo`, the file is also cut before
+    the first record the predicate matches (`dropped` counts the records removed), so
+    that record and everything after it are written again.
+    """
+
+    def __init__(self, path, fsync_every=100, resume=True, redo=None):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.dropped = 0
+        if resume and os.path.exists(path):
+            _repair_tail(path)
+            if redo is not None:
+                self.dropped = _truncate_at(path, redo)
+            self.count = count_lines(path)
+            line = _last_line(path)
+            self.last = json.loads(line) if line else None
+            self.f = open(path, "a", encoding="utf-8")
+        else:
+            self.count = 0
+            self.last = None
+            self.f = open(path, "w", encoding="utf-8")
+        self._since_sync = 0
+
+    def write(self, record):
+        self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+        self.last = record
+        self._since_sync += 1
+        if self._since_sync >= self.fsync_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self._since_sync = 0
+
+    def close(self):
+        self.checkpoint()
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(path):
+    """Yield records from a JSON Lines file one at a time"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_json_array(path, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        started = False
+        eof = False
+        while True:
+            buf = buf.lstrip()
+            if not started:
+                if buf.startswith("["):
+                    buf = buf[1:]
+                    started = True
+                    continue
+                if buf:
+                    raise ValueError(f"{path} does not contain a JSON array")
+            elif buf.startswith(","):
+                buf = buf[1:]
+                continue
+            elif buf.startswith("]"):
+                return
+            elif buf:
+                try:
+                    item, end = decoder.raw_decode(buf)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # Only a following ',' or ']' proves the value complete: "1" or "1." may be
+                    # the start of a number like 1.5e3 that continues in the next chunk
+                    rest = buf[end:].lstrip()
+                    if rest[:1] in (",", "]"):
+                        yield item
+                        buf = rest
+                        continue
+                    if eof and rest:
+                        raise ValueError(f"Expected ',' or ']' after an element in {path}")
+            if eof:
+                if started:
+                    raise ValueError(f"Unterminated JSON array in {path}")
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+
+
+def iter_records(path):
+    """Yield records from a .jsonl file or a JSON array file, streaming either way"""
+    if path.endswith(".jsonl"):
+        return iter_jsonl(path)
+    return iter_json_array(path)
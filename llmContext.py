@@ -1,12 +1,21 @@
 # --- Part 1: LLM Classification to JSON ---
 
-from groq import Groq
-import csv
+from groq import APIConnectionError, Groq
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from classification_cache import ClassificationCache
+from jsonl_io import JsonlWriter
+from news_store import NewsStore
+from rate_limit import call_with_retry, get_limiter
 
 client = Groq(api_key="")
 #api here
 MODEL_NAME = "meta-llama/llama-4-scout-17b-16e-instruct"
+# Bump when the prompts or label lists change so cached classifications are not reused
+PROMPT_VERSION = "v2"
 
 SENTIMENTS = ["positive", "negative", "neutral"]
 EVENT_TYPES = [
@@ -14,7 +23,24 @@ EVENT_TYPES = [
     "partnership", "legal", "analyst_rating", "market_trend", "innovation", "other"
 ]
 
+
+def _complete(prompt, tokens):
+    """One chat completion under the shared groq request and token budgets, retried on 429s"""
+    def create():
+        # Every attempt spends tokens, so the token budget is taken per attempt; only the request is timed
+        get_limiter("groq_tokens").acquire(tokens)
+        with metrics.timer("api_call_seconds", provider="groq_requests"):
+            return client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": "You are a market news classifier. Only output valid JSON per instructions."},
+                    {"role": "user", "content": prompt}
+                ],
+                model=MODEL_NAME
+            )
+    return call_with_retry("groq_requests", create, timed=False, retry_on=(APIConnectionError,))
+
 def classify_news(summary):
+    """(sentiment, event_type) for one summary, or None if the reply isn't a usable answer"""
     prompt = (
         "Classify the following market news summary into:\n"
         "1. Sentiment: one of ['positive', 'negative', 'neutral']\n"
@@ -23,45 +49,268 @@ def classify_news(summary):
         "Use ONLY values from the provided lists. If unsure, use 'neutral' for sentiment and 'other' for event_type.\n\n"
         f"SUMMARY: {summary}\nJSON:"
     )
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a market news classifier. Only output valid JSON per instructions."},
-            {"role": "user", "content": prompt}
-        ],
-        model=MODEL_NAME
-    )
+    chat_completion = _complete(prompt, _estimate_tokens(prompt) + 30)
     # Parse and validate
     try:
-        output = chat_completion.choices[0].message.content.strip()
-        result = json.loads(output)
-        sentiment = result.get("sentiment", "neutral")
-        event_type = result.get("event_type", "other")
-        if sentiment not in SENTIMENTS:
-            sentiment = "neutral"
-        if event_type not in EVENT_TYPES:
-            event_type = "other"
-        return sentiment, event_type
+        result = _parse_json_output(chat_completion.choices[0].message.content)
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return None
+    if not isinstance(result, dict):
+        return None
+    sentiment, event_type = result.get("sentiment"), result.get("event_type")
+    if sentiment not in SENTIMENTS or event_type not in EVENT_TYPES:
+        return None
+    return sentiment, event_type
+
+def _estimate_tokens(text):
+    # Rough count (~4 characters per token) used only for pacing against the tokens/min budget
+    return len(text) // 4 + 1
+
+def _parse_json_output(output):
+    output = output.strip()
+    if output.startswith("```"):
+        output = output.strip("`")
+        output = output[output.find("\n") + 1:] if "\n" in output else output
+    return json.loads(output)
+
+def classify_batch(items):
+    """Classify (item_id, summary) pairs in one request.
+
+    Returns {item_id: (sentiment, event_type)} for the items the model answered with a
+    well-formed entry; missing or malformed items are left out for the caller to retry.
+    """
+    payload = json.dumps([{"id": item_id, "summary": summary} for item_id, summary in items], ensure_ascii=False)
+    prompt = (
+        "Classify each market news summary in the JSON list below into:\n"
+        "1. Sentiment: one of ['positive', 'negative', 'neutral']\n"
+        f"2. EventType: one of {EVENT_TYPES}\n"
+        "Return a JSON array with one object per input item: "
+        "[{\"id\": ..., \"sentiment\": ..., \"event_type\": ...}, ...], keeping each item's id.\n"
+        "Use ONLY values from the provided lists. If unsure, use 'neutral' for sentiment and 'other' for event_type.\n\n"
+        f"ITEMS: {payload}\nJSON:"
+    )
+    # Input plus roughly 20 output tokens per item
+    chat_completion = _complete(prompt, _estimate_tokens(prompt) + 20 * len(items))
+    try:
+        result = _parse_json_output(chat_completion.choices[0].message.content)
     except Exception:
-        return "neutral", "other"
+        return {}
+    if isinstance(result, dict):
+        result = result.get("results", result.get("items", []))
+    wanted = {str(item_id): item_id for item_id, _ in items}
+    labels = {}
+    for entry in result if isinstance(result, list) else []:
+        if not isinstance(entry, dict) or str(entry.get("id")) not in wanted:
+            continue
+        sentiment, event_type = entry.get("sentiment"), entry.get("event_type")
+        if sentiment not in SENTIMENTS or event_type not in EVENT_TYPES:
+            continue
+        labels[wanted[str(entry["id"])]] = (sentiment, event_type)
+    return labels
+
+def classify_many(summaries, batch_size=25, max_in_flight=4, cache=None):
+    """Classify many summaries with batched requests, several batches in flight at once.
+
+    Requests and tokens are paced by the process-wide groq limiters shared by all batches; the Groq
+    plan budgets are PROVIDER_BUDGETS["groq_requests"] and ["groq_tokens"] in rate_limit. Items a batch
+    response misses or mangles are retried one at a time with classify_news. With a
+    ClassificationCache, cached summaries are answered without a call, identical summaries
+    are sent once, and new labels are written back.
+    Returns a list of (sentiment, event_type) aligned with `summaries`, with None for items
+    the model never answered usably; those are not cached, so a later run asks again.
+    """
+    summaries = list(summaries)
+    if cache is not None:
+        cached = cache.get_many(summaries)
+        pending = {}
+        for idx, (summary, labels) in enumerate(zip(summaries, cached)):
+            if labels is None:
+                pending.setdefault(cache.key(summary), (summary, []))[1].append(idx)
+        unique = [summary for summary, _ in pending.values()]
+        fresh = classify_many(unique, batch_size, max_in_flight) if unique else []
+        cache.put_many((summary, labels) for summary, labels in zip(unique, fresh) if labels is not None)
+        for (_, indices), labels in zip(pending.values(), fresh):
+            for idx in indices:
+                cached[idx] = labels
+        return cached
 
+    items = list(enumerate(summaries))
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    results = [None] * len(items)
+
+    def run_batch(batch):
+        try:
+            return batch, classify_batch(batch)
+        except Exception as e:
+            print(f"Batch of {len(batch)} failed, retrying items individually: {e}")
+            return batch, {}
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for done, (batch, labels) in enumerate(pool.map(run_batch, batches), 1):
+            for item_id, _ in batch:
+                results[item_id] = labels.get(item_id)
+            print(f"Classified batch {done}/{len(batches)} ({len(labels)}/{len(batch)} items)")
+
+    for item_id, summary in items:
+        if results[item_id] is None:
+            try:
+                results[item_id] = classify_news(summary)
+            except Exception as e:
+                print(f"Item {item_id} failed, leaving it unlabelled: {e}")
+    failed = results.count(None)
+    if failed:
+        print(f"{failed}/{len(results)} items got no usable answer")
+    return results
+
+ticker = "DNA"
 csv_filename = "DNA_finnhub_news_20250101_to_20251015.csv"
-out_json = []
-with open(csv_filename, "r", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        summary = row["Summary"]
-        sentiment, event_type = classify_news(summary)
-        out_json.append({
-            "Datetime": row["Datetime"],
-            "Headline": row["Headline"],
-            "Summary": summary,
-            "URL": row["URL"],
-            "Source": row["Source"],
-            "Sentiment": sentiment,
-            "EventType": event_type
-        })
-
-with open("DNA_finnhub_news_structured.json", "w", encoding="utf-8") as f:
-    json.dump(out_json, f, indent=2)
-
-print("Sentiment & event classification results saved to DNA_finnhub_news_structured.json")
+start_date, end_date = "2025-01-01", "2025-10-16"
+output_jsonl = "DNA_finnhub_news_structured.jsonl"
+chunk_size = 200  # rows classified, written and checkpointed together
+resume = True  # continue after the rows already in output_jsonl instead of starting over
+# Label with the local model (see local_classifier.py) and send only low-confidence rows to the LLM
+use_local_model = True
+local_model_path = "local_classifier.pkl"
+
+
+def label_key(local=False):
+    """Identifies the classifier behind stored labels; a new model or prompt version gets a new key"""
+    key = f"{MODEL_NAME}:{PROMPT_VERSION}"
+    return f"{key}+local" if local else key
+
+
+def current_label_keys(local=False):
+    """Label keys a run accepts as done: the LLM's, plus the local model's when it is in use"""
+    return [label_key(), label_key(local=True)] if local else [label_key()]
+
+
+def keyed_classifier(llm_classify, local_model=None, counts=None):
+    """classify(summaries) -> aligned (sentiment, event_type, label_key) triples, None where unanswered.
+
+    With a local model, confident rows keep its labels under the "+local" key and the rest go to
+    llm_classify; counts, if given, accumulates "rows" and "escalated".
+    """
+    llm_key, local_key = label_key(), label_key(local=True)
+
+    def classify(summaries):
+        if local_model is None:
+            return [row_labels and (*row_labels, llm_key) for row_labels in llm_classify(summaries)]
+        from local_classifier import classify_with_escalation
+        labels, escalated = classify_with_escalation(summaries, local_model, llm_classify)
+        if counts is not None:
+            counts["rows"] = counts.get("rows", 0) + len(summaries)
+            counts["escalated"] = counts.get("escalated", 0) + len(escalated)
+        escalated = set(escalated)
+        return [row_labels and (*row_labels, llm_key if i in escalated else local_key)
+                for i, row_labels in enumerate(labels)]
+    return classify
+
+
+def iter_chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def classify_by_cluster(chunk, store, classify, keys):
+    """Label rows classifying only one representative per near-duplicate cluster.
+
+    classify returns (sentiment, event_type, label_key) triples (see keyed_classifier). Clusters
+    with a member already labelled under one of `keys` reuse its labels and key; rows the index
+    doesn't know are their own cluster. Returns (labels aligned with chunk, number classified);
+    a label is None when its cluster's representative got no answer.
+    """
+    cluster_of = store.cluster_ids(row["URL"] for row in chunk)
+    clusters = [cluster_of.get(row["URL"], row["URL"]) for row in chunk]
+    known = store.cluster_labels((c for c in set(clusters) if not isinstance(c, str)), keys)
+    representatives = {}
+    for row, cluster in zip(chunk, clusters):
+        if cluster not in known and cluster not in representatives:
+            representatives[cluster] = row["Summary"]
+    metrics.inc("cache_lookups_total", len(chunk) - len(representatives), cache="near_duplicate", result="hit")
+    metrics.inc("cache_lookups_total", len(representatives), cache="near_duplicate", result="miss")
+    if representatives:
+        with metrics.timer("stage_seconds", stage="classify_chunk"):
+            known.update(zip(representatives, classify(list(representatives.values()))))
+    return [known[cluster] for cluster in clusters], len(representatives)
+
+
+def main():
+    # Articles come from the shared news store; seed it from the legacy CSV on first use
+    store = NewsStore("news.db")
+    if store.count(ticker) == 0:
+        store.import_csv(ticker, csv_filename)
+    store.near_duplicates.index_missing()
+
+    cache = ClassificationCache(MODEL_NAME, PROMPT_VERSION)
+
+    def llm_classify(summaries):
+        return classify_many(summaries, cache=cache)
+
+    local_model = None
+    classified = rows_seen = 0
+    if use_local_model and os.path.exists(local_model_path):
+        from local_classifier import LocalClassifier
+        local_model = LocalClassifier.load(local_model_path)
+    keys = current_label_keys(local_model is not None)
+    # Each row records which classifier labelled it, so local labels can be kept out of training data
+    counts = {}
+    classify = keyed_classifier(llm_classify, local_model, counts)
+
+    # One request per batch of uncached summaries, with several batches in flight under the Groq budget.
+    # Results stream to JSONL with an fsync per chunk, so a crash loses at most the chunk in flight.
+    # Unanswered rows are written with null labels; a resumed run restarts at the first of them.
+    unanswered = 0
+    with JsonlWriter(output_jsonl, fsync_every=chunk_size, resume=resume,
+                     redo=lambda record: record["Sentiment"] is None) as writer:
+        after = None
+        if writer.dropped:
+            print(f"Dropped {writer.dropped} rows from the first unanswered row on in {output_jsonl} to retry them")
+        if writer.last:
+            # Keyset on the last written row: rows added to the store since don't shift the resume point
+            after = (writer.last["Datetime"], writer.last["URL"])
+            print(f"Resuming after {writer.count} rows already in {output_jsonl} (last {after[0]} {after[1]})")
+        rows = store.iter_range(ticker, start_date, end_date, after=after)
+        for chunk in iter_chunks(rows, chunk_size):
+            labels, chunk_classified = classify_by_cluster(chunk, store, classify, keys)
+            classified += chunk_classified
+            rows_seen += len(chunk)
+            with metrics.timer("stage_seconds", stage="write_chunk"):
+                # Unanswered rows stay unlabelled in the store so the next run retries them
+                store.set_classifications(
+                    (row["URL"], *row_labels) for row, row_labels in zip(chunk, labels) if row_labels is not None
+                )
+                for row, row_labels in zip(chunk, labels):
+                    sentiment, event_type, row_key = row_labels or (None, None, None)
+                    unanswered += row_labels is None
+                    writer.write({
+                        "Datetime": row["Datetime"],
+                        "Headline": row["Headline"],
+                        "Summary": row["Summary"],
+                        "URL": row["URL"],
+                        "Source": row["Source"],
+                        "Sentiment": sentiment,
+                        "EventType": event_type,
+                        "LabelKey": row_key
+                    })
+                writer.checkpoint()
+            print(f"Checkpointed {writer.count} rows to {output_jsonl}")
+
+    print(f"Classified {classified} cluster representatives for {rows_seen} rows; near-duplicates reused their labels")
+    if unanswered:
+        print(f"{unanswered} rows got no usable answer and were written unlabelled; rerun to retry them")
+    if local_model is not None:
+        total, escalated = counts.get("rows", 0), counts.get("escalated", 0)
+        print(f"Local model labelled {total - escalated}/{total} rows; {escalated} escalated to the LLM")
+    stats = cache.stats()
+    print(f"Classification cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+    print(f"Sentiment & event classification results saved to {output_jsonl}")
+
+
+if __name__ == "__main__":
+    main()
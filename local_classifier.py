@@ -0,0 +1,146 @@
+# local_classifier.py
+
+import csv
+import pickle
+import random
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from llmContext import EVENT_TYPES, SENTIMENTS
+
+TRAINING_FILES = ["AAPL_news_with_sentiment_event.csv", "DNA_finnhub_with_sentiment_event.csv"]
+MODEL_PATH = "local_classifier.pkl"
+CONFIDENCE_THRESHOLD = 0.7
+
+
+def load_labelled(csv_files):
+    """Read (summary, sentiment, event_type) from labelled news CSVs, skipping unlabelled rows and off-list labels.
+
+    Rows labelled by the local model itself (LabelKey ending in "+local") are skipped too, so it
+    only ever trains on LLM labels; files without a LabelKey column predate it and are all LLM-labelled.
+    """
+    texts, sentiments, event_types = [], [], []
+    for csv_file in csv_files:
+        with open(csv_file, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("Sentiment") not in SENTIMENTS or row.get("EventType") not in EVENT_TYPES:
+                    continue
+                if (row.get("LabelKey") or "").endswith("+local"):
+                    continue
+                texts.append(row["Summary"] or row["Headline"])
+                sentiments.append(row["Sentiment"])
+                event_types.append(row["EventType"])
+    return texts, sentiments, event_types
+
+
+class LocalClassifier:
+    """TF-IDF + logistic regression heads for sentiment and event type, trained on LLM labels.
+
+    `confidence` is the lower of the two heads' top-class probabilities, so a row is only
+    trusted when both labels are.
+    """
+
+    def __init__(self, confidence_threshold=CONFIDENCE_THRESHOLD):
+        self.confidence_threshold = confidence_threshold
+        self.vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True, max_features=200000)
+        self.sentiment_model = LogisticRegression(max_iter=1000, C=4.0)
+        self.event_model = LogisticRegression(max_iter=1000, C=4.0)
+
+    def fit(self, texts, sentiments, event_types):
+        X = self.vectorizer.fit_transform(texts)
+        self.sentiment_model.fit(X, sentiments)
+        self.event_model.fit(X, event_types)
+        return self
+
+    def predict(self, texts):
+        """Return (labels, confidence) where labels is a list of (sentiment, event_type)"""
+        X = self.vectorizer.transform(texts)
+        sentiment_proba = self.sentiment_model.predict_proba(X)
+        event_proba = self.event_model.predict_proba(X)
+        sentiments = self.sentiment_model.classes_[sentiment_proba.argmax(axis=1)]
+        event_types = self.event_model.classes_[event_proba.argmax(axis=1)]
+        confidence = np.minimum(sentiment_proba.max(axis=1), event_proba.max(axis=1))
+        return list(zip(sentiments.tolist(), event_types.tolist())), confidence
+
+    def save(self, path=MODEL_PATH):
+        # Pickle only the fitted sklearn parts so loading doesn't depend on how this module was run
+        with open(path, "wb") as f:
+            pickle.dump({
+                "confidence_threshold": self.confidence_threshold,
+                "vectorizer": self.vectorizer,
+                "sentiment_model": self.sentiment_model,
+                "event_model": self.event_model,
+            }, f)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        model = cls(state["confidence_threshold"])
+        model.vectorizer = state["vectorizer"]
+        model.sentiment_model = state["sentiment_model"]
+        model.event_model = state["event_model"]
+        return model
+
+
+def classify_with_escalation(summaries, model, llm_classify, threshold=None):
+    """Label summaries locally, sending only those below the confidence threshold to llm_classify.
+
+    llm_classify takes a list of summaries and returns aligned (sentiment, event_type) pairs,
+    or None for summaries it couldn't label; those come back as None here too.
+    Returns (labels, indices of the summaries escalated to llm_classify).
+    """
+    threshold = model.confidence_threshold if threshold is None else threshold
+    labels, confidence = model.predict(summaries)
+    uncertain = [i for i, c in enumerate(confidence) if c < threshold]
+    if uncertain:
+        for i, llm_labels in zip(uncertain, llm_classify([summaries[i] for i in uncertain])):
+            labels[i] = llm_labels
+    return labels, uncertain
+
+
+def agreement_report(csv_files=TRAINING_FILES, test_fraction=0.2, threshold=CONFIDENCE_THRESHOLD, seed=0):
+    """Train on a random split of the labelled files and measure agreement with the LLM labels on the rest"""
+    texts, sentiments, event_types = load_labelled(csv_files)
+    order = list(range(len(texts)))
+    random.Random(seed).shuffle(order)
+    n_test = int(len(order) * test_fraction)
+    test, train = order[:n_test], order[n_test:]
+
+    model = LocalClassifier(threshold).fit(
+        [texts[i] for i in train], [sentiments[i] for i in train], [event_types[i] for i in train]
+    )
+    started = time.perf_counter()
+    labels, confidence = model.predict([texts[i] for i in test])
+    elapsed = time.perf_counter() - started
+
+    truth = [(sentiments[i], event_types[i]) for i in test]
+    sentiment_ok = np.array([p[0] == t[0] for p, t in zip(labels, truth)])
+    event_ok = np.array([p[1] == t[1] for p, t in zip(labels, truth)])
+    confident = confidence >= threshold
+    both_ok = sentiment_ok & event_ok
+    return {
+        "train_rows": len(train),
+        "test_rows": len(test),
+        "sentiment_agreement": float(sentiment_ok.mean()),
+        "event_type_agreement": float(event_ok.mean()),
+        "both_agreement": float(both_ok.mean()),
+        "confident_fraction": float(confident.mean()),
+        "confident_both_agreement": float(both_ok[confident].mean()) if confident.any() else 0.0,
+        "overall_agreement_with_escalation": float((both_ok | ~confident).mean()),
+        "rows_per_second": len(test) / elapsed if elapsed else float("inf"),
+    }
+
+
+if __name__ == "__main__":
+    report = agreement_report()
+    print("Local classifier vs LLM labels (held-out rows):")
+    for key, value in report.items():
+        print(f"  {key}: {value:.3f}" if isinstance(value, float) else f"  {key}: {value}")
+
+    texts, sentiments, event_types = load_labelled(TRAINING_FILES)
+    LocalClassifier().fit(texts, sentiments, event_types).save(MODEL_PATH)
+    print(f"Model trained on {len(texts)} rows saved to {MODEL_PATH}")
@@ -0,0 +1,228 @@
+# metrics.py
+
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Off unless METRICS=1 (or enable() is called): every recording call then returns after one
+# global check. METRICS_REPORT=<path> writes a JSON report at exit, METRICS_PORT=<port>
+# serves Prometheus text at /metrics. Worker processes inherit the environment.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_enabled = False
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> float
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_started = time.time()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def enabled():
+    return _enabled
+
+
+def inc(name, value=1, **labels):
+    """Add value to a counter"""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    """Record one duration in a latency histogram"""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        hist[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        hist[-1] += seconds
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """Context manager observing the wall time of its block into histogram `name`"""
+    return _Timer(name, labels) if _enabled else _NULL_TIMER
+
+
+def snapshot():
+    """Picklable copy of the recorded values, for merging a worker process's metrics"""
+    with _lock:
+        return {"counters": dict(_counters), "histograms": {k: list(v) for k, v in _histograms.items()}}
+
+
+def merge(snap):
+    if not _enabled or not snap:
+        return
+    with _lock:
+        for key, value in snap["counters"].items():
+            _counters[key] = _counters.get(key, 0) + value
+        for key, values in snap["histograms"].items():
+            hist = _histograms.setdefault(key, [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+            for i, value in enumerate(values):
+                hist[i] += value
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _quantile(counts, total, q):
+    """Upper bound of the bucket holding the q-quantile"""
+    target, seen = q * total, 0
+    for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), counts):
+        seen += count
+        if seen >= target:
+            return bound
+    return float("inf")
+
+
+def report():
+    """JSON-ready run report: counters, histogram summaries and derived cache hit rates"""
+    snap = snapshot()
+    counters = [{"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(snap["counters"].items())]
+    histograms = []
+    for (name, labels), values in sorted(snap["histograms"].items()):
+        counts, total_seconds = values[:-1], values[-1]
+        count = sum(counts)
+        histograms.append({
+            "name": name, "labels": dict(labels), "count": count, "sum": round(total_seconds, 6),
+            "mean": round(total_seconds / count, 6) if count else None,
+            "p50_le": _quantile(counts, count, 0.5), "p95_le": _quantile(counts, count, 0.95),
+            "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], counts)),
+        })
+    lookups = {}
+    for (name, labels), value in snap["counters"].items():
+        if name == "cache_lookups_total":
+            labels = dict(labels)
+            hits_total = lookups.setdefault(labels["cache"], [0, 0])
+            hits_total[0] += value if labels["result"] == "hit" else 0
+            hits_total[1] += value
+    return {
+        "started": _started,
+        "wall_seconds": round(time.time() - _started, 3),
+        "counters": counters,
+        "histograms": histograms,
+        "cache_hit_rate": {cache: hits / total for cache, (hits, total) in sorted(lookups.items()) if total},
+    }
+
+
+def write_report(path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report(), f, indent=2, default=str)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _labels_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def prometheus_text():
+    """All metrics in the Prometheus text exposition format"""
+    snap = snapshot()
+    lines = []
+    typed = set()
+    for (name, labels), value in sorted(snap["counters"].items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_labels_text(labels)} {value}")
+    for (name, labels), values in sorted(snap["histograms"].items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], values[:-1]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels_text(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{_labels_text(labels)} {values[-1]}")
+        lines.append(f"{name}_count{_labels_text(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread; returns the server (call shutdown() to stop)"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def enable(report_path=None, port=None):
+    """Turn recording on (for this process and workers it starts), optionally with a JSON report at exit and /metrics"""
+    global _enabled
+    _enabled = True
+    # Child processes inherit METRICS=1 but not the report path or port, which belong to this process
+    os.environ["METRICS"] = "1"
+    os.environ.pop("METRICS_REPORT", None)
+    os.environ.pop("METRICS_PORT", None)
+    if report_path:
+        atexit.register(write_report, report_path)
+    if port:
+        return serve(int(port))
+
+
+if os.environ.get("METRICS") == "1":
+    enable(os.environ.get("METRICS_REPORT"), os.environ.get("METRICS_PORT"))
@@ -0,0 +1,182 @@
+# near_duplicates.py
+
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32  # 32 bands x 4 rows: pairs above ~0.42 Jaccard usually share a bucket
+SHINGLE_WORDS = 3
+THRESHOLD = 0.5
+_PRIME = (1 << 31) - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS article_minhash (
+    article_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL,
+    cluster_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS article_minhash_cluster ON article_minhash(cluster_id);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    article_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, article_id)
+) WITHOUT ROWID;
+"""
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text, k=SHINGLE_WORDS):
+    """Hashed k-word shingles of lower-cased, punctuation-free text"""
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        return {zlib.crc32(" ".join(words).encode())} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + k]).encode()) for i in range(len(words) - k + 1)}
+
+
+class MinHasher:
+    """Universal-hash MinHash: h_i(x) = (a_i * x + b_i) mod (2^31 - 1), fixed seed so signatures persist"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, num_perm, dtype="int64")
+        self.b = rng.integers(0, _PRIME, num_perm, dtype="int64")
+
+    def signature(self, shingle_set):
+        if not shingle_set:
+            return np.full(len(self.a), _PRIME, dtype="int64")
+        x = np.fromiter(shingle_set, dtype="int64", count=len(shingle_set)) % _PRIME
+        return ((self.a[:, None] * x[None, :] + self.b[:, None]) % _PRIME).min(axis=1)
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash/LSH index assigning a cluster id to every article.
+
+    Signatures are split into BANDS bands; articles sharing a band hash are candidates and
+    join the best candidate's cluster when their estimated Jaccard similarity reaches
+    `threshold`. The cluster id is the id of the cluster's first article, which also serves
+    as its representative. Tables live next to the articles in the news store database.
+    """
+
+    def __init__(self, conn, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.conn = conn
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.conn.executescript(SCHEMA)
+
+    def _band_hashes(self, signature):
+        rows = signature.reshape(self.bands, self.rows)
+        # 56-bit bucket keys fit SQLite's signed INTEGER
+        return [int.from_bytes(hashlib.blake2b(r.tobytes(), digest_size=7).digest(), "big") for r in rows]
+
+    def add_many(self, articles):
+        """Index (article_id, headline, summary) tuples and return {article_id: cluster_id}.
+
+        Call inside the caller's transaction; articles earlier in the batch are visible to
+        later ones, so duplicates within one batch cluster together. Bucket candidates and
+        their signatures are looked up for the whole batch at once rather than per article.
+        """
+        prepared = []
+        for article_id, headline, summary in articles:
+            shingle_set = shingles(f"{headline} {summary}")
+            signature = self.hasher.signature(shingle_set)
+            # Nothing to compare: an empty article is its own cluster and never a candidate
+            prepared.append((article_id, signature, self._band_hashes(signature) if shingle_set else None))
+        keys = {(band, bucket) for _, _, bands in prepared if bands for band, bucket in enumerate(bands)}
+        buckets = self._bucket_members(keys)
+        known = self._signatures({other_id for ids in buckets.values() for other_id in ids})
+
+        clusters = {}
+        for article_id, signature, bands in prepared:
+            cluster_id, best = article_id, self.threshold
+            if bands:
+                candidates = set()
+                for key in enumerate(bands):
+                    candidates.update(buckets.get(key, ()))
+                for other_id in candidates:
+                    other_signature, other_cluster = known[other_id]
+                    similarity = float(np.mean(other_signature == signature))
+                    if similarity >= best:
+                        cluster_id, best = other_cluster, similarity
+                for key in enumerate(bands):
+                    buckets.setdefault(key, set()).add(article_id)
+                known[article_id] = (signature, cluster_id)
+            clusters[article_id] = cluster_id
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO article_minhash (article_id, signature, cluster_id) VALUES (?, ?, ?)",
+            [(article_id, signature.tobytes(), clusters[article_id]) for article_id, signature, _ in prepared]
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO lsh_buckets (band, bucket, article_id) VALUES (?, ?, ?)",
+            [(band, bucket, article_id) for article_id, _, bands in prepared if bands
+             for band, bucket in enumerate(bands)]
+        )
+        return clusters
+
+    def _bucket_members(self, keys, chunk_size=400):
+        """{(band, bucket): {article_id, ...}} for the stored articles in the given buckets"""
+        keys = list(keys)
+        members = {}
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i:i + chunk_size]
+            rows = self.conn.execute(
+                "SELECT band, bucket, article_id FROM lsh_buckets "
+                f"WHERE {' OR '.join(['(band = ? AND bucket = ?)'] * len(chunk))}",
+                [value for key in chunk for value in key]
+            )
+            for band, bucket, article_id in rows:
+                members.setdefault((band, bucket), set()).add(article_id)
+        return members
+
+    def _signatures(self, article_ids, chunk_size=500):
+        """{article_id: (signature, cluster_id)} for stored articles"""
+        article_ids = list(article_ids)
+        out = {}
+        for i in range(0, len(article_ids), chunk_size):
+            chunk = article_ids[i:i + chunk_size]
+            for article_id, signature, cluster_id in self.conn.execute(
+                "SELECT article_id, signature, cluster_id FROM article_minhash "
+                f"WHERE article_id IN ({','.join('?' * len(chunk))})", chunk
+            ):
+                out[article_id] = (np.frombuffer(signature, dtype="int64"), cluster_id)
+        return out
+
+    def index_missing(self, batch_size=1000):
+        """Index stored articles that have no signature yet (e.g. imported before the index existed)"""
+        indexed = 0
+        # Cheap check first: counting both tables is much faster than the anti-join below
+        articles, signatures = self.conn.execute(
+            "SELECT (SELECT COUNT(*) FROM articles), (SELECT COUNT(*) FROM article_minhash)"
+        ).fetchone()
+        if articles <= signatures:
+            return indexed
+        while True:
+            rows = self.conn.execute(
+                "SELECT a.id, a.headline, a.summary FROM articles a "
+                "LEFT JOIN article_minhash m ON m.article_id = a.id WHERE m.article_id IS NULL "
+                "ORDER BY a.datetime, a.id LIMIT ?", (batch_size,)
+            ).fetchall()
+            if not rows:
+                return indexed
+            with self.conn:
+                self.add_many([tuple(r) for r in rows])
+            indexed += len(rows)
+
+
+if __name__ == "__main__":
+    from news_store import NewsStore
+
+    store = NewsStore()
+    print(f"Indexed {store.near_duplicates.index_missing()} articles")
+    articles, clusters = store.conn.execute(
+        "SELECT COUNT(*), COUNT(DISTINCT cluster_id) FROM article_minhash"
+    ).fetchone()
+    print(f"{articles} articles in {clusters} clusters ({articles - clusters} near-duplicates)")
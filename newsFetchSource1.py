@@ -1,7 +1,9 @@
 from newsapi import NewsApiClient
 import json
 from datetime import datetime, timedelta
-import time
+
+from news_store import NewsStore
+from rate_limit import call_with_retry
 
 # Initialize NewsAPI client
 # IMPORTANT: Never commit your API key to GitHub - use environment variables instead
@@ -27,8 +29,10 @@ while True:
     try:
         print(f"\nFetching page {page}...")
         
-        # Make API request
-        response = newsapi.get_everything(
+        # Make API request (paced and retried on rateLimited by the shared newsapi limiter;
+        # other NewsAPI errors such as parameterInvalid are not transient and raise at once)
+        response = call_with_retry(
+            "newsapi", newsapi.get_everything,
             q='Apple',
             from_param=from_date,
             to=to_date,
@@ -61,7 +65,6 @@ while True:
                 break
             
             page += 1
-            time.sleep(1)  # Be respectful with rate limits
         else:
             print(f"Error: {response.get('message', 'Unknown error')}")
             break
@@ -78,7 +81,7 @@ while True:
             print("\n   Solutions:")
             print("   1. Change dates to last 30 days (Oct 16 - Sep 16, 2025)")
             print("   2. Upgrade to Business plan ($449/month) for full historical access")
-        elif 'rateLimited' in error_message:
+        elif 'rateLimited' in error_message or 'daily quota' in error_message:
             print("   Rate limit hit. Wait before making more requests.")
         
         break
@@ -102,6 +105,17 @@ output_data = {
 
 output_filename = 'apple_news_100days.json'
 
+# Same articles table as the Finnhub fetchers, so syndicated copies cluster across sources
+store = NewsStore()
+added = store.upsert_articles('AAPL', (
+    {'datetime': article['publishedAt'], 'headline': article.get('title') or '',
+     'summary': article.get('description') or '', 'url': article.get('url'),
+     'source': (article.get('source') or {}).get('name') or 'newsapi'}
+    for article in all_articles
+))
+store.close()
+print(f"{added} new articles added to the news store")
+
 with open(output_filename, 'w', encoding='utf-8') as f:
     json.dump(output_data, f, indent=2, ensure_ascii=False)
 
@@ -0,0 +1,259 @@
+# news_store.py
+
+import csv
+import sqlite3
+from datetime import datetime, timezone
+
+from near_duplicates import NearDuplicateIndex
+
+NEWS_DB = "news.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    datetime INTEGER NOT NULL,
+    headline TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL DEFAULT '',
+    sentiment TEXT,
+    event_type TEXT,
+    label_key TEXT
+);
+CREATE TABLE IF NOT EXISTS article_symbols (
+    symbol TEXT NOT NULL,
+    datetime INTEGER NOT NULL,
+    article_id INTEGER NOT NULL REFERENCES articles(id),
+    PRIMARY KEY (symbol, datetime, article_id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    headline, summary, content='articles', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, headline, summary) VALUES (new.id, new.headline, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, headline, summary) VALUES ('delete', old.id, old.headline, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF headline, summary ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, headline, summary) VALUES ('delete', old.id, old.headline, old.summary);
+    INSERT INTO articles_fts(rowid, headline, summary) VALUES (new.id, new.headline, new.summary);
+END;
+"""
+
+ROW_COLUMNS = ["Datetime", "Headline", "Summary", "URL", "Source", "Sentiment", "EventType"]
+
+
+def to_epoch(value):
+    """Coerce an int, datetime, date, ISO string or news CSV 'YYYY-MM-DD HH:MM:SS UTC' string to UTC epoch seconds"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        # Finnhub occasionally returns a zero timestamp, written out as "1-01-01" with an unpadded year
+        year, _, rest = value.replace(" UTC", "").strip().partition("-")
+        value = datetime.fromisoformat(f"{year.zfill(4)}-{rest}")
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def format_epoch(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')
+
+
+class NewsStore:
+    """SQLite article store, unique on URL and indexed on (symbol, datetime).
+
+    An article is stored once and linked to every symbol it was fetched for, so the same
+    story under two tickers is not duplicated. Headline/Summary are full-text indexed (FTS5)
+    and MinHash-clustered, so syndicated copies under different URLs share a cluster id.
+    Clustering is deferred out of the upsert path: new articles are indexed in batches the
+    next time cluster ids are read.
+    """
+
+    def __init__(self, path=NEWS_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Databases created before labels recorded the classifier that produced them
+        if "label_key" not in {r[1] for r in self.conn.execute("PRAGMA table_info(articles)")}:
+            self.conn.execute("ALTER TABLE articles ADD COLUMN label_key TEXT")
+        self.near_duplicates = NearDuplicateIndex(self.conn)
+
+    def close(self):
+        self.conn.close()
+
+    def upsert_articles(self, symbol, articles):
+        """Insert Finnhub article dicts for symbol, skipping known URLs; returns number of new articles"""
+        return self._upsert(symbol, (
+            (article.get('datetime'), article.get('headline', ''), article.get('summary', ''),
+             article.get('url'), article.get('source', ''), None, None)
+            for article in articles
+        ))
+
+    def upsert_rows(self, symbol, rows):
+        """Insert news CSV rows (Datetime, Headline, Summary, URL, Source[, Sentiment, EventType]) for symbol"""
+        return self._upsert(symbol, (
+            (row.get("Datetime"), row.get("Headline", ""), row.get("Summary", ""), row.get("URL"),
+             row.get("Source", ""), row.get("Sentiment") or None, row.get("EventType") or None)
+            for row in rows
+        ))
+
+    def _upsert(self, symbol, records):
+        added = 0
+        with self.conn:
+            for ts, headline, summary, url, source, sentiment, event_type in records:
+                if not url or ts in (None, ""):
+                    continue
+                ts = to_epoch(ts)
+                cur = self.conn.execute(
+                    "INSERT INTO articles (datetime, headline, summary, url, source, sentiment, event_type) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(url) DO NOTHING",
+                    (ts, headline or '', summary or '', url, source or '', sentiment, event_type)
+                )
+                added += cur.rowcount
+                if sentiment or event_type:
+                    self.conn.execute(
+                        "UPDATE articles SET sentiment = COALESCE(?, sentiment), event_type = COALESCE(?, event_type) "
+                        "WHERE url = ?", (sentiment, event_type, url)
+                    )
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO article_symbols (symbol, datetime, article_id) "
+                    "SELECT ?, datetime, id FROM articles WHERE url = ?", (symbol, url)
+                )
+        return added
+
+    def import_csv(self, symbol, csv_filename):
+        """Load an existing news CSV into the store; returns number of new articles"""
+        with open(csv_filename, "r", encoding="utf-8", newline="") as f:
+            return self.upsert_rows(symbol, csv.DictReader(f))
+
+    def set_classification(self, url, sentiment, event_type, label_key=None):
+        self.set_classifications([(url, sentiment, event_type)], label_key)
+
+    def set_classifications(self, labels, label_key=None):
+        """Bulk-update (url, sentiment, event_type[, label_key]) tuples in one transaction.
+
+        label_key names the classifier (model and prompt version, "+local" for the local model)
+        that produced the labels; tuples without their own key get the label_key argument.
+        Only labels under one of the caller's current keys are reused by cluster_labels.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE articles SET sentiment = ?, event_type = ?, label_key = ? WHERE url = ?",
+                [(row[1], row[2], row[3] if len(row) > 3 else label_key, row[0]) for row in labels]
+            )
+
+    def cluster_ids(self, urls):
+        """{url: near-duplicate cluster id} for stored articles, indexing any new ones first"""
+        self.near_duplicates.index_missing()
+        urls = list(urls)
+        out = {}
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            out.update(self.conn.execute(
+                "SELECT a.url, m.cluster_id FROM articles a JOIN article_minhash m ON m.article_id = a.id "
+                f"WHERE a.url IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return out
+
+    def cluster_labels(self, cluster_ids, label_keys):
+        """{cluster id: (sentiment, event_type, label_key)} for clusters with a member classified under one of label_keys"""
+        cluster_ids, label_keys = list(cluster_ids), list(label_keys)
+        out = {}
+        for i in range(0, len(cluster_ids), 500):
+            chunk = cluster_ids[i:i + 500]
+            for cluster_id, sentiment, event_type, label_key in self.conn.execute(
+                "SELECT m.cluster_id, a.sentiment, a.event_type, a.label_key FROM article_minhash m "
+                "JOIN articles a ON a.id = m.article_id "
+                f"WHERE m.cluster_id IN ({','.join('?' * len(chunk))}) "
+                f"AND a.label_key IN ({','.join('?' * len(label_keys))}) "
+                "AND a.sentiment IS NOT NULL ORDER BY m.article_id", chunk + label_keys
+            ):
+                out.setdefault(cluster_id, (sentiment, event_type, label_key))
+        return out
+
+    def count_clusters(self, symbol):
+        """Distinct stories for symbol, counting near-duplicate copies once"""
+        self.near_duplicates.index_missing()
+        return self.conn.execute(
+            "SELECT COUNT(DISTINCT m.cluster_id) FROM article_symbols s "
+            "JOIN article_minhash m ON m.article_id = s.article_id WHERE s.symbol = ?", (symbol,)
+        ).fetchone()[0]
+
+    def count(self, symbol):
+        return self.conn.execute("SELECT COUNT(*) FROM article_symbols WHERE symbol = ?", (symbol,)).fetchone()[0]
+
+    def urls(self, symbol):
+        return {r[0] for r in self.conn.execute(
+            "SELECT a.url FROM article_symbols s JOIN articles a ON a.id = s.article_id WHERE s.symbol = ?", (symbol,)
+        )}
+
+    def query_range(self, symbol, start=None, end=None):
+        """Articles for symbol with start <= datetime < end, oldest first, as news CSV-style dicts"""
+        start = to_epoch(start) if start is not None else 0
+        end = to_epoch(end) if end is not None else 2 ** 62
+        rows = self.conn.execute(
+            "SELECT a.datetime, a.headline, a.summary, a.url, a.source, a.sentiment, a.event_type "
+            "FROM article_symbols s JOIN articles a ON a.id = s.article_id "
+            "WHERE s.symbol = ? AND s.datetime >= ? AND s.datetime < ? ORDER BY s.datetime, s.article_id",
+            (symbol, start, end)
+        )
+        return [_row_dict(r) for r in rows]
+
+    def iter_range(self, symbol, start=None, end=None, after=None, page_size=1000, unlabelled_for=None):
+        """Stream the rows of query_range page by page, optionally resuming after a row.
+
+        `after` is the (Datetime, URL) of the last row already handled: iteration continues
+        with the row that followed it, however many rows were inserted before it since.
+        With unlabelled_for=<label keys> only rows not yet classified under one of them are returned.
+        Pages are fetched by keyset on (datetime, article_id), so memory stays bounded and
+        the connection is free for writes between pages.
+        """
+        start = to_epoch(start) if start is not None else 0
+        end = to_epoch(end) if end is not None else 2 ** 62
+        last_ts, last_id = start, -1
+        if after is not None:
+            found = self.conn.execute("SELECT id FROM articles WHERE url = ?", (after[1],)).fetchone()
+            # An unknown URL can't be placed within its second, so resume after the whole second
+            last_ts, last_id = max((last_ts, last_id), (to_epoch(after[0]), found[0] if found else 2 ** 62))
+        select = ("SELECT a.datetime, a.headline, a.summary, a.url, a.source, a.sentiment, a.event_type, s.article_id "
+                  "FROM article_symbols s JOIN articles a ON a.id = s.article_id ")
+        label_filter, label_params = "", ()
+        if unlabelled_for is not None:
+            label_params = tuple(unlabelled_for)
+            label_filter = f"AND (a.label_key IS NULL OR a.label_key NOT IN ({','.join('?' * len(label_params))})) "
+        while True:
+            rows = self.conn.execute(
+                select + "WHERE s.symbol = ? AND s.datetime < ? AND (s.datetime, s.article_id) > (?, ?) "
+                + label_filter + "ORDER BY s.datetime, s.article_id LIMIT ?",
+                (symbol, end, last_ts, last_id, *label_params, page_size)
+            ).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield _row_dict(r)
+            last_ts, last_id = rows[-1][0], rows[-1][7]
+
+    def search(self, query, symbol=None, limit=50):
+        """Full-text search over Headline/Summary, best matches first"""
+        sql = ("SELECT a.datetime, a.headline, a.summary, a.url, a.source, a.sentiment, a.event_type "
+               "FROM articles_fts f JOIN articles a ON a.id = f.rowid ")
+        params = [query]
+        if symbol:
+            sql += "JOIN article_symbols s ON s.article_id = a.id AND s.symbol = ? "
+            params.insert(0, symbol)
+        sql += "WHERE articles_fts MATCH ? ORDER BY f.rank LIMIT ?"
+        params.append(limit)
+        return [_row_dict(r) for r in self.conn.execute(sql, params)]
+
+
+def _row_dict(r):
+    return dict(zip(ROW_COLUMNS, [
+        format_epoch(r[0]), r[1], r[2], r[3], r[4], r[5] or "", r[6] or ""
+    ]))
@@ -0,0 +1,473 @@
+# pipeline.py
+
+import csv
+import glob
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+import metrics
+from artifacts import artifact_path, read_artifact, write_artifact
+from features import FEATURE_COLUMNS, compute_price_features, join_features
+from news_store import ROW_COLUMNS, NewsStore
+from price_cache import get_daily_bars, load_bars
+from price_join import asof_join
+
+STATE_PATH = "pipeline_state.json"
+CONFIG = {
+    "db": "news.db",
+    "start": "2025-01-01",
+    "end": None,  # exclusive; None runs through today
+    "api_key": "",  # Alpha Vantage, see price_cache
+    "finnhub_api_key": "",  # empty: only import the existing {symbol}_finnhub_news*.csv files
+    "price_policy": "same_session",
+    "market_tz": "UTC",
+}
+ALL = "all"  # partition of stages that are not split by month
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Calendar days of bars around a month that its rows can depend on: the as-of join looks a few
+# sessions either side, the 20-day SMA about a month back
+JOIN_MARGIN = timedelta(days=10)
+FEATURE_LOOKBACK = timedelta(days=45)
+
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, default=str, separators=(",", ":")).encode()).hexdigest()
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def tree_digest(path):
+    """Digest of the file contents under a directory, independent of file names (Parquet part names are random)"""
+    return _digest(sorted(
+        file_digest(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    ))
+
+
+def _end(config):
+    return config["end"] or (datetime.now(timezone.utc).date() + timedelta(days=1)).isoformat()
+
+
+def news_digests(store, symbol, config, columns=ROW_COLUMNS):
+    """{YYYY-MM: digest of the symbol's stored rows in that month}, over the given columns only"""
+    hashes = {}
+    for row in store.iter_range(symbol, config["start"], _end(config)):
+        h = hashes.setdefault(row["Datetime"][:7], hashlib.sha256())
+        h.update("\x1f".join(row[c] for c in columns).encode())
+        h.update(b"\x1e")
+    return {month: h.hexdigest() for month, h in hashes.items()}
+
+
+def bars_digest(bars, start, end):
+    """Digest of the daily bars dated within [start, end]"""
+    window = bars.loc[pd.Timestamp(start.date()):pd.Timestamp(end.date())]
+    h = hashlib.sha256(window.index.values.astype("datetime64[D]").astype("int32").tobytes())
+    for col in ("Open", "Close"):
+        h.update(window[col].to_numpy(dtype="float32").tobytes())
+    return h.hexdigest()
+
+
+def month_bounds(month):
+    start = datetime.strptime(month, "%Y-%m")
+    return start, (pd.Timestamp(start) + pd.offsets.MonthEnd(1)).to_pydatetime()
+
+
+def partition_path(name, symbol, month):
+    return os.path.join(artifact_path(name), f"Symbol={symbol}", f"Month={month}")
+
+
+def artifact_months(name, symbol):
+    """Months written for symbol in a partitioned artifact"""
+    symbol_dir = os.path.join(artifact_path(name), f"Symbol={symbol}")
+    if not os.path.isdir(symbol_dir):
+        return []
+    return sorted(d.split("=", 1)[1] for d in os.listdir(symbol_dir) if d.startswith("Month="))
+
+
+class Stage:
+    """One step of the pipeline DAG, run per symbol and partition (ALL or a YYYY-MM month).
+
+    fingerprint(symbol, config) returns {partition: value} describing everything the
+    partition is built from. Its key is sha256(name, code, value), where code covers the
+    stage functions and the modules listed in `code`; a partition reruns only when its key
+    differs from the one recorded after its last successful run or its `output` path is gone.
+    run(jobs, config) rebuilds the stale partitions in jobs = {symbol: [partition, ...]}.
+    `parallel` stages are CPU-bound and fan out by symbol across worker processes; the rest
+    call rate-limited APIs and run in this process, so every symbol shares one limiter.
+    """
+
+    def __init__(self, name, fingerprint, run, deps=(), code=(), output=None, parallel=False):
+        self.name = name
+        self.fingerprint = fingerprint
+        self.run = run
+        self.deps = tuple(deps)
+        self.code = tuple(code)
+        self.output = output
+        self.parallel = parallel
+        self._code_digest = None
+
+    def code_digest(self):
+        if self._code_digest is None:
+            functions = [inspect.getsource(f) for f in (self.fingerprint, self.run, self.output) if f is not None]
+            self._code_digest = _digest(functions, [file_digest(os.path.join(SOURCE_DIR, f)) for f in self.code])
+        return self._code_digest
+
+    def plan(self, symbol, recorded, config):
+        """({partition: key} for every partition of symbol, [stale partitions])"""
+        code = self.code_digest()
+        keys = {p: _digest(self.name, code, value) for p, value in self.fingerprint(symbol, config).items()}
+        stale = [p for p, key in keys.items()
+                 if recorded.get(p) != key or (self.output and not os.path.exists(self.output(symbol, p, config)))]
+        return keys, stale
+
+
+# --- news: Finnhub delta fetch (when configured) and legacy CSV import into the news store ---
+
+def _news_csvs(symbol):
+    return sorted(glob.glob(f"{symbol}_finnhub_news*.csv"))
+
+
+def news_fingerprint(symbol, config):
+    # A moving end date means new days to fetch, so with Finnhub on this reruns once a day
+    return {ALL: [config["start"], _end(config), bool(config["finnhub_api_key"]),
+                  [(path, file_digest(path)) for path in _news_csvs(symbol)]]}
+
+
+def news_run(jobs, config):
+    store = NewsStore(config["db"])
+    try:
+        if config["finnhub_api_key"]:
+            import finnhub
+            from finnhub_backfill import AdaptiveWindowPlanner
+            from ingest_state import IngestState, ingest
+            ingest(finnhub.Client(api_key=config["finnhub_api_key"]), list(jobs),
+                   datetime.fromisoformat(config["start"]), datetime.now(timezone.utc),
+                   lambda symbol: f"{symbol}_finnhub_news.csv",
+                   state=IngestState(), planner=AdaptiveWindowPlanner(), store=store)
+        for symbol in jobs:
+            for path in _news_csvs(symbol):
+                store.import_csv(symbol, path)
+    finally:
+        store.close()
+
+
+# --- prices: incremental daily bar refresh (price_cache) ---
+
+def prices_fingerprint(symbol, config):
+    # price_cache only calls out when it lacks the latest session, so once a day is enough
+    return {ALL: datetime.now(timezone.utc).date().isoformat()}
+
+
+def prices_run(jobs, config):
+    for symbol in jobs:
+        get_daily_bars(symbol, config["api_key"])
+
+
+# --- classify: label articles not yet labelled by the current model and prompt, one LLM call per
+# near-duplicate cluster (llmContext) ---
+
+def _label_keys():
+    from llmContext import current_label_keys, local_model_path, use_local_model
+
+    return current_label_keys(use_local_model and os.path.exists(local_model_path))
+
+
+def classify_fingerprint(symbol, config):
+    keys = _label_keys()
+    store = NewsStore(config["db"])
+    try:
+        months = news_digests(store, symbol, config, columns=["Headline", "Summary", "URL"])
+        # Counting rows not yet labelled under keys replans a month whose last run left some unanswered
+        pending = {}
+        for row in store.iter_range(symbol, config["start"], _end(config), unlabelled_for=keys):
+            pending[row["Datetime"][:7]] = pending.get(row["Datetime"][:7], 0) + 1
+    finally:
+        store.close()
+    return {month: [digest, keys, pending.get(month, 0)] for month, digest in months.items()}
+
+
+def classify_run(jobs, config, chunk_size=200):
+    from classification_cache import ClassificationCache
+    from llmContext import (MODEL_NAME, PROMPT_VERSION, classify_by_cluster, classify_many, current_label_keys,
+                            keyed_classifier, local_model_path, use_local_model)
+
+    cache = ClassificationCache(MODEL_NAME, PROMPT_VERSION)
+    local_model = None
+    if use_local_model and os.path.exists(local_model_path):
+        from local_classifier import LocalClassifier
+        local_model = LocalClassifier.load(local_model_path)
+    keys = current_label_keys(local_model is not None)
+    classify = keyed_classifier(lambda summaries: classify_many(summaries, cache=cache), local_model)
+
+    store = NewsStore(config["db"])
+    try:
+        for symbol, months in jobs.items():
+            months = set(months)
+            # Rows labelled by another model or prompt version are redone, not kept
+            rows = [row for row in store.iter_range(symbol, config["start"], _end(config), unlabelled_for=keys)
+                    if row["Datetime"][:7] in months]
+            for i in range(0, len(rows), chunk_size):
+                chunk = rows[i:i + chunk_size]
+                labels, _ = classify_by_cluster(chunk, store, classify, keys)
+                store.set_classifications(
+                    (row["URL"], *row_labels) for row, row_labels in zip(chunk, labels) if row_labels is not None
+                )
+    finally:
+        store.close()
+
+
+# --- news_with_prices: as-of join of classified articles to daily bars (openClose) ---
+
+def news_with_prices_fingerprint(symbol, config):
+    store = NewsStore(config["db"])
+    try:
+        months = news_digests(store, symbol, config)
+    finally:
+        store.close()
+    bars = load_bars(symbol)
+    out = {}
+    for month, rows in months.items():
+        start, end = month_bounds(month)
+        out[month] = [rows, bars_digest(bars, start - JOIN_MARGIN, end + JOIN_MARGIN),
+                      config["price_policy"], config["market_tz"]]
+    return out
+
+
+def news_with_prices_output(symbol, month, config):
+    return partition_path("news_with_prices", symbol, month)
+
+
+def news_with_prices_run(jobs, config):
+    store = NewsStore(config["db"])
+    try:
+        for symbol, months in jobs.items():
+            months = set(months)
+            news = pd.DataFrame(
+                [row for row in store.iter_range(symbol, config["start"], _end(config)) if row["Datetime"][:7] in months],
+                columns=ROW_COLUMNS
+            )
+            enriched = asof_join(news, load_bars(symbol), policy=config["price_policy"], market_tz=config["market_tz"])
+            # Only the months present are replaced on disk
+            write_artifact(enriched, "news_with_prices", symbol)
+    finally:
+        store.close()
+
+
+# --- features: per-trading-day returns, volatility and SMAs joined to articles (returns_vola_ma) ---
+
+def features_fingerprint(symbol, config):
+    bars = load_bars(symbol)
+    out = {}
+    for month in artifact_months("news_with_prices", symbol):
+        start, end = month_bounds(month)
+        out[month] = [tree_digest(partition_path("news_with_prices", symbol, month)),
+                      bars_digest(bars, start - FEATURE_LOOKBACK, end)]
+    return out
+
+
+def features_output(symbol, month, config):
+    return partition_path("news_returns_vola_ma", symbol, month)
+
+
+def features_run(jobs, config):
+    for symbol, months in jobs.items():
+        news = read_artifact("news_with_prices", symbol, columns=["URL", "Datetime", "Price Date"], months=months)
+        news["Symbol"] = symbol
+        bars = load_bars(symbol)
+        daily = pd.DataFrame({
+            "Symbol": symbol,
+            "Price Date": bars.index,
+            "Open": bars["Open"].to_numpy(dtype="float64"),
+            "Close": bars["Close"].to_numpy(dtype="float64"),
+        })
+        enriched = join_features(news, compute_price_features(daily))
+        write_artifact(enriched[["URL", "Datetime", "Price Date"] + FEATURE_COLUMNS], "news_returns_vola_ma", symbol)
+
+
+# --- sentiment_csv: flat CSV export of the classified articles (jsonToCsv) ---
+
+def sentiment_csv_fingerprint(symbol, config):
+    store = NewsStore(config["db"])
+    try:
+        return {ALL: sorted(news_digests(store, symbol, config).items())}
+    finally:
+        store.close()
+
+
+def sentiment_csv_output(symbol, partition, config):
+    # Not {symbol}_finnhub_with_sentiment_event.csv: that is jsonToCsv's LLM-labelled output and a
+    # local_classifier training file, which an export of mixed local/LLM labels must not overwrite
+    return f"{symbol}_pipeline_with_sentiment_event.csv"
+
+
+def sentiment_csv_run(jobs, config):
+    store = NewsStore(config["db"])
+    try:
+        for symbol in jobs:
+            path = sentiment_csv_output(symbol, ALL, config)
+            with open(path + ".tmp", "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=ROW_COLUMNS)
+                writer.writeheader()
+                writer.writerows(store.iter_range(symbol, config["start"], _end(config)))
+            os.replace(path + ".tmp", path)
+    finally:
+        store.close()
+
+
+STAGES = [
+    Stage("news", news_fingerprint, news_run, code=["ingest_state.py", "finnhub_backfill.py", "news_store.py"]),
+    Stage("prices", prices_fingerprint, prices_run, code=["price_cache.py"]),
+    Stage("classify", classify_fingerprint, classify_run, deps=["news"],
+          code=["llmContext.py", "local_classifier.py", "classification_cache.py"]),
+    Stage("news_with_prices", news_with_prices_fingerprint, news_with_prices_run, deps=["classify", "prices"],
+          code=["price_join.py", "artifacts.py"], output=news_with_prices_output, parallel=True),
+    Stage("features", features_fingerprint, features_run, deps=["news_with_prices"],
+          code=["features.py", "artifacts.py"], output=features_output, parallel=True),
+    Stage("sentiment_csv", sentiment_csv_fingerprint, sentiment_csv_run, deps=["classify"],
+          output=sentiment_csv_output, parallel=True),
+]
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+
+def ordered(stages):
+    """Stages in dependency order; raises ValueError on unknown deps or cycles"""
+    by_name = {stage.name: stage for stage in stages}
+    order, visiting, done = [], set(), set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"dependency cycle through {stage.name}")
+        visiting.add(stage.name)
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"{stage.name} depends on unknown stage {dep}")
+            visit(by_name[dep])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return order
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_PATH):
+    """Atomically write {stage: {symbol: {partition: key}}}"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _refresh_symbol(stage_name, symbol, recorded, config):
+    """Worker entry point: plan one symbol of a parallel stage and rebuild its stale partitions"""
+    stage = STAGES_BY_NAME[stage_name]
+    with metrics.timer("stage_plan_seconds", stage=stage_name):
+        keys, stale = stage.plan(symbol, recorded, config)
+    if stale:
+        with metrics.timer("stage_run_seconds", stage=stage_name):
+            stage.run({symbol: stale}, config)
+    # Hand this task's metrics to the parent and start the next task from zero
+    snap = metrics.snapshot()
+    metrics.reset()
+    return keys, len(stale), snap
+
+
+def run_pipeline(symbols, stages=STAGES, config=CONFIG, state_path=STATE_PATH, max_workers=None):
+    """Bring every stage up to date for symbols, rebuilding only partitions whose inputs or code changed.
+
+    Keys are recorded per (stage, symbol, partition) only after the partition was rebuilt, so
+    an interrupted or failed run redoes just the unfinished work. A symbol that fails a stage
+    is skipped by the stages depending on it. Returns {stage: (rebuilt, total partitions)}.
+    """
+    state = load_state(state_path)
+    failed = {}  # symbol -> stage names that failed for it
+    summary = {}
+    pool = None
+    try:
+        for stage in ordered(stages):
+            recorded = state.setdefault(stage.name, {})
+            blocked = {s for s in symbols if any(dep in failed.get(s, ()) for dep in stage.deps)}
+            todo = [s for s in symbols if s not in blocked]
+            for symbol in blocked:
+                failed.setdefault(symbol, set()).add(stage.name)
+            rebuilt = total = 0
+            started = time.perf_counter()
+            if stage.parallel and max_workers != 1 and len(todo) > 1:
+                # Forked workers start with a copy of this process's metrics; clear it so nothing is counted twice
+                pool = pool or ProcessPoolExecutor(max_workers=max_workers, initializer=metrics.reset)
+                futures = {pool.submit(_refresh_symbol, stage.name, s, recorded.get(s, {}), config): s for s in todo}
+                for future in as_completed(futures):
+                    symbol = futures[future]
+                    try:
+                        keys, stale, snap = future.result()
+                    except Exception as e:
+                        print(f"{stage.name} failed for {symbol}: {e}")
+                        failed.setdefault(symbol, set()).add(stage.name)
+                        continue
+                    metrics.merge(snap)
+                    recorded[symbol] = keys
+                    rebuilt, total = rebuilt + stale, total + len(keys)
+            else:
+                plans = {}
+                for symbol in todo:
+                    try:
+                        with metrics.timer("stage_plan_seconds", stage=stage.name):
+                            plans[symbol] = stage.plan(symbol, recorded.get(symbol, {}), config)
+                    except Exception as e:
+                        print(f"{stage.name} failed for {symbol}: {e}")
+                        failed.setdefault(symbol, set()).add(stage.name)
+                jobs = {symbol: stale for symbol, (_, stale) in plans.items() if stale}
+                try:
+                    if jobs:
+                        with metrics.timer("stage_run_seconds", stage=stage.name):
+                            stage.run(jobs, config)
+                except Exception as e:
+                    print(f"{stage.name} failed for {len(jobs)} symbols: {e}")
+                    for symbol in jobs:
+                        failed.setdefault(symbol, set()).add(stage.name)
+                for symbol, (keys, stale) in plans.items():
+                    if stage.name not in failed.get(symbol, ()):
+                        recorded[symbol] = keys
+                        rebuilt, total = rebuilt + len(stale), total + len(keys)
+            save_state(state, state_path)
+            summary[stage.name] = (rebuilt, total)
+            metrics.observe("stage_seconds", time.perf_counter() - started, stage=stage.name)
+            metrics.inc("partitions_rebuilt_total", rebuilt, stage=stage.name)
+            metrics.inc("partitions_total", total, stage=stage.name)
+            print(f"{stage.name}: rebuilt {rebuilt}/{total} partitions for {len(todo)} symbols "
+                  f"in {time.perf_counter() - started:.1f}s")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        save_state(state, state_path)
+    return summary
+
+
+if __name__ == "__main__":
+    # e.g. `python pipeline.py DNA AAPL`; rerunning skips everything whose inputs are unchanged.
+    # METRICS=1 METRICS_REPORT=pipeline_report.json adds stage timings, API calls, throttling
+    # sleeps and cache hit rates (see metrics.py)
+    run_pipeline(sys.argv[1:] or ["DNA"])
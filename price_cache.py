@@ -0,0 +1,216 @@
+# price_cache.py
+
+import os
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import requests
+
+import metrics
+from rate_limit import QuotaExhausted, Throttled, call_with_retry
+
+CACHE_DIR = "price_cache"
+ALPHA_URL = "https://www.alphavantage.co/query"
+# TIME_SERIES_DAILY compact returns the last 100 bars; older gaps need outputsize=full
+ALPHA_COMPACT_BARS = 100
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+# A daily bar is only final once its session has closed; providers can lag the close a little
+MARKET_TZ = ZoneInfo("America/New_York")
+SESSION_CLOSE = time(16, 0)
+SETTLE_GRACE = timedelta(minutes=30)
+# How often a still-forming bar (or a session with no bar yet) is refetched
+PARTIAL_REFRESH = timedelta(minutes=15)
+
+
+def cache_path(symbol, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{symbol.upper()}_1d.npz")
+
+
+def _empty_bars():
+    return pd.DataFrame(
+        {col: pd.Series(dtype="float32") for col in OHLCV[:-1]} | {"Volume": pd.Series(dtype="int64")},
+        index=pd.DatetimeIndex([], name="Date"),
+    )
+
+
+def load_bars(symbol, cache_dir=CACHE_DIR):
+    """Cached daily OHLCV for symbol as a DataFrame indexed by date (empty if never fetched)"""
+    bars, _, _ = _load(symbol, cache_dir)
+    return bars
+
+
+def _load(symbol, cache_dir):
+    """(bars, checked_at, settled): when the cache was last refreshed and the last date known final.
+
+    Files written before `settled` was recorded load with settled=None, so their bars get
+    refetched once in full.
+    """
+    path = cache_path(symbol, cache_dir)
+    if not os.path.exists(path):
+        return _empty_bars(), None, None
+    with np.load(path) as npz:
+        index = pd.DatetimeIndex(npz["dates"].astype("datetime64[D]"), name="Date")
+        bars = pd.DataFrame({col: npz[col.lower()] for col in OHLCV}, index=index)
+        checked_at = None
+        if "checked_at" in npz.files:
+            checked_at = datetime.fromtimestamp(int(npz["checked_at"]), timezone.utc)
+        elif "checked" in npz.files:
+            day = npz["checked"].astype("datetime64[D]").item()
+            checked_at = datetime.combine(day, time(0), timezone.utc)
+        settled = None
+        if "settled" in npz.files and int(npz["settled"]) >= 0:
+            settled = npz["settled"].astype("datetime64[D]").item()
+    return bars, checked_at, settled
+
+
+def _save(symbol, bars, checked_at, settled, cache_dir):
+    """Write bars as int32 day numbers, float32 prices and int64 volume, atomically"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(symbol, cache_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            dates=bars.index.values.astype("datetime64[D]").astype("int32"),
+            open=bars["Open"].to_numpy(dtype="float32"),
+            high=bars["High"].to_numpy(dtype="float32"),
+            low=bars["Low"].to_numpy(dtype="float32"),
+            close=bars["Close"].to_numpy(dtype="float32"),
+            volume=bars["Volume"].fillna(0).to_numpy(dtype="int64"),
+            checked_at=np.array(int(checked_at.timestamp()), dtype="int64"),
+            settled=np.array(-1 if settled is None else np.datetime64(settled, "D").astype("int32")),
+        )
+    os.replace(tmp_path, path)
+
+
+def _alpha_vantage_get(params):
+    resp = requests.get(ALPHA_URL, params=params, timeout=30)
+    resp.raise_for_status()
+    data = resp.json()
+    # Rate limiting comes back as 200 with a Note (per minute) or Information (per day)
+    if "Note" in data:
+        raise Throttled(data["Note"], retry_after=60)
+    if "Information" in data and "Time Series (Daily)" not in data:
+        raise QuotaExhausted(data["Information"])
+    return data
+
+
+def fetch_alpha_vantage(symbol, since, api_key):
+    """Daily bars after `since` (a date, or None for full history) from Alpha Vantage"""
+    today = datetime.now(timezone.utc).date()
+    compact = since is not None and (today - since).days < ALPHA_COMPACT_BARS
+    params = {
+        "function": "TIME_SERIES_DAILY",
+        "symbol": symbol,
+        "apikey": api_key,
+        "outputsize": "compact" if compact else "full",
+    }
+    # One retry at most: on failure refresh() falls back to the next provider instead of waiting
+    data = call_with_retry("alpha_vantage", _alpha_vantage_get, params, max_retries=1)
+    series = data.get("Time Series (Daily)")
+    if series is None:
+        raise RuntimeError(data.get("Error Message") or "no data")
+    df = pd.DataFrame.from_dict(series, orient="index")
+    bars = pd.DataFrame({
+        "Open": pd.to_numeric(df["1. open"]),
+        "High": pd.to_numeric(df["2. high"]),
+        "Low": pd.to_numeric(df["3. low"]),
+        "Close": pd.to_numeric(df["4. close"]),
+        "Volume": pd.to_numeric(df["5. volume"]),
+    })
+    bars.index = pd.to_datetime(bars.index)
+    return bars
+
+
+def fetch_yfinance(symbol, since, api_key=None):
+    """Daily bars after `since` (a date, or None for full history) from Yahoo Finance"""
+    import yfinance as yf
+
+    ticker = yf.Ticker(symbol)
+    if since is None:
+        hist = call_with_retry("yahoo", ticker.history, period="max", interval="1d", auto_adjust=False, max_retries=2)
+    else:
+        hist = call_with_retry("yahoo", ticker.history, start=(since + timedelta(days=1)).isoformat(),
+                               interval="1d", auto_adjust=False, max_retries=2)
+    bars = hist[OHLCV].copy()
+    bars.index = pd.DatetimeIndex(bars.index).tz_localize(None).normalize()
+    return bars
+
+
+PROVIDERS = [("alpha_vantage", fetch_alpha_vantage), ("yfinance", fetch_yfinance)]
+
+
+def _last_session(today):
+    """Most recent weekday on or before today; holidays are handled by the once-after-close check"""
+    while today.weekday() >= 5:
+        today -= timedelta(days=1)
+    return today
+
+
+def _session_close(day):
+    """UTC time after which day's bar is treated as final"""
+    return datetime.combine(day, SESSION_CLOSE, MARKET_TZ).astimezone(timezone.utc) + SETTLE_GRACE
+
+
+def _settled_through(bars, now):
+    """Last cached date whose session had closed by now (only the newest bar can still be forming)"""
+    for ts in bars.index[-2:][::-1]:
+        if _session_close(ts.date()) <= now:
+            return ts.date()
+    return None
+
+
+def _is_fresh(last_cached, settled, checked_at, now):
+    if last_cached is None or checked_at is None:
+        return False
+    today = now.astimezone(MARKET_TZ).date()
+    final = settled is not None and settled >= last_cached
+    if final and last_cached >= _last_session(today):
+        return True
+    if now - checked_at < PARTIAL_REFRESH:
+        return True
+    # Last bar is final and today's bar can't be either until the close: one look after it is enough
+    close = _session_close(today)
+    checked_today = checked_at.astimezone(MARKET_TZ).date() == today
+    return final and checked_today and (now < close or checked_at >= close)
+
+
+def refresh(symbol, api_key="", providers=PROVIDERS, cache_dir=CACHE_DIR, force=False, now=None):
+    """Fetch only bars after the last final cached date, trying providers in order.
+
+    A bar fetched before its session closed is partial: it is refetched (at most every
+    PARTIAL_REFRESH) and overwritten until a fetch after the close makes it final. No
+    request is made when the cache already holds the latest session's final bar.
+    Returns the number of network calls made.
+    """
+    bars, checked_at, settled = _load(symbol, cache_dir)
+    now = now or datetime.now(timezone.utc)
+    last_cached = bars.index[-1].date() if len(bars) else None
+    if not force and _is_fresh(last_cached, settled, checked_at, now):
+        metrics.inc("cache_lookups_total", cache="daily_bars", result="hit")
+        return 0
+    metrics.inc("cache_lookups_total", cache="daily_bars", result="miss")
+
+    calls = 0
+    for name, fetch in providers:
+        calls += 1
+        try:
+            new_bars = fetch(symbol, settled, api_key)
+        except Exception as e:
+            print(f"{name} failed for {symbol}: {e}")
+            continue
+        if settled is not None:
+            new_bars = new_bars[new_bars.index > pd.Timestamp(settled)]
+        bars = pd.concat([bars, new_bars[OHLCV]])
+        bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+        _save(symbol, bars, now, _settled_through(bars, now), cache_dir)
+        return calls
+    return calls
+
+
+def get_daily_bars(symbol, api_key="", cache_dir=CACHE_DIR):
+    """Refresh the symbol's cache if needed and return its daily OHLCV bars"""
+    refresh(symbol, api_key, cache_dir=cache_dir)
+    return load_bars(symbol, cache_dir)
@@ -0,0 +1,64 @@
+# price_join.py
+
+import numpy as np
+import pandas as pd
+
+POLICIES = ("previous_close", "next_open", "same_session")
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+SESSION_CLOSE = pd.Timedelta(hours=16)
+
+
+def _news_timestamps(values):
+    ts = values
+    if not pd.api.types.is_datetime64_any_dtype(ts):
+        ts = pd.Series(values).astype(str).str.replace(" UTC", "", regex=False)
+    ts = pd.to_datetime(ts, errors="coerce", utc=True)
+    return pd.DatetimeIndex(ts).as_unit("ns")
+
+
+def asof_join(news, prices, policy="previous_close", time_column="Datetime", market_tz="America/New_York"):
+    """Attach Open, Close and Price Date from the daily series to every news row in one pass.
+
+    `prices` must be indexed by session date (see price_cache.get_daily_bars); it is sorted once
+    and each policy is a single binary search over all rows:
+
+    - previous_close: the latest session that had closed (16:00 market time) by the news time
+    - next_open: the first session opening (09:30 market time) at or after the news time
+    - same_session: the session on the news' calendar date in market_tz, or the latest one
+      before it when that date has no bar
+
+    Rows with no matching session get NaN prices and NaT Price Date.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+    prices = prices.sort_index()
+    out = news.copy()
+    news_ts = _news_timestamps(news[time_column])
+    valid = ~news_ts.isna()
+    news_ns = news_ts.asi8
+
+    # Compare raw int64 values, so both sides must share one resolution
+    session_dates = pd.DatetimeIndex(prices.index).normalize().tz_localize(None).as_unit("ns")
+    if policy == "same_session":
+        news_day = news_ts.tz_convert(market_tz).tz_localize(None).normalize()
+        idx = np.searchsorted(session_dates.asi8, news_day.asi8, side="right") - 1
+    else:
+        local_sessions = session_dates.tz_localize(market_tz, nonexistent="shift_forward", ambiguous="NaT")
+        if policy == "previous_close":
+            close_ns = (local_sessions + SESSION_CLOSE).tz_convert("UTC").asi8
+            idx = np.searchsorted(close_ns, news_ns, side="right") - 1
+        else:
+            open_ns = (local_sessions + SESSION_OPEN).tz_convert("UTC").asi8
+            idx = np.searchsorted(open_ns, news_ns, side="left")
+
+    matched = valid & (idx >= 0) & (idx < len(prices))
+    safe_idx = np.where(matched, idx, 0)
+    if len(prices):
+        out["Open"] = np.where(matched, prices["Open"].to_numpy(dtype=float)[safe_idx], np.nan)
+        out["Close"] = np.where(matched, prices["Close"].to_numpy(dtype=float)[safe_idx], np.nan)
+        out["Price Date"] = pd.DatetimeIndex(np.where(matched, session_dates.values[safe_idx], np.datetime64("NaT")))
+    else:
+        out["Open"] = np.nan
+        out["Close"] = np.nan
+        out["Price Date"] = pd.NaT
+    return out
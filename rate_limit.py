@@ -0,0 +1,216 @@
+# rate_limit.py
+
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+import metrics
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilling `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then take them; returns the seconds spent waiting.
+
+        Requests above capacity wait for a full bucket.
+        """
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """TokenBucket whose rate follows server feedback (AIMD).
+
+    Each success adds about `increase` requests/s per second of traffic; each throttling
+    response (429/503) multiplies the rate by `decrease` and empties the bucket.
+    """
+
+    def __init__(self, rate, min_rate=0.5, max_rate=None, increase=0.5, decrease=0.5, capacity=None):
+        super().__init__(rate, capacity)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate if max_rate is not None else rate * 4)
+        self.increase = float(increase)
+        self.decrease = float(decrease)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = 0.0
+
+
+# Failures worth another attempt without an HTTP status: connection resets, timeouts and DNS errors.
+# requests' (and curl_cffi's) exceptions are OSErrors too.
+TRANSIENT_ERRORS = (OSError,)
+
+
+class Throttled(RuntimeError):
+    """Raised by a fetcher when a provider signals throttling in a 2xx body (e.g. Alpha Vantage's Note)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QuotaExhausted(RuntimeError):
+    """A provider's daily quota is used up; retrying today is pointless"""
+
+
+# Process-wide budgets per provider. `rate` is the starting pace in calls (or tokens) per second;
+# AIMD moves it between min_rate and max_rate. daily_quota counts calls made by this process.
+PROVIDER_BUDGETS = {
+    "finnhub": {"rate": 30, "max_rate": 30, "min_rate": 1},
+    "alpha_vantage": {"rate": 5 / 60, "max_rate": 5 / 60, "min_rate": 1 / 60, "capacity": 1, "daily_quota": 25},
+    "newsapi": {"rate": 1, "max_rate": 1, "min_rate": 0.1, "capacity": 1, "daily_quota": 100},
+    "groq_requests": {"rate": 30 / 60, "max_rate": 30 / 60, "min_rate": 1 / 60, "capacity": 4},
+    "groq_tokens": {"rate": 30000 / 60, "max_rate": 30000 / 60, "min_rate": 1000 / 60, "capacity": 5000},
+    "yahoo": {"rate": 20, "max_rate": 50, "min_rate": 1, "increase": 2},
+    "serpapi": {"rate": 1, "max_rate": 5, "min_rate": 0.1},
+}
+
+
+class ProviderLimiter:
+    """One provider's budget: an AIMD token bucket, a shared Retry-After pause and an optional daily quota"""
+
+    def __init__(self, name, rate, capacity=None, min_rate=None, max_rate=None, increase=None, daily_quota=None):
+        self.name = name
+        self.bucket = AdaptiveTokenBucket(
+            rate,
+            min_rate=min_rate if min_rate is not None else rate / 10,
+            max_rate=max_rate,
+            # Regain about 1/30 of the top rate per second, so a halving recovers in ~15 s
+            increase=increase if increase is not None else (max_rate or rate) / 30,
+            capacity=capacity,
+        )
+        self.daily_quota = daily_quota
+        self.calls_today = 0
+        self._day = time.strftime("%Y-%m-%d")
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def acquire(self, tokens=1):
+        """Wait out any Retry-After pause, take a daily-quota slot and then `tokens` from the bucket"""
+        with self._lock:
+            today = time.strftime("%Y-%m-%d")
+            if today != self._day:
+                self._day, self.calls_today = today, 0
+            if self.daily_quota is not None:
+                if self.calls_today >= self.daily_quota:
+                    raise QuotaExhausted(f"{self.name}: daily quota of {self.daily_quota} calls used")
+                self.calls_today += 1
+            pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        waited = max(pause, 0.0) + self.bucket.acquire(tokens)
+        if waited:
+            metrics.inc("rate_limit_wait_seconds_total", waited, provider=self.name)
+
+    def on_success(self):
+        self.bucket.on_success()
+
+    def on_throttle(self, retry_after=None):
+        self.bucket.on_throttle()
+        if retry_after:
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider, **overrides):
+    """The process-wide limiter for `provider`; overrides only apply when it is first created"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = ProviderLimiter(provider, **(PROVIDER_BUDGETS.get(provider, {"rate": 1}) | overrides))
+        return _limiters[provider]
+
+
+def throttle_info(exc):
+    """(throttled, retry_after seconds or None, HTTP status or None) for an exception from any client"""
+    if isinstance(exc, Throttled):
+        return True, exc.retry_after, None
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    retry_after = None
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if value:
+        try:
+            retry_after = float(value)
+        except ValueError:
+            retry_after = None
+    message = str(exc).lower()
+    throttled = status in (429, 503) or "rate limit" in message or "ratelimited" in message or "429" in message
+    return throttled, retry_after, status
+
+
+def call_with_retry(provider, fn, *args, tokens=1, max_retries=5, base_delay=1.0, max_delay=60.0,
+                    give_up=None, timed=True, retry_on=(), **kwargs):
+    """Call fn(*args, **kwargs) under the provider's limiter, retrying transient failures with jittered backoff.
+
+    Throttling responses (429/503, rate-limit messages, Throttled) slow the provider's shared
+    pace and honour Retry-After. 5xx and 408 responses, TRANSIENT_ERRORS and `retry_on` (a
+    client's own connection error types) are retried up to max_retries times. Anything else
+    (other 4xx, QuotaExhausted, bugs such as TypeError or KeyError, whatever give_up(exc)
+    accepts) is raised at once.
+    With timed=False fn records its own api_call_seconds, e.g. to leave out a wait on
+    another budget that it takes before the request.
+    """
+    limiter = get_limiter(provider) if isinstance(provider, str) else provider
+    for attempt in range(max_retries + 1):
+        limiter.acquire(tokens)
+        metrics.inc("api_calls_total", provider=limiter.name)
+        try:
+            with metrics.timer("api_call_seconds", provider=limiter.name) if timed else nullcontext():
+                result = fn(*args, **kwargs)
+        except QuotaExhausted:
+            metrics.inc("api_errors_total", provider=limiter.name, kind="quota")
+            raise
+        except Exception as e:
+            throttled, retry_after, status = throttle_info(e)
+            metrics.inc("api_errors_total", provider=limiter.name, kind="throttled" if throttled else "error")
+            if throttled:
+                limiter.on_throttle(retry_after)
+            elif status is not None:
+                if 400 <= status < 500 and status != 408:
+                    raise
+            elif not isinstance(e, TRANSIENT_ERRORS + tuple(retry_on)):
+                raise
+            if attempt == max_retries or (give_up is not None and give_up(e)):
+                raise
+            # ±50% jitter around the capped exponential step, never shorter than Retry-After
+            delay = max(min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.5), retry_after or 0)
+            metrics.inc("retry_sleep_seconds_total", delay, provider=limiter.name)
+            time.sleep(delay)
+        else:
+            limiter.on_success()
+            return result
@@ -0,0 +1,78 @@
+# refresher.py
+
+import threading
+import time
+
+REFRESH_SECONDS = 30
+IDLE_TIMEOUT = 300
+
+
+class BackgroundRefresher:
+    """One daemon thread that refreshes every watched (tickers, interval) panel in a BarStore.
+
+    Viewers call `subscribe` on each render; panels nobody has looked at for `idle_timeout`
+    seconds stop being refreshed. `version(key)` only changes when a refresh wrote bars,
+    so viewers can skip recomputing when nothing new arrived.
+    """
+
+    def __init__(self, store, every=REFRESH_SECONDS, idle_timeout=IDLE_TIMEOUT):
+        self.store = store
+        self.every = every
+        self.idle_timeout = idle_timeout
+        self.subscriptions = {}
+        self.versions = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, tickers, interval, period, period_days):
+        key = (tuple(sorted(set(tickers))), interval)
+        with self._lock:
+            self.subscriptions[key] = {
+                "period": period,
+                "period_days": period_days,
+                "last_seen": time.monotonic(),
+            }
+            self.versions.setdefault(key, 0)
+        return key
+
+    def version(self, key):
+        return self.versions.get(key, 0)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="bar-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh_once(self):
+        """Refresh every live subscription once; returns the keys whose data changed"""
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, sub in self.subscriptions.items() if now - sub["last_seen"] > self.idle_timeout]:
+                del self.subscriptions[key]
+            due = list(self.subscriptions.items())
+        changed = []
+        for (tickers, interval), sub in due:
+            if interval == "1d":
+                # Daily bars come from price_cache, which already checks at most once a day
+                continue
+            try:
+                written = self.store.refresh_many(list(tickers), interval, sub["period"], sub["period_days"], force=True)
+            except Exception as e:
+                self.errors[(tickers, interval)] = str(e)
+                continue
+            self.errors.pop((tickers, interval), None)
+            if written:
+                self.versions[(tickers, interval)] = self.versions.get((tickers, interval), 0) + 1
+                changed.append((tickers, interval))
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.every):
+            self.refresh_once()
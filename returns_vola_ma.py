@@ -1,26 +1,31 @@
-import pandas as pd
+import os
 
-input_csv = "DNA_news_with_prices.csv"
-output_csv = "DNA_news_with_returns_only.csv"
+import pandas as pd
 
-# Load your CSV into pandas DataFrame
-df = pd.read_csv(input_csv)
+from artifacts import artifact_path, read_artifact, write_artifact
+from features import FEATURE_COLUMNS, compute_price_features, daily_table_from_cache, join_features
 
-# Ensure 'Price Date' and 'Close' columns exist and are properly formatted
-df['Price Date'] = pd.to_datetime(df['Price Date'], errors='coerce')
-df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
+symbols = ["DNA"]
+input_artifact = "news_with_prices"
+output_artifact = "news_returns_vola_ma"
+legacy_input_csv = "DNA_news_with_prices.csv"
 
-# Sort by date to ensure chronological order
-df = df.sort_values('Price Date').reset_index(drop=True)
+# Convert the legacy CSV once if the upstream stage hasn't written the artifact yet
+if not os.path.exists(artifact_path(input_artifact)):
+    write_artifact(pd.read_csv(legacy_input_csv), input_artifact, "DNA")
 
-# --- Price Returns (close-to-close percent change) ---
-df['Close_Return'] = df['Close'].pct_change().fillna(0) * 100  # percent
+# Read only the key and date columns; the Headline/Summary text is never loaded
+news = read_artifact(input_artifact, columns=["URL", "Datetime", "Price Date", "Symbol"])
+news = news[news["Symbol"].isin(symbols)]
 
-# --- Intraday open-to-close return ---
-df['Open'] = pd.to_numeric(df['Open'], errors='coerce')
-df['Intraday_Return'] = ((df['Close'] - df['Open']) / df['Open']).fillna(0) * 100
+# Features are computed once per trading day on the deduplicated daily price table for all
+# symbols, then joined back to every article that maps to that day
+daily = daily_table_from_cache(symbols)
+features = compute_price_features(daily)
+enriched = join_features(news, features)
 
-# --- Save to new CSV ---
-df.to_csv(output_csv, index=False)
+# --- Save only the new feature columns, keyed by URL for joining back to the articles ---
+for symbol, rows in enriched.groupby("Symbol"):
+    write_artifact(rows[["URL", "Datetime", "Price Date"] + FEATURE_COLUMNS], output_artifact, symbol)
 
-print(f"Features (returns only) saved to {output_csv}")
+print(f"Features (returns, volatility, SMAs) for {len(symbols)} symbols saved to {artifact_path(output_artifact)}")
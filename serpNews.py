@@ -1,11 +1,24 @@
 import requests
 import json
-from bs4 import BeautifulSoup
 from datetime import datetime
 
+from news_store import NewsStore
+from rate_limit import call_with_retry
+from story_scraper import StoryScraper
+
 SERPAPI_API_KEY = "YOUR_REAL_SERPAPI_API_KEY"
 
-def fetch_google_news_with_story(query, num_results=10, news_date=None):
+def _search(params):
+    search = requests.get("https://serpapi.com/search", params=params, timeout=30)
+    search.raise_for_status()
+    return search.json()
+
+def fetch_google_news_with_story(query, num_results=10, news_date=None, scraper=None, store=None, symbol=None):
+    """Fetch Google News results for query dated news_date with their article text.
+
+    Given a NewsStore, matched articles are also upserted under symbol (default: query),
+    with the story as summary so copies from other sources cluster with them.
+    """
     params = {
         "api_key": SERPAPI_API_KEY,
         "engine": "google_news",
@@ -13,13 +26,14 @@ def fetch_google_news_with_story(query, num_results=10, news_date=None):
         "num": num_results
     }
 
-    search = requests.get("https://serpapi.com/search", params=params)
-    response = search.json()
+    response = call_with_retry("serpapi", _search, params)
     news_json_list = []
+    matched = []
 
     if not news_date:
         news_date = datetime.now().strftime("%Y-%m-%d")
 
+    published = {}
     if "news_results" in response:
         for news in response["news_results"]:
             # SerpApi returns date string, typically like "10/15/2025, 07:12 PM, +0000 UTC"
@@ -35,29 +49,34 @@ def fetch_google_news_with_story(query, num_results=10, news_date=None):
                 matches = False
 
             if matches:
-                article_url = news.get("link", "")
-                full_story = ""
-                if article_url:
-                    try:
-                        headers = {'User-Agent': 'Mozilla/5.0'}
-                        article_response = requests.get(article_url, headers=headers, timeout=10)
-                        soup = BeautifulSoup(article_response.content, 'html.parser')
-                        paragraphs = soup.find_all('p')
-                        full_story = ' '.join(p.get_text() for p in paragraphs)
-                    except Exception:
-                        full_story = ""
-                news_item = {
-                    "title": news.get("title", ""),
-                    "time": news_time,
-                    "story": full_story
-                }
-                news_json_list.append(news_item)
+                matched.append(news)
+                published[news.get("link", "")] = news.get("iso_date") or date_obj
+
+    # Article pages are fetched concurrently (pooled, per-host limited, cached on disk)
+    scraper = scraper or StoryScraper()
+    stories = scraper.fetch_stories(news.get("link", "") for news in matched)
+    for news in matched:
+        news_json_list.append({
+            "title": news.get("title", ""),
+            "time": news.get("date", ""),
+            "story": stories.get(news.get("link", ""), "")
+        })
+
+    if store is not None:
+        store.upsert_articles(symbol or query, (
+            {"datetime": published[news.get("link", "")], "headline": news.get("title", ""),
+             "summary": stories.get(news.get("link", ""), ""), "url": news.get("link"),
+             "source": (news.get("source") or {}).get("name", "serpapi")}
+            for news in matched
+        ))
 
     return news_json_list
 
 # Example usage
 news_date = "2025-01-01"  # or "2025-10-14"
-news_json_list = fetch_google_news_with_story("iPhone", num_results=20, news_date=news_date)
+store = NewsStore()
+news_json_list = fetch_google_news_with_story("iPhone", num_results=20, news_date=news_date, store=store, symbol="AAPL")
+store.close()
 
 with open("news_results.json", "w", encoding="utf-8") as f:
     json.dump(news_json_list, f, ensure_ascii=False, indent=4)
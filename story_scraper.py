@@ -0,0 +1,212 @@
+# story_scraper.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from rate_limit import TokenBucket
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional; the stdlib streaming parser below is the fallback
+    lxml = None
+
+STORY_CACHE_DIR = "story_cache"
+USER_AGENT = "Mozilla/5.0"
+CACHE_RESULTS = {"fresh": "hit", "revalidated": "revalidated", "fetched": "miss", "failed": "miss"}
+
+
+class _ParagraphParser(HTMLParser):
+    """Collects the text inside <p> elements without building a document tree"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0
+        self.skip = 0
+        self.paragraphs = []
+        self._current = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "p":
+            self.depth += 1
+        elif tag in ("script", "style"):
+            self.skip += 1
+
+    def handle_endtag(self, tag):
+        if tag == "p" and self.depth:
+            self.depth -= 1
+            if not self.depth:
+                self.paragraphs.append("".join(self._current))
+                self._current = []
+        elif tag in ("script", "style") and self.skip:
+            self.skip -= 1
+
+    def handle_data(self, data):
+        if self.depth and not self.skip:
+            self._current.append(data)
+
+
+def extract_story(content):
+    """Join the text of every <p> in an HTML page, like the old BeautifulSoup find_all('p')"""
+    if not content:
+        return ""
+    if lxml is not None:
+        try:
+            return " ".join(p.text_content() for p in lxml.html.fromstring(content).iter("p"))
+        except (ValueError, lxml.etree.ParserError):
+            return ""
+    parser = _ParagraphParser()
+    parser.feed(content.decode("utf-8", errors="replace") if isinstance(content, bytes) else content)
+    parser.close()
+    return " ".join(parser.paragraphs)
+
+
+class StoryCache:
+    """Content-addressed on-disk cache of fetched pages and their extracted text.
+
+    meta/<sha256(url)>.json holds the URL's validators (ETag, Last-Modified) and the hash of
+    its body; bodies live once under html/<sha256(body)> and text under text/<sha256(body)>,
+    so mirrored pages share storage and extraction.
+    """
+
+    def __init__(self, root=STORY_CACHE_DIR):
+        self.root = root
+        for sub in ("meta", "html", "text"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    def _path(self, sub, key):
+        return os.path.join(self.root, sub, key)
+
+    def meta(self, url):
+        path = self._path("meta", hashlib.sha256(url.encode()).hexdigest() + ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def text(self, content_hash):
+        path = self._path("text", content_hash)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _write(self, path, data, mode):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, url, content, text, etag=None, last_modified=None):
+        content_hash = hashlib.sha256(content).hexdigest()
+        if not os.path.exists(self._path("html", content_hash)):
+            self._write(self._path("html", content_hash), content, "wb")
+            self._write(self._path("text", content_hash), text, "w")
+        self.touch(url, content_hash, etag, last_modified)
+        return content_hash
+
+    def touch(self, url, content_hash, etag=None, last_modified=None):
+        """Record that url was (re)validated now, keeping its body hash"""
+        meta = {"url": url, "content_hash": content_hash, "etag": etag,
+                "last_modified": last_modified, "checked": time.time()}
+        self._write(self._path("meta", hashlib.sha256(url.encode()).hexdigest() + ".json"), json.dumps(meta), "w")
+
+
+class StoryScraper:
+    """Fetches article pages concurrently and returns their extracted story text.
+
+    - one pooled keep-alive Session per worker thread
+    - at most `per_host` requests in flight and `host_rate` request starts per second per host
+    - cached pages younger than `max_age` seconds are not requested at all; older ones are
+      revalidated with If-None-Match / If-Modified-Since and reused on 304
+    Failed fetches yield "" like the old per-article try/except.
+    """
+
+    def __init__(self, cache_dir=STORY_CACHE_DIR, max_workers=16, per_host=2, host_rate=2.0,
+                 max_age=24 * 3600, timeout=10):
+        self.cache = StoryCache(cache_dir)
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.host_rate = host_rate
+        self.max_age = max_age
+        self.timeout = timeout
+        self.stats = {"fresh": 0, "revalidated": 0, "fetched": 0, "failed": 0}
+        self._local = threading.local()
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=self.per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            self._local.session = session
+        return session
+
+    def _host_limits(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (threading.Semaphore(self.per_host), TokenBucket(self.host_rate, capacity=1))
+            return self._hosts[host]
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+        metrics.inc("cache_lookups_total", cache="story", result=CACHE_RESULTS[key])
+
+    def fetch_story(self, url):
+        meta = self.cache.meta(url)
+        cached_text = self.cache.text(meta["content_hash"]) if meta is not None else None
+        if cached_text is None:
+            meta = None  # validators are useless without the cached body
+        elif time.time() - meta["checked"] < self.max_age:
+            self._count("fresh")
+            return cached_text
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        slots, bucket = self._host_limits(url)
+        try:
+            with slots:
+                waited = bucket.acquire()
+                if waited:
+                    metrics.inc("rate_limit_wait_seconds_total", waited, provider="story_hosts")
+                with metrics.timer("api_call_seconds", provider="story_hosts"):
+                    response = self._session().get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and meta is not None:
+                self.cache.touch(url, meta["content_hash"], meta.get("etag"), meta.get("last_modified"))
+                self._count("revalidated")
+                return cached_text
+            response.raise_for_status()
+        except requests.RequestException:
+            self._count("failed")
+            return ""
+        text = extract_story(response.content)
+        self.cache.put(url, response.content, text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        self._count("fetched")
+        return text
+
+    def fetch_stories(self, urls):
+        """{url: story text} for the unique, non-empty URLs"""
+        urls = list(dict.fromkeys(u for u in urls if u))
+        if not urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as pool:
+            return dict(zip(urls, pool.map(self.fetch_story, urls)))
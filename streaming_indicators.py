@@ -0,0 +1,273 @@
+# streaming_indicators.py
+
+import math
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+INDICATOR_COLUMNS = ["MA_9", "MA_20", "BB_Upper", "BB_Lower", "Candle", "MA_Above"]
+
+
+class RollingStats:
+    """Mean and sample std over the last `window` values, updated in O(1) (windowed Welford).
+
+    Matches pandas `rolling(window, min_periods=1)`: the std of a single value is NaN.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def _add(self, x):
+        self.values.append(x)
+        delta = x - self.mean
+        self.mean += delta / len(self.values)
+        self._m2 += delta * (x - self.mean)
+
+    def _remove(self, x):
+        n = len(self.values)
+        if n == 0:
+            self.mean = 0.0
+            self._m2 = 0.0
+            return
+        old_mean = (self.mean * (n + 1) - x) / n
+        self._m2 -= (x - old_mean) * (x - self.mean)
+        self.mean = old_mean
+        self._m2 = max(self._m2, 0.0)
+
+    def push(self, x):
+        """Add x, evicting the oldest value when the window is full; returns the evicted value or None"""
+        self._add(x)
+        if len(self.values) > self.window:
+            evicted = self.values.popleft()
+            self._remove(evicted)
+            return evicted
+        return None
+
+    def undo(self, x, evicted):
+        """Revert the push of x that evicted `evicted` (used to rewrite a still-forming bar)"""
+        self.values.pop()
+        self._remove(x)
+        if evicted is not None:
+            self.values.appendleft(evicted)
+            delta = evicted - self.mean
+            self.mean += delta / len(self.values)
+            self._m2 += delta * (evicted - self.mean)
+
+    @property
+    def std(self):
+        n = len(self.values)
+        return math.sqrt(self._m2 / (n - 1)) if n > 1 else float("nan")
+
+
+class IndicatorState:
+    """Per-ticker running state for MA_9, MA_20, Bollinger bands and candle classification"""
+
+    def __init__(self, fast=9, slow=20, bb_window=20, bb_k=2.0):
+        self.fast = RollingStats(fast)
+        self.slow = RollingStats(slow)
+        # Reuse the slow MA window for the band std when they match (the default)
+        self.bb = self.slow if bb_window == slow else RollingStats(bb_window)
+        self.bb_k = bb_k
+        self.last_ts = None
+        self._last_push = None
+
+    def update(self, ts, open_price, close, replace=False):
+        """Advance by one bar, or rewrite the latest bar in place when replace=True"""
+        stats = [self.fast, self.slow] if self.bb is self.slow else [self.fast, self.slow, self.bb]
+        if replace and self._last_push is not None:
+            last_close, evicted = self._last_push
+            for s, e in zip(stats, evicted):
+                s.undo(last_close, e)
+        evicted = [s.push(close) for s in stats]
+        self._last_push = (close, evicted)
+        self.last_ts = ts
+
+        ma_fast, ma_slow = self.fast.mean, self.slow.mean
+        band = self.bb_k * self.bb.std
+        if close > open_price:
+            candle = "green"
+        elif close < open_price:
+            candle = "red"
+        else:
+            candle = "doji"
+        return {
+            "MA_9": ma_fast,
+            "MA_20": ma_slow,
+            "BB_Upper": self.bb.mean + band,
+            "BB_Lower": self.bb.mean - band,
+            "Candle": candle,
+            "MA_Above": ma_fast > ma_slow,
+        }
+
+
+NUMERIC_COLUMNS = ["MA_9", "MA_20", "BB_Upper", "BB_Lower"]
+CANDLES = ["green", "red", "doji"]
+_CANDLE_CODE = {candle: code for code, candle in enumerate(CANDLES)}
+_NS_PER_UNIT = {"s": 1_000_000_000, "ms": 1_000_000, "us": 1_000, "ns": 1}
+
+
+class IndicatorBuffer:
+    """Preallocated per-key indicator columns: int64 ns timestamps plus one array per indicator.
+
+    Rows occupy [lo, hi); appending past the end slides the newest `keep` rows to the front
+    (or doubles the arrays), so each bar costs O(1) amortised whatever the window length.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(capacity, 16)
+        self.ts = np.zeros(self.capacity, dtype="int64")
+        self.numeric = np.full((len(NUMERIC_COLUMNS), self.capacity), np.nan)
+        self.candle = np.zeros(self.capacity, dtype="int8")  # codes into CANDLES
+        self.ma_above = np.zeros(self.capacity, dtype=bool)
+        self.lo = self.hi = 0
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    @property
+    def first_ts(self):
+        return int(self.ts[self.lo]) if len(self) else None
+
+    @property
+    def last_ts(self):
+        return int(self.ts[self.hi - 1]) if len(self) else None
+
+    def write(self, ts, row, keep, replace=False):
+        """Store row for ts, overwriting the last slot when replace=True"""
+        if not replace:
+            if self.hi == self.capacity:
+                self._make_room(keep)
+            self.hi += 1
+        i = self.hi - 1
+        self.ts[i] = ts
+        for j, col in enumerate(NUMERIC_COLUMNS):
+            self.numeric[j, i] = row[col]
+        self.candle[i] = _CANDLE_CODE[row["Candle"]]
+        self.ma_above[i] = row["MA_Above"]
+
+    def _make_room(self, keep):
+        kept = min(len(self), keep)
+        if kept >= self.capacity // 2:
+            self.capacity *= 2
+            self.ts = np.resize(self.ts, self.capacity)
+            self.numeric = np.concatenate([self.numeric, np.full_like(self.numeric, np.nan)], axis=1)
+            self.candle = np.resize(self.candle, self.capacity)
+            self.ma_above = np.resize(self.ma_above, self.capacity)
+            return
+        src = slice(self.hi - kept, self.hi)
+        self.ts[:kept] = self.ts[src]
+        self.numeric[:, :kept] = self.numeric[:, src]
+        self.candle[:kept] = self.candle[src]
+        self.ma_above[:kept] = self.ma_above[src]
+        self.lo, self.hi = 0, kept
+
+    def locate(self, first, last, length):
+        """Slot range holding exactly the timestamps first..last (`length` rows), or None"""
+        i = self.lo + int(np.searchsorted(self.ts[self.lo:self.hi], first))
+        j = i + length
+        if j > self.hi or self.ts[i] != first or self.ts[j - 1] != last:
+            return None
+        return i, j
+
+
+class StreamingIndicatorEngine:
+    """Keeps an IndicatorState per key (e.g. (ticker, interval)) and only processes new bars.
+
+    `apply` computes rows for bars after the last one seen, rewrites the last bar if it is
+    still forming, and attaches the stored indicator columns to the frame as array slices.
+    Candle comes back as a categorical over CANDLES, which avoids building a string per row.
+    The result equals the pandas rolling(min_periods=1) computation over `data` alone: a
+    frame starting later than the stored rows gets its warm-up rows recomputed, and one
+    reaching back before them (a longer period, say) or holding bars the state never saw
+    reseeds the state. Keys are locked so concurrent sessions sharing one engine don't
+    interleave updates. At least `max_rows` computed rows are kept per key.
+    """
+
+    def __init__(self, max_rows=5000, **indicator_kwargs):
+        self.max_rows = max_rows
+        self.indicator_kwargs = indicator_kwargs
+        self.states = {}
+        self.buffers = {}
+        probe = IndicatorState(**indicator_kwargs)
+        # Rows whose values still depend on where the series starts
+        self.warmup_rows = max(probe.fast.window, probe.slow.window, probe.bb.window) - 1
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def reset(self, key):
+        with self._key_lock(key):
+            self.states.pop(key, None)
+            self.buffers.pop(key, None)
+
+    def _compute(self, key, data, ts, scale):
+        """Process the bars of data newer than the stored ones; returns the slot range matching data.
+
+        ts is the index as int64 in its own unit and scale the nanoseconds per unit; only the
+        few timestamps actually stored or compared are converted to ns.
+        """
+        keep = max(self.max_rows, len(data))
+        buffer = self.buffers.get(key)
+        if buffer is None or not len(buffer) or ts[0] * scale < buffer.first_ts:
+            # New key, or the frame reaches back before the stored rows: start over from this frame
+            buffer = self.buffers[key] = IndicatorBuffer(2 * keep)
+            self.states[key] = IndicatorState(**self.indicator_kwargs)
+        state = self.states[key]
+
+        last = buffer.last_ts
+        start = 0 if last is None else int(np.searchsorted(ts, -(-last // scale)))
+        opens, closes = data["Open"].to_numpy(dtype="float64"), data["Close"].to_numpy(dtype="float64")
+        for i in range(start, len(ts)):
+            t = int(ts[i]) * scale
+            replace = last is not None and t == last
+            buffer.write(t, state.update(t, opens[i], closes[i], replace=replace), keep, replace=replace)
+            last = t
+        return buffer.locate(int(ts[0]) * scale, int(ts[-1]) * scale, len(ts))
+
+    def apply(self, key, data):
+        if not len(data):
+            data = data.copy()
+            for col in INDICATOR_COLUMNS:
+                data[col] = pd.Series(dtype=pd.CategoricalDtype(CANDLES) if col == "Candle"
+                                      else bool if col == "MA_Above" else float)
+            return data
+        index = pd.DatetimeIndex(data.index)
+        ts, scale = index.asi8, _NS_PER_UNIT[index.unit]
+        with self._key_lock(key):
+            slots = self._compute(key, data, ts, scale)
+            if slots is None:
+                # Bars the state never saw (back-filled inside the window): recompute this frame
+                self.buffers.pop(key, None)
+                slots = self._compute(key, data, ts, scale)
+            buffer = self.buffers[key]
+            i, j = slots
+            numeric = buffer.numeric[:, i:j].copy()
+            candle = buffer.candle[i:j].copy()
+            ma_above = buffer.ma_above[i:j].copy()
+            from_start = i == buffer.lo
+        if not from_start:
+            # The stored series starts earlier: redo the rows still inside the warm-up of this frame
+            warm = min(len(data), self.warmup_rows)
+            head = IndicatorState(**self.indicator_kwargs)
+            opens, closes = data["Open"].to_numpy(dtype="float64"), data["Close"].to_numpy(dtype="float64")
+            for r in range(warm):
+                row = head.update(ts[r], opens[r], closes[r])
+                numeric[:, r] = [row[col] for col in NUMERIC_COLUMNS]
+                candle[r] = _CANDLE_CODE[row["Candle"]]
+                ma_above[r] = row["MA_Above"]
+        columns = {col: numeric[n] for n, col in enumerate(NUMERIC_COLUMNS)}
+        columns["Candle"] = pd.Categorical.from_codes(candle, CANDLES)
+        columns["MA_Above"] = ma_above
+        indicators = pd.DataFrame(columns, index=data.index, copy=False)
+        # One concat instead of a column insert (and block copy) per indicator
+        return pd.concat([data.drop(columns=INDICATOR_COLUMNS, errors="ignore"), indicators], axis=1)
@@ -1,14 +1,21 @@
 # streamlit_stock_monitor_simple.py
 
 import streamlit as st
-import fetch_yfinance_news as yf
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import numpy as np
+import io
 from datetime import datetime
-import time
 
-from bollinger import add_bollinger_bands, detect_bband_big_moves
+import metrics
+from bollinger import detect_bband_big_moves
+from bar_buffer import BarStore
+from downsample import downsample_frame
+from hypothesis_stats import candle_ma_stats, rolling_bband_breaches, rolling_candle_ma_stats
+from price_cache import get_daily_bars
+from refresher import REFRESH_SECONDS, BackgroundRefresher
+from streaming_indicators import StreamingIndicatorEngine
+from watchlist import panel_indicators, summary_table, wide_panel
 
 # Streamlit page setup
 st.set_page_config(
@@ -23,14 +30,20 @@ st.markdown("Live monitoring of stock prices. Select which hypothesis to show an
 
 # Sidebar controls
 st.sidebar.header("🎛️ Controls")
-ticker = st.sidebar.text_input("Stock Ticker", value="AAPL", max_chars=10).upper()
+mode = st.sidebar.radio("Mode", ["Single Ticker", "Watchlist"], index=0)
+if mode == "Watchlist":
+    watchlist_input = st.sidebar.text_area("Watchlist (comma separated)", value="AAPL, MSFT, NVDA, AMZN, GOOGL, META, TSLA")
+    watchlist = list(dict.fromkeys(t.strip().upper() for t in watchlist_input.split(",") if t.strip()))
+    ticker = None
+else:
+    ticker = st.sidebar.text_input("Stock Ticker", value="AAPL", max_chars=10).upper()
 period_options = {"1 Day": "1d", "5 Days": "5d", "1 Month": "1mo", "3 Months": "3mo"}
 selected_period = st.sidebar.selectbox("Data Period", list(period_options.keys()), index=0)
 period = period_options[selected_period]
-interval_options = {"1 Minute": "1m", "2 Minutes": "2m", "5 Minutes": "5m", "15 Minutes": "15m", "1 Hour": "1h"}
+interval_options = {"1 Minute": "1m", "2 Minutes": "2m", "5 Minutes": "5m", "15 Minutes": "15m", "1 Hour": "1h", "1 Day": "1d"}
 selected_interval = st.sidebar.selectbox("Data Interval", list(interval_options.keys()), index=0)
 interval = interval_options[selected_interval]
-auto_refresh = st.sidebar.checkbox("Auto Refresh (30 seconds)", value=True)
+auto_refresh = st.sidebar.checkbox(f"Auto Refresh ({REFRESH_SECONDS} seconds)", value=True)
 if st.sidebar.button("🔄 Refresh Now"):
     st.rerun()
 
@@ -42,109 +55,193 @@ show_bband_hypothesis = st.sidebar.checkbox("Show Bollinger Band Hypothesis", va
 # Zoom option
 st.sidebar.subheader("Zoom Options")
 zoom_npoints = st.sidebar.slider("Show Last N Data Points on Chart", min_value=10, max_value=500, value=50, step=10)
+chart_full_period = st.sidebar.checkbox("Chart Full Period (downsampled)", value=False)
+
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 31, "3mo": 92}
+
+@st.cache_resource
+def get_bar_store():
+    # One ring buffer per (ticker, interval), shared by every session; refreshes fetch only new bars.
+    # The background refresher keeps buffers fresh, so sessions only fetch on first load or if it stalls.
+    return BarStore(min_refresh=2 * REFRESH_SECONDS)
+
+@st.cache_resource
+def get_refresher():
+    # A single thread refreshes every watched panel for all sessions
+    return BackgroundRefresher(get_bar_store(), every=REFRESH_SECONDS).start()
 
-@st.cache_data(ttl=30)
 def fetch_stock_data(ticker, period, interval):
     try:
-        stock = yf.Ticker(ticker)
-        data = stock.history(period=period, interval=interval)
+        with metrics.timer("monitor_seconds", step="fetch"):
+            if interval == "1d":
+                # Daily bars share the local price cache with the news enrichment (openClose.py)
+                data = get_daily_bars(ticker)
+                data = data[data.index >= data.index.max() - pd.Timedelta(days=PERIOD_DAYS[period])] if len(data) else data
+            else:
+                data = get_bar_store().get(ticker, interval, period, PERIOD_DAYS[period])
         if data.empty:
             return None, "No data found for this ticker"
         return data, None
     except Exception as e:
         return None, f"Error fetching data: {str(e)}"
 
-def process_data(data):
-    data['MA_9'] = data['Close'].rolling(window=9, min_periods=1).mean()
-    data['MA_20'] = data['Close'].rolling(window=20, min_periods=1).mean()
-    conditions = [
-        data['Close'] > data['Open'],
-        data['Close'] < data['Open']
-    ]
-    choices = ['green', 'red']
-    data['Candle'] = np.select(conditions, choices, default='doji')
-    data['MA_Above'] = data['MA_9'] > data['MA_20']
-    return data
-
-def create_matplotlib_chart(data, ticker):
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 9),
-                                gridspec_kw={'height_ratios': [3, 1]},
-                                sharex=True)
+def fetch_watchlist_data(tickers, period, interval):
+    """{ticker: bars} for the whole watchlist with one batched download per refresh"""
+    try:
+        with metrics.timer("monitor_seconds", step="fetch_watchlist"):
+            if interval == "1d":
+                frames = {t: fetch_stock_data(t, period, interval)[0] for t in tickers}
+            else:
+                frames = get_bar_store().get_many(tickers, interval, period, PERIOD_DAYS[period])
+        frames = {t: f for t, f in frames.items() if f is not None and not f.empty}
+        if not frames:
+            return None, "No data found for the watchlist"
+        return frames, None
+    except Exception as e:
+        return None, f"Error fetching data: {str(e)}"
+
+@st.cache_resource
+def get_indicator_engine():
+    # Shared across reruns so each refresh only processes bars newer than the last one seen
+    return StreamingIndicatorEngine()
+
+def process_data(data, ticker, interval):
+    """Add MA_9, MA_20, Bollinger bands, Candle and MA_Above via the streaming engine"""
+    engine = get_indicator_engine()
+    generation = get_bar_store().generation.get((ticker, interval), 0)
+    if generation:
+        # The bar buffer was rebuilt from a full fetch, so older indicator state no longer lines up
+        engine.reset((ticker, interval, generation - 1))
+    with metrics.timer("monitor_seconds", step="indicators"):
+        return engine.apply((ticker, interval, generation), data)
+
+CHART_MAX_POINTS = 2000  # about two points per horizontal pixel of the 12in x 100dpi figure
+
+def create_matplotlib_chart(data, ticker, max_points=CHART_MAX_POINTS):
+    # A standalone Figure (not pyplot) so nothing is kept in pyplot's global figure registry
+    data = downsample_frame(data, "Close", max_points)
+    # Plain datetime64 wall-clock times convert to matplotlib dates without a per-Timestamp loop
+    x = data.index.tz_localize(None) if getattr(data.index, "tz", None) is not None else data.index
+    x = x.to_numpy()
+    fig = Figure(figsize=(12, 9))
+    ax1, ax2 = fig.subplots(2, 1, gridspec_kw={'height_ratios': [3, 1]}, sharex=True)
     # Price and MA lines
-    ax1.plot(data.index, data['Close'], label='Close Price', color='black', linewidth=2)
-    ax1.plot(data.index, data['MA_9'], label='9-Period MA', color='blue', linewidth=1.5)
-    ax1.plot(data.index, data['MA_20'], label='20-Period MA', color='orange', linewidth=1.5)
-    ax1.plot(data.index, data['BB_Upper'], label='BB Upper', color='purple', linestyle='--', linewidth=1)
-    ax1.plot(data.index, data['BB_Lower'], label='BB Lower', color='brown', linestyle='--', linewidth=1)
-    green_candles = data[data['Candle'] == 'green']
-    red_candles = data[data['Candle'] == 'red']
-    if not green_candles.empty:
-        ax1.scatter(green_candles.index, green_candles['Close'], color='green', alpha=0.7, s=30, label='Green Candles', zorder=5)
-    if not red_candles.empty:
-        ax1.scatter(red_candles.index, red_candles['Close'], color='red', alpha=0.7, s=30, label='Red Candles', zorder=5)
+    ax1.plot(x, data['Close'], label='Close Price', color='black', linewidth=2)
+    ax1.plot(x, data['MA_9'], label='9-Period MA', color='blue', linewidth=1.5)
+    ax1.plot(x, data['MA_20'], label='20-Period MA', color='orange', linewidth=1.5)
+    ax1.plot(x, data['BB_Upper'], label='BB Upper', color='purple', linestyle='--', linewidth=1)
+    ax1.plot(x, data['BB_Lower'], label='BB Lower', color='brown', linestyle='--', linewidth=1)
+    for candle, color in (('green', 'green'), ('red', 'red')):
+        mask = (data['Candle'] == candle).to_numpy()
+        if mask.any():
+            ax1.scatter(x[mask], data['Close'].to_numpy()[mask], color=color, alpha=0.7, s=30,
+                        label=f'{candle.title()} Candles', zorder=5)
     ax1.set_title(f'{ticker} Price with Moving Averages & Bollinger Bands', fontsize=14, fontweight='bold')
     ax1.set_ylabel('Price (USD)', fontsize=12)
     ax1.legend()
     ax1.grid(True, alpha=0.3)
-    colors = ['green' if close > open_price else 'red' for close, open_price in zip(data['Close'], data['Open'])]
-    ax2.bar(data.index, data['Volume'], color=colors, alpha=0.6, width=0.8)
+    colors = np.where(data['Close'].to_numpy() > data['Open'].to_numpy(), 'green', 'red')
+    # One LineCollection instead of a Rectangle patch per bar
+    ax2.vlines(x, 0, data['Volume'], colors=colors, alpha=0.6, linewidth=max(1.0, 1200 / len(data)))
+    ax2.set_ylim(bottom=0)
     ax2.set_ylabel('Volume', fontsize=12)
     ax2.set_xlabel('Time', fontsize=12)
     ax2.grid(True, alpha=0.3)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+    ax2.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
     return fig
 
+@st.cache_data(max_entries=64)
+def chart_png(version, ticker, _data):
+    """PNG bytes of the chart, cached on the data version so unchanged windows aren't redrawn"""
+    # Only runs on a cache miss: its count against step="render" shows how often charts are redrawn
+    with metrics.timer("monitor_seconds", step="chart"):
+        fig = create_matplotlib_chart(_data, ticker)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=100)
+        fig.clear()
+        return buf.getvalue()
+
+def data_version(data):
+    """Cheap fingerprint of a bar window: its span, length and the still-forming last bar"""
+    last = data.iloc[-1]
+    return (len(data), data.index[0], data.index[-1], float(last['Close']), float(last['Volume']))
+
 def calculate_statistics(data):
     if data.empty:
         return {}
-    current_price = data['Close'].iloc[-1]
-    ma9_current = data['MA_9'].iloc[-1]
-    ma20_current = data['MA_20'].iloc[-1]
-    below_ma = data[data['MA_Above'] == False]
-    above_ma = data[data['MA_Above'] == True]
-    green_below = len(below_ma[below_ma['Candle'] == 'green'])
-    red_below = len(below_ma[below_ma['Candle'] == 'red'])
-    green_above = len(above_ma[above_ma['Candle'] == 'green'])
-    red_above = len(above_ma[above_ma['Candle'] == 'red'])
-    total_below = green_below + red_below
-    total_above = green_above + red_above
-    green_below_pct = (green_below / total_below * 100) if total_below > 0 else 0
-    red_below_pct = (red_below / total_below * 100) if total_below > 0 else 0
-    green_above_pct = (green_above / total_above * 100) if total_above > 0 else 0
-    red_above_pct = (red_above / total_above * 100) if total_above > 0 else 0
+    stats = candle_ma_stats(data)
+    stats['current_price'] = data['Close'].iloc[-1]
+    stats['ma9_current'] = data['MA_9'].iloc[-1]
+    stats['ma20_current'] = data['MA_20'].iloc[-1]
+    return stats
+
+def cached_view(view, version):
+    """This session's last data for view, if the refresher has written no bars for it since (else None)"""
+    cached = st.session_state.get("live_view")
+    hit = version is not None and cached is not None and cached[0] == (view, version)
+    metrics.inc("cache_lookups_total", cache="live_view", result="hit" if hit else "miss")
+    return cached[1] if hit else None
+
+def store_view(view, version, payload):
+    st.session_state["live_view"] = ((view, version), payload)
+    return payload
+
+@st.cache_data(max_entries=64)
+def ticker_analysis(version, ticker, npoints, with_ma, with_bband, _data):
+    """Statistics behind render_ticker, cached on the data version like chart_png"""
+    display_data = _data.tail(npoints)
     return {
-        'current_price': current_price,
-        'ma9_current': ma9_current,
-        'ma20_current': ma20_current,
-        'green_below': green_below,
-        'red_below': red_below,
-        'green_above': green_above,
-        'red_above': red_above,
-        'green_below_pct': green_below_pct,
-        'red_below_pct': red_below_pct,
-        'green_above_pct': green_above_pct,
-        'red_above_pct': red_above_pct,
-        'total_below': total_below,
-        'total_above': total_above
+        "stats": calculate_statistics(_data),
+        "zoom_stats": candle_ma_stats(display_data),
+        "bband_stats": detect_bband_big_moves(display_data),
+        "rolling": rolling_candle_ma_stats(_data, npoints) if with_ma else None,
+        "breaches": rolling_bband_breaches(_data, npoints) if with_bband else None,
     }
 
-def main():
-    with st.spinner(f"Fetching data for {ticker}..."):
-        data, error = fetch_stock_data(ticker, period, interval)
-    if error:
-        st.error(f"❌ {error}")
-        return
-    if data is None or data.empty:
-        st.warning("No data available for the selected ticker and period.")
-        return
-    data = process_data(data)
-    data = add_bollinger_bands(data)
-    stats = calculate_statistics(data)
-    bband_stats = detect_bband_big_moves(data)
+def render_watchlist(tickers, version=None):
+    view = ("watchlist", tuple(tickers), interval, period, zoom_npoints)
+    cached = cached_view(view, version)
+    if cached is None:
+        with st.spinner(f"Fetching data for {len(tickers)} tickers..."):
+            frames, error = fetch_watchlist_data(tickers, period, interval)
+        if error:
+            st.error(f"❌ {error}")
+            return
+        panel = wide_panel(frames)
+        summary = summary_table(panel, panel_indicators(panel), zoom_npoints)
+        cached = store_view(view, version, {"frames": frames, "summary": summary, "processed": {}})
+    frames, summary = cached["frames"], cached["summary"]
+
+    st.header("📋 Watchlist")
+    st.dataframe(
+        summary.set_index("Ticker"),
+        use_container_width=True,
+        column_config={
+            "Price": st.column_config.NumberColumn(format="$%.2f"),
+            "Change %": st.column_config.NumberColumn(format="%.2f%%"),
+            "MA_9": st.column_config.NumberColumn(format="%.2f"),
+            "MA_20": st.column_config.NumberColumn(format="%.2f"),
+        },
+    )
+    missing = [t for t in tickers if t not in frames]
+    if missing:
+        st.caption(f"No data for: {', '.join(missing)}")
+
+    drill = st.selectbox("Drill down", list(summary["Ticker"]))
+    if drill:
+        if drill not in cached["processed"]:
+            cached["processed"][drill] = process_data(frames[drill], drill, interval)
+        render_ticker(cached["processed"][drill], drill)
+
+def render_ticker(data, ticker):
+    analysis = ticker_analysis(data_version(data), ticker, zoom_npoints, show_ma_hypothesis, show_bband_hypothesis, data)
+    stats = analysis["stats"]
 
     # Zoom data for all chart/hypothesis
     display_data = data.tail(zoom_npoints)
+    zoom_stats = analysis["zoom_stats"]
+    bband_stats = analysis["bband_stats"]
 
     # Metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -159,32 +256,20 @@ def main():
         st.metric("9-MA vs 20-MA", ma_status)
 
     # Chart
-    fig = create_matplotlib_chart(display_data, ticker)
-    st.pyplot(fig)
+    chart_data = data if chart_full_period else display_data
+    st.image(chart_png(data_version(chart_data), ticker, chart_data), use_container_width=True)
 
     # Hypothesis 1: MA
     if show_ma_hypothesis:
         st.header("🧪 Hypothesis 1: Moving Average Candle Colors")
         col1, col2 = st.columns(2)
-        below_ma = display_data[display_data['MA_Above'] == False]
-        above_ma = display_data[display_data['MA_Above'] == True]
-        green_below = len(below_ma[below_ma['Candle'] == 'green'])
-        red_below = len(below_ma[below_ma['Candle'] == 'red'])
-        green_above = len(above_ma[above_ma['Candle'] == 'green'])
-        red_above = len(above_ma[above_ma['Candle'] == 'red'])
-        total_below = green_below + red_below
-        total_above = green_above + red_above
-        green_below_pct = (green_below / total_below * 100) if total_below > 0 else 0
-        red_below_pct = (red_below / total_below * 100) if total_below > 0 else 0
-        green_above_pct = (green_above / total_above * 100) if total_above > 0 else 0
-        red_above_pct = (red_above / total_above * 100) if total_above > 0 else 0
         with col1:
             st.subheader("When 9-MA < 20-MA")
-            if total_below > 0:
-                st.write(f"**Candles (Zoomed):** {total_below}")
-                st.write(f"🟢 **Green Candles:** {green_below} ({green_below_pct:.1f}%)")
-                st.write(f"🔴 **Red Candles:** {red_below} ({red_below_pct:.1f}%)")
-                if red_below > green_below:
+            if zoom_stats['total_below'] > 0:
+                st.write(f"**Candles (Zoomed):** {zoom_stats['total_below']}")
+                st.write(f"🟢 **Green Candles:** {zoom_stats['green_below']} ({zoom_stats['green_below_pct']:.1f}%)")
+                st.write(f"🔴 **Red Candles:** {zoom_stats['red_below']} ({zoom_stats['red_below_pct']:.1f}%)")
+                if zoom_stats['below_supported']:
                     st.success("✅ Hypothesis SUPPORTED: More red candles when 9-MA < 20-MA")
                 else:
                     st.warning("❌ Hypothesis NOT SUPPORTED: More green candles when 9-MA < 20-MA")
@@ -192,40 +277,93 @@ def main():
                 st.info("No data in zoom window for this condition")
         with col2:
             st.subheader("When 9-MA > 20-MA")
-            if total_above > 0:
-                st.write(f"**Candles (Zoomed):** {total_above}")
-                st.write(f"🟢 **Green Candles:** {green_above} ({green_above_pct:.1f}%)")
-                st.write(f"🔴 **Red Candles:** {red_above} ({red_above_pct:.1f}%)")
-                if green_above > red_above:
+            if zoom_stats['total_above'] > 0:
+                st.write(f"**Candles (Zoomed):** {zoom_stats['total_above']}")
+                st.write(f"🟢 **Green Candles:** {zoom_stats['green_above']} ({zoom_stats['green_above_pct']:.1f}%)")
+                st.write(f"🔴 **Red Candles:** {zoom_stats['red_above']} ({zoom_stats['red_above_pct']:.1f}%)")
+                if zoom_stats['above_supported']:
                     st.success("✅ Hypothesis SUPPORTED: More green candles when 9-MA > 20-MA")
                 else:
                     st.warning("❌ Hypothesis NOT SUPPORTED: More red candles when 9-MA > 20-MA")
             else:
                 st.info("No data in zoom window for this condition")
 
+        rolling = analysis["rolling"]
+        if len(rolling) > 1:
+            st.subheader(f"Support Over Time (every {zoom_npoints}-bar window)")
+            st.line_chart(rolling[['red_below_pct', 'green_above_pct']].rename(columns={
+                'red_below_pct': 'Red % when 9-MA < 20-MA',
+                'green_above_pct': 'Green % when 9-MA > 20-MA',
+            }))
+            st.caption(
+                f"Supported in {rolling['below_supported'].mean() * 100:.0f}% of windows (9-MA < 20-MA) "
+                f"and {rolling['above_supported'].mean() * 100:.0f}% of windows (9-MA > 20-MA)"
+            )
+
     # Hypothesis 2: Bollinger Bands
     if show_bband_hypothesis:
         st.header("🧪 Hypothesis 2: Bollinger Band 'Big Move' Detection")
-        big_move_above = display_data[display_data['Close'] > display_data['BB_Upper']]
-        big_move_below = display_data[display_data['Close'] < display_data['BB_Lower']]
-        total_big_moves = len(big_move_above) + len(big_move_below)
+        total_big_moves = bband_stats['bolli_big_moves']
         st.write(f"Big moments in zoom window: **{total_big_moves}**")
-        st.write(f"Moves above upper band: **{len(big_move_above)}**")
-        st.write(f"Moves below lower band: **{len(big_move_below)}**")
+        st.write(f"Moves above upper band: **{bband_stats['big_move_above_count']}**")
+        st.write(f"Moves below lower band: **{bband_stats['big_move_below_count']}**")
         if total_big_moves > 0:
             st.success("✅ Bollinger Band Effect PRESENT in zoom window: 'Big moments' detected as price moves outside bands.")
         else:
             st.info("No Bollinger Band 'big moments' detected in zoom window.")
+        breaches = analysis["breaches"]
+        if len(breaches) > 1:
+            st.subheader(f"Big Moves Over Time (every {zoom_npoints}-bar window)")
+            st.line_chart(breaches[['above', 'below']].rename(columns={'above': 'Above upper band', 'below': 'Below lower band'}))
 
     # Raw Data Show/Hide
     with st.expander("📊 Raw Data (Zoomed Window)"):
         display_cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'MA_9', 'MA_20', 'BB_Upper', 'BB_Lower', 'Candle', 'MA_Above']
         st.dataframe(display_data[display_cols], use_container_width=True)
 
-    st.sidebar.markdown(f"**Last Updated:** {datetime.now().strftime('%H:%M:%S')}")
+def render_live():
+    with metrics.timer("monitor_seconds", step="render"):
+        _render_live()
+
+def _render_live():
+    tickers = watchlist if mode == "Watchlist" else [ticker]
+    version = None
+    if auto_refresh and tickers and interval != "1d":
+        refresher = get_refresher()
+        key = refresher.subscribe(tickers, interval, period, PERIOD_DAYS[period])
+        if key in refresher.errors:
+            st.caption(f"⚠️ Background refresh failed: {refresher.errors[key]}")
+        else:
+            # The version only moves when the refresher wrote bars; until then the last rerun's data is current
+            version = refresher.version(key)
+    if mode == "Watchlist":
+        if not watchlist:
+            st.warning("Add at least one ticker to the watchlist.")
+            return
+        render_watchlist(watchlist, version)
+    else:
+        view = ("ticker", ticker, interval, period)
+        data = cached_view(view, version)
+        if data is None:
+            with st.spinner(f"Fetching data for {ticker}..."):
+                data, error = fetch_stock_data(ticker, period, interval)
+            if error:
+                st.error(f"❌ {error}")
+                return
+            if data is None or data.empty:
+                st.warning("No data available for the selected ticker and period.")
+                return
+            data = store_view(view, version, process_data(data, ticker, interval))
+        render_ticker(data, ticker)
+    st.caption(f"Last Updated: {datetime.now().strftime('%H:%M:%S')}")
+
+def main():
     if auto_refresh:
-        time.sleep(30)
-        st.rerun()
+        # Only this fragment reruns on the timer; it reads the shared buffers the refresher keeps
+        # up to date instead of sleeping on a script thread and rerunning the whole page
+        st.fragment(run_every=REFRESH_SECONDS)(render_live)()
+    else:
+        render_live()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,19 @@
+import pandas as pd
+import pytest
+
+from artifacts import MISSING_TS, compact_dtypes
+
+EPOCH = int(pd.Timestamp("2025-01-02 14:30:00", tz="UTC").timestamp())
+
+
+@pytest.mark.parametrize("dtype", [object, "string"])
+def test_compact_dtypes_strips_utc_suffix(dtype):
+    df = pd.DataFrame({"Datetime": pd.Series(["2025-01-02 14:30:00 UTC", "garbage"], dtype=dtype)})
+    out = compact_dtypes(df)
+    assert out["Datetime"].dtype == "int64"
+    assert out["Datetime"].tolist() == [EPOCH, MISSING_TS]
+
+
+def test_compact_dtypes_keeps_datetimes():
+    df = pd.DataFrame({"Datetime": pd.to_datetime(["2025-01-02 14:30:00"], utc=True)})
+    assert compact_dtypes(df)["Datetime"].tolist() == [EPOCH]
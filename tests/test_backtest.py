@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from backtest import evaluate_shard, rolling_mean_std, run_sweep
+
+
+def _panel(rows, symbols=("X", "Y"), seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2024-01-01", periods=rows)
+    close = pd.DataFrame(100 + rng.normal(0, 1, (rows, len(symbols))).cumsum(axis=0), index=index, columns=list(symbols))
+    open_ = close.shift(1).fillna(close.iloc[0]) + rng.normal(0, 0.2, close.shape)
+    return {"Open": open_, "Close": close}
+
+
+def test_rolling_mean_std_matches_pandas():
+    values = _panel(300)["Close"].to_numpy(copy=True)
+    values[50, 0] = np.nan
+    mean, std = rolling_mean_std(values, 20)
+    expected = pd.DataFrame(values).rolling(20)
+    np.testing.assert_allclose(mean, expected.mean().to_numpy(), equal_nan=True, rtol=1e-9)
+    np.testing.assert_allclose(std, expected.std().to_numpy(), equal_nan=True, rtol=1e-7)
+
+
+def test_rolling_mean_std_window_longer_than_series():
+    values = np.arange(30, dtype="float64").reshape(15, 2)
+    mean, std = rolling_mean_std(values, 200)
+    assert mean.shape == std.shape == values.shape
+    assert np.isnan(mean).all() and np.isnan(std).all()
+
+
+def test_short_panel_does_not_crash():
+    panel = _panel(150, symbols=("X",))
+    out = evaluate_shard(["X"], panel["Open"].to_numpy(), panel["Close"].to_numpy(), [(9, 200)], [(20, 2.0)], [1])
+    ma = out[out["hypothesis"].str.startswith("ma")]
+    assert (ma["signals"] == 0).all()
+    assert (out[out["hypothesis"] == "bb_above"]["signals"] >= 0).all()
+
+
+def test_run_sweep_short_panel_with_default_params():
+    results = run_sweep(_panel(120), max_workers=1)
+    assert set(results["Symbol"]) == {"X", "Y"}
+    assert len(results) > 0
@@ -0,0 +1,28 @@
+import threading
+
+import pandas as pd
+
+from bar_buffer import OHLCV, BarStore
+
+
+def _bars(start, n, close=100.0):
+    index = pd.date_range(start, periods=n, freq="1min", tz="UTC")
+    return pd.DataFrame({col: close for col in OHLCV}, index=index)
+
+
+def test_get_reads_under_the_key_lock():
+    store = BarStore(fetch=lambda ticker, interval, period=None, start=None: _bars("2025-01-02 14:30", 5))
+    assert len(store.get("AAPL", "1m", "1d", 1)) == 5
+
+    lock = store._key_lock(("AAPL", "1m"))
+    result = []
+    with lock:
+        # A reader must wait for an in-progress merge rather than copy a half-written buffer
+        reader = threading.Thread(target=lambda: result.append(store._frame(("AAPL", "1m"), 1)))
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive()
+        store.buffers[("AAPL", "1m")].merge(_bars("2025-01-02 14:34", 3, close=101.0))
+    reader.join(2)
+    assert len(result[0]) == 7
+    assert result[0]["Close"].iloc[-1] == 101.0
@@ -0,0 +1,33 @@
+import classification_cache
+from classification_cache import ENTRY_OVERHEAD, ClassificationCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+def test_normalized_copies_hit_and_other_prompts_miss(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ClassificationCache("m", "v2", path=path)
+    cache.put("Acme  beats estimates", ("positive", "earnings"))
+
+    assert cache.get_many([" acme beats\nestimates", "unrelated"]) == [("positive", "earnings"), None]
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert ClassificationCache("m", "v3", path=path).get("Acme beats estimates") is None
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(classification_cache, "time", Clock())
+    entry = ENTRY_OVERHEAD + len("neutral") + len("other")
+    cache = ClassificationCache("m", "v2", path=str(tmp_path / "cache.db"), max_bytes=3 * entry)
+    for summary in ("a", "b", "c"):
+        cache.put(summary, ("neutral", "other"))
+    cache.get("a")  # "b" is now the least recently used
+
+    cache.put("d", ("neutral", "other"))
+    assert cache.get_many(["a", "b", "c", "d"]) == [("neutral", "other"), None, ("neutral", "other"), ("neutral", "other")]
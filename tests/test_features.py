@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from features import compute_price_features, join_features
+
+
+def _daily():
+    days = pd.bdate_range("2025-01-02", periods=6)
+    return pd.DataFrame({
+        "Symbol": ["AAA"] * 6 + ["BBB"] * 6,
+        "Price Date": list(days) * 2,
+        "Open": [10.0] * 6 + [50.0] * 6,
+        "Close": [10.0, 11.0, 12.0, 13.0, 14.0, 15.0] + [50.0, 49.0, 48.0, 47.0, 46.0, 45.0],
+    })
+
+
+def test_features_are_computed_per_symbol_and_day():
+    features = compute_price_features(_daily().sample(frac=1, random_state=0))
+    aaa = features[features["Symbol"] == "AAA"].reset_index(drop=True)
+    bbb = features[features["Symbol"] == "BBB"].reset_index(drop=True)
+
+    assert aaa["Close_Return"].tolist() == pytest.approx([0, 10, 100 / 11, 100 / 12, 100 / 13, 100 / 14])
+    # Windows never reach into the previous symbol's days
+    assert bbb["Close_Return"][0] == 0
+    assert aaa["SMA_5"].tolist() == [0, 0, 0, 0, 12.0, 13.0]
+    assert (aaa["SMA_20"] == 0).all()
+
+
+def test_articles_on_the_same_day_share_its_features():
+    features = compute_price_features(_daily())
+    news = pd.DataFrame({
+        "Symbol": ["AAA", "AAA", "BBB"],
+        "Price Date": pd.to_datetime(["2025-01-09 00:00", "2025-01-09 15:30", "2025-01-02 00:00"], utc=True),
+    })
+    joined = join_features(news, features)
+    assert joined["SMA_5"].tolist() == [13.0, 13.0, 0.0]
+    assert joined["Intraday_Return"].tolist() == pytest.approx([50.0, 50.0, 0.0])
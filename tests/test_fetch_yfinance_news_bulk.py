@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+import requests
+
+import fetch_yfinance_news_bulk as bulk
+from news_store import NewsStore
+
+
+class FakeResponse:
+    def __init__(self, payload, status=200):
+        self.payload = payload
+        self.status_code = status
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.offsets = []
+
+    def get(self, url, params, timeout):
+        self.offsets.append(params["offset"])
+        page = self.pages(params["offset"])
+        return page if isinstance(page, FakeResponse) else FakeResponse({"news": page})
+
+
+def _items(first, n):
+    ts = int(datetime(2025, 6, 1, tzinfo=timezone.utc).timestamp())
+    return [{"providerPublishTime": ts - i * 60, "title": f"t{i}", "link": f"https://y/{i}"}
+            for i in range(first, first + n)]
+
+
+def test_short_pages_do_not_end_paging():
+    # Yahoo caps pages at 20 items although newsCount asks for 100
+    session = FakeSession(lambda offset: _items(offset, 20) if offset < 60 else [])
+    articles = bulk.fetch_ticker_news(session, "AAPL")
+    assert session.offsets == [0, 20, 40, 60]
+    assert len(articles) == 60
+
+
+def test_unretried_client_error_reports_one_attempt(capsys):
+    session = FakeSession(lambda offset: FakeResponse({}, status=404))
+    assert bulk.fetch_ticker_news(session, "AAPL") == []
+    assert session.offsets == [0]
+    assert "after 1 attempt(s)" in capsys.readouterr().out
+
+
+def test_saved_articles_are_upserted_with_their_publisher(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = NewsStore(str(tmp_path / "news.db"))
+    articles = bulk.fetch_ticker_news(FakeSession(lambda offset: _items(offset, 3) if offset == 0 else []), "AAPL")
+    for article in articles:
+        article["Provider"] = "Motley Fool"
+    assert bulk.save_ticker_news("AAPL", articles + articles[:1], store) == 3
+    assert [r["Source"] for r in store.iter_range("AAPL")] == ["Motley Fool"] * 3
+
+    # The same links under another ticker are linked, not stored twice
+    bulk.save_ticker_news("MSFT", articles, store)
+    assert store.count("MSFT") == 3
+    assert store.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] == 3
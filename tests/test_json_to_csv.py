@@ -0,0 +1,19 @@
+import csv
+
+from jsonToCsv import export_csv
+from jsonl_io import JsonlWriter
+
+
+def test_unlabelled_rows_are_not_exported(tmp_path):
+    source = str(tmp_path / "news.jsonl")
+    with JsonlWriter(source, resume=False) as writer:
+        for url, sentiment, event_type, key in [("a", "positive", "earnings", "m:v2"), ("b", None, None, None),
+                                                ("c", "neutral", "other", "m:v2+local")]:
+            writer.write({"Datetime": "2025-01-02 10:00:00 UTC", "Headline": "h", "Summary": "s", "URL": url,
+                          "Source": "test", "Sentiment": sentiment, "EventType": event_type, "LabelKey": key})
+
+    output = str(tmp_path / "news.csv")
+    assert export_csv(source, output) == (2, 1)
+    with open(output, encoding="utf-8", newline="") as f:
+        assert [(r["URL"], r["Sentiment"], r["LabelKey"]) for r in csv.DictReader(f)] == [
+            ("a", "positive", "m:v2"), ("c", "neutral", "m:v2+local")]
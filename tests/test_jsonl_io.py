@@ -0,0 +1,53 @@
+import pytest
+
+from jsonl_io import JsonlWriter, iter_json_array, iter_jsonl
+
+
+def test_resume_exposes_the_last_complete_record(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    with JsonlWriter(path, resume=False) as writer:
+        for i in range(3):
+            writer.write({"i": i, "text": "x" * 70000})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"i": 3, "text": "tor')
+
+    writer = JsonlWriter(path, resume=True)
+    assert writer.count == 3
+    assert writer.last["i"] == 2
+    writer.close()
+
+
+def test_resume_of_empty_file(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text("")
+    writer = JsonlWriter(str(path), resume=True)
+    assert writer.count == 0 and writer.last is None
+    writer.close()
+
+
+def test_redo_cuts_the_file_at_the_first_matching_record(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    with JsonlWriter(path, resume=False) as writer:
+        for i, label in enumerate(["a", "b", None, "c", None]):
+            writer.write({"i": i, "label": label})
+
+    writer = JsonlWriter(path, resume=True, redo=lambda record: record["label"] is None)
+    assert (writer.count, writer.dropped, writer.last["i"]) == (2, 3, 1)
+    writer.write({"i": 2, "label": "b2"})
+    writer.close()
+    assert [r["i"] for r in iter_jsonl(path)] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 12))
+def test_json_array_values_split_across_reads(tmp_path, chunk_size):
+    items = [1.5e3, -2, 10, {"a": [1, 2]}, "x,]", True, None, 0.25]
+    path = tmp_path / "items.json"
+    path.write_text(" [1.5e3, -2,10 ,{\"a\": [1, 2]}, \"x,]\", true, null, 25e-2]\n")
+    assert list(iter_json_array(str(path), chunk_size=chunk_size)) == items
+
+
+def test_json_array_rejects_truncated_files(tmp_path):
+    path = tmp_path / "items.json"
+    path.write_text("[1, 2")
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path), chunk_size=2))
@@ -0,0 +1,101 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("groq")
+
+import llmContext  # noqa: E402
+from classification_cache import ClassificationCache  # noqa: E402
+
+
+def _reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeModel:
+    """Answers batch prompts per summary text; `skip` summaries are left out of batch replies"""
+
+    def __init__(self, answers, skip=()):
+        self.answers = answers
+        self.skip = set(skip)
+        self.prompts = []
+
+    def __call__(self, prompt, tokens):
+        self.prompts.append(prompt)
+        if "ITEMS: " in prompt:
+            items = json.loads(prompt.split("ITEMS: ", 1)[1].rsplit("\nJSON:", 1)[0])
+            return _reply("```json\n" + json.dumps([
+                {"id": item["id"], **self.answers[item["summary"]]} for item in items
+                if item["summary"] not in self.skip and item["summary"] in self.answers
+            ]) + "\n```")
+        summary = prompt.split("SUMMARY: ", 1)[1].rsplit("\nJSON:", 1)[0]
+        return _reply(json.dumps(self.answers.get(summary, {"sentiment": "bullish"})))
+
+
+ANSWERS = {
+    "beat": {"sentiment": "positive", "event_type": "earnings"},
+    "sued": {"sentiment": "negative", "event_type": "legal"},
+    "ceo": {"sentiment": "neutral", "event_type": "management_change"},
+    "typo": {"sentiment": "positive", "event_type": "earnigns"},
+}
+
+
+def test_batch_reply_keeps_only_well_formed_items(monkeypatch):
+    monkeypatch.setattr(llmContext, "_complete", FakeModel(ANSWERS))
+    labels = llmContext.classify_batch([(0, "beat"), (1, "typo"), (2, "unknown")])
+    assert labels == {0: ("positive", "earnings")}
+
+
+def test_items_missing_from_a_batch_are_retried_one_at_a_time(monkeypatch):
+    model = FakeModel(ANSWERS, skip={"ceo"})
+    monkeypatch.setattr(llmContext, "_complete", model)
+    labels = llmContext.classify_many(["beat", "ceo", "sued", "unknown"], batch_size=2, max_in_flight=1)
+
+    assert labels == [("positive", "earnings"), ("neutral", "management_change"), ("negative", "legal"), None]
+    single = [p for p in model.prompts if "SUMMARY: " in p]
+    assert len(single) == 2  # "ceo" was skipped by its batch, "unknown" never answered usably
+
+
+
+def test_cache_serves_repeats_and_never_stores_unanswered_items(monkeypatch, tmp_path):
+    model = FakeModel(ANSWERS)
+    monkeypatch.setattr(llmContext, "_complete", model)
+    cache = ClassificationCache("m", "v2", path=str(tmp_path / "cache.db"))
+
+    first = llmContext.classify_many(["beat", "Beat ", "unknown"], cache=cache)
+    assert first == [("positive", "earnings"), ("positive", "earnings"), None]
+    calls = len(model.prompts)
+
+    assert llmContext.classify_many(["beat"], cache=cache) == [("positive", "earnings")]
+    assert len(model.prompts) == calls
+    assert cache.get("unknown") is None
+
+
+def test_keyed_classifier_tags_rows_by_the_classifier_that_answered(monkeypatch):
+    monkeypatch.setattr(llmContext, "_complete", FakeModel(ANSWERS))
+    classify = llmContext.keyed_classifier(llmContext.classify_many)
+    key = llmContext.label_key()
+    assert classify(["beat", "unknown"]) == [("positive", "earnings", key), None]
+
+
+class FakeLocalModel:
+    confidence_threshold = 0.7
+
+    def predict(self, texts):
+        return [("neutral", "other")] * len(texts), [0.9 if "confident" in t else 0.5 for t in texts]
+
+
+def test_only_rows_below_the_threshold_are_escalated(monkeypatch):
+    monkeypatch.setattr(llmContext, "_complete", FakeModel(ANSWERS))
+    counts = {}
+    classify = llmContext.keyed_classifier(llmContext.classify_many, FakeLocalModel(), counts)
+
+    labels = classify(["confident story", "beat"])
+    assert labels == [("neutral", "other", llmContext.label_key(local=True)),
+                      ("positive", "earnings", llmContext.label_key())]
+    assert counts == {"rows": 2, "escalated": 1}
+
+    from local_classifier import classify_with_escalation
+    assert classify_with_escalation(["confident story", "beat"], FakeLocalModel(), lambda s: [None] * len(s),
+                                    threshold=0.95)[1] == [0, 1]
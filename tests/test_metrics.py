@@ -0,0 +1,51 @@
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def recording(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_disabled_calls_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+    metrics.reset()
+    metrics.inc("api_calls_total", provider="groq")
+    metrics.observe("api_call_seconds", 0.2, provider="groq")
+    with metrics.timer("stage_seconds", stage="x") as t:
+        pass
+    assert t is metrics._NULL_TIMER
+    assert metrics.snapshot() == {"counters": {}, "histograms": {}}
+
+
+def test_report_and_prometheus_export(recording):
+    metrics.inc("cache_lookups_total", 3, cache="classification", result="hit")
+    metrics.inc("cache_lookups_total", 1, cache="classification", result="miss")
+    for seconds in (0.004, 0.2, 0.3, 70.0):
+        metrics.observe("api_call_seconds", seconds, provider="groq")
+
+    report = metrics.report()
+    assert report["cache_hit_rate"] == {"classification": 0.75}
+    (hist,) = report["histograms"]
+    assert (hist["count"], hist["p50_le"], hist["p95_le"]) == (4, 0.25, 300.0)
+    assert hist["sum"] == pytest.approx(70.504)
+
+    text = metrics.prometheus_text()
+    assert "# TYPE api_call_seconds histogram" in text
+    assert 'api_call_seconds_bucket{provider="groq",le="0.005"} 1' in text
+    assert 'api_call_seconds_bucket{provider="groq",le="0.5"} 3' in text
+    assert 'api_call_seconds_bucket{provider="groq",le="+Inf"} 4' in text
+    assert 'cache_lookups_total{cache="classification",result="hit"} 3' in text
+
+
+def test_worker_snapshots_merge_into_the_parent(recording):
+    metrics.inc("rows_total", 2, stage="features")
+    snap = metrics.snapshot()
+    metrics.reset()
+    metrics.inc("rows_total", 1, stage="features")
+    metrics.merge(snap)
+    assert metrics.snapshot()["counters"] == {("rows_total", (("stage", "features"),)): 3}
@@ -0,0 +1,106 @@
+import sqlite3
+
+from news_store import NewsStore
+
+STORY = "Acme shares jump after the company reports record quarterly revenue and raises its full year guidance"
+
+
+def _article(i, summary=STORY):
+    return {"datetime": 1_700_000_000 + i * 60, "headline": "Acme beats estimates", "summary": summary,
+            "url": f"https://example.com/{i}", "source": "test"}
+
+
+def test_duplicates_cluster_when_indexed_on_read(tmp_path):
+    store = NewsStore(str(tmp_path / "news.db"))
+    store.upsert_articles("ACME", [_article(0), _article(1), _article(2, "Unrelated story about a bridge closure")])
+    assert store.conn.execute("SELECT COUNT(*) FROM article_minhash").fetchone()[0] == 0
+
+    clusters = store.cluster_ids(f"https://example.com/{i}" for i in range(3))
+    assert clusters["https://example.com/0"] == clusters["https://example.com/1"]
+    assert clusters["https://example.com/2"] != clusters["https://example.com/0"]
+    assert store.count_clusters("ACME") == 2
+
+    # Copies arriving later join the existing cluster
+    store.upsert_articles("ACME", [_article(3)])
+    assert store.cluster_ids(["https://example.com/3"])["https://example.com/3"] == clusters["https://example.com/0"]
+
+
+def test_cluster_labels_only_reuse_the_current_label_key(tmp_path):
+    store = NewsStore(str(tmp_path / "news.db"))
+    store.upsert_articles("ACME", [_article(0), _article(1)])
+    cluster_id = store.cluster_ids(["https://example.com/0"])["https://example.com/0"]
+    store.set_classifications([("https://example.com/0", "positive", "earnings")], "model-a:v1")
+
+    assert store.cluster_labels([cluster_id], ["model-a:v1"]) == {cluster_id: ("positive", "earnings", "model-a:v1")}
+    assert store.cluster_labels([cluster_id], ["model-a:v2"]) == {}
+
+
+def test_legacy_database_gains_label_key(tmp_path):
+    path = str(tmp_path / "news.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, datetime INTEGER NOT NULL, "
+                 "headline TEXT NOT NULL DEFAULT '', summary TEXT NOT NULL DEFAULT '', url TEXT NOT NULL UNIQUE, "
+                 "source TEXT NOT NULL DEFAULT '', sentiment TEXT, event_type TEXT)")
+    conn.execute("INSERT INTO articles (datetime, url, sentiment, event_type) VALUES (1700000000, 'u', 'neutral', 'other')")
+    conn.commit()
+    conn.close()
+
+    store = NewsStore(path)
+    assert store.conn.execute("SELECT label_key FROM articles WHERE url = 'u'").fetchone()[0] is None
+
+
+def test_iter_range_resumes_after_a_row_despite_earlier_inserts(tmp_path):
+    store = NewsStore(str(tmp_path / "news.db"))
+    store.upsert_articles("ACME", [_article(i, f"story {i}") for i in range(0, 10, 2)])
+    rows = list(store.iter_range("ACME", page_size=2))
+    assert [r["URL"] for r in rows] == [f"https://example.com/{i}" for i in range(0, 10, 2)]
+
+    # Backfilled rows land before the resume point and must not shift it
+    store.upsert_articles("ACME", [_article(1, "story 1"), _article(3, "story 3")])
+    last = rows[2]
+    resumed = list(store.iter_range("ACME", after=(last["Datetime"], last["URL"]), page_size=2))
+    assert [r["URL"] for r in resumed] == ["https://example.com/6", "https://example.com/8"]
+
+
+def test_iter_range_unlabelled_for_skips_rows_labelled_under_that_key(tmp_path):
+    store = NewsStore(str(tmp_path / "news.db"))
+    store.upsert_rows("ACME", [
+        {"Datetime": "2025-01-02 10:00:00 UTC", "URL": "legacy", "Summary": "a", "Sentiment": "positive", "EventType": "other"},
+        {"Datetime": "2025-01-02 11:00:00 UTC", "URL": "current", "Summary": "b"},
+        {"Datetime": "2025-01-02 12:00:00 UTC", "URL": "old-prompt", "Summary": "c"},
+        {"Datetime": "2025-01-02 13:00:00 UTC", "URL": "new", "Summary": "d"},
+    ])
+    store.set_classifications([("current", "negative", "legal")], "model-a:v2")
+    store.set_classifications([("old-prompt", "negative", "legal")], "model-a:v1")
+
+    pending = [r["URL"] for r in store.iter_range("ACME", unlabelled_for=["model-a:v2"])]
+    assert pending == ["legacy", "old-prompt", "new"]
+
+
+def test_rows_keep_the_key_of_the_classifier_that_labelled_them(tmp_path):
+    store = NewsStore(str(tmp_path / "news.db"))
+    store.upsert_articles("ACME", [_article(i, f"story {i}") for i in range(3)])
+    store.set_classifications([("https://example.com/0", "positive", "earnings", "model-a:v2"),
+                               ("https://example.com/1", "neutral", "other", "model-a:v2+local")])
+
+    keys = dict(store.conn.execute("SELECT url, label_key FROM articles WHERE label_key IS NOT NULL"))
+    assert keys == {"https://example.com/0": "model-a:v2", "https://example.com/1": "model-a:v2+local"}
+    # Without the local model its labels are redone; with it both count as done
+    assert [r["URL"] for r in store.iter_range("ACME", unlabelled_for=["model-a:v2"])] == [
+        "https://example.com/1", "https://example.com/2"]
+    assert [r["URL"] for r in store.iter_range("ACME", unlabelled_for=["model-a:v2", "model-a:v2+local"])] == [
+        "https://example.com/2"]
+
+
+def test_same_story_from_two_sources_shares_a_cluster(tmp_path):
+    store = NewsStore(str(tmp_path / "news.db"))
+    store.upsert_articles("ACME", [
+        {"datetime": "2025-01-02T10:00:00Z", "headline": "Acme beats estimates", "summary": STORY,
+         "url": "https://newsapi.example/acme", "source": "Reuters"},
+        {"datetime": 1_735_812_300, "headline": "Acme beats estimates", "summary": STORY,
+         "url": "https://serp.example/acme?utm=1", "source": "MarketWatch"},
+    ])
+    urls = ["https://newsapi.example/acme", "https://serp.example/acme?utm=1"]
+    clusters = store.cluster_ids(urls)
+    assert clusters[urls[0]] == clusters[urls[1]]
+    assert [r["Source"] for r in store.iter_range("ACME")] == ["Reuters", "MarketWatch"]
@@ -0,0 +1,33 @@
+import pipeline
+from news_store import NewsStore
+
+
+def _rows():
+    return [{"Datetime": f"2025-0{month}-0{day} 10:00:00 UTC", "URL": f"{month}-{day}", "Summary": f"story {month} {day}"}
+            for month in (1, 2) for day in (1, 2)]
+
+
+def test_classify_partition_reruns_when_its_unlabelled_rows_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "_label_keys", lambda: ["m:v2"])
+    config = dict(pipeline.CONFIG, db=str(tmp_path / "news.db"), start="2025-01-01", end="2025-03-01")
+    store = NewsStore(config["db"])
+    store.upsert_rows("ACME", _rows())
+    stage = pipeline.STAGES_BY_NAME["classify"]
+
+    keys, stale = stage.plan("ACME", {}, config)
+    assert stale == ["2025-01", "2025-02"]
+
+    # A run that left one January row unanswered: January is planned again, February is done
+    store.set_classifications([("1-1", "positive", "earnings"), ("2-1", "neutral", "other"),
+                               ("2-2", "neutral", "other")], "m:v2")
+    keys, stale = stage.plan("ACME", keys, config)
+    assert stale == ["2025-01", "2025-02"]
+    keys, stale = stage.plan("ACME", keys, config)
+    assert stale == []
+
+    store.set_classification("1-2", "negative", "legal", "m:v2")
+    assert stage.plan("ACME", keys, config)[1] == ["2025-01"]
+
+    # A new label key reopens every month
+    monkeypatch.setattr(pipeline, "_label_keys", lambda: ["m:v3"])
+    assert stage.plan("ACME", keys, config)[1] == ["2025-01", "2025-02"]
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import price_cache
+
+# 2024-03-13 is a Wednesday; New York is on EDT (UTC-4), so the session closes 20:00 UTC
+MIDDAY = datetime(2024, 3, 13, 18, 0, tzinfo=timezone.utc)
+AFTER_CLOSE = datetime(2024, 3, 13, 20, 45, tzinfo=timezone.utc)
+
+
+def _bars(closes):
+    index = pd.DatetimeIndex(list(closes), name="Date")
+    close = list(closes.values())
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": [100] * len(close)},
+                        index=index)
+
+
+class FakeProvider:
+    def __init__(self, closes):
+        self.closes = closes
+        self.calls = []
+
+    def __call__(self, symbol, since, api_key):
+        self.calls.append(since)
+        bars = _bars(self.closes)
+        return bars if since is None else bars[bars.index > pd.Timestamp(since)]
+
+
+def test_partial_bar_is_overwritten_after_the_close(tmp_path):
+    provider = FakeProvider({"2024-03-11": 10.0, "2024-03-12": 11.0, "2024-03-13": 12.0})
+    providers = [("fake", provider)]
+    assert price_cache.refresh("ABC", providers=providers, cache_dir=tmp_path, now=MIDDAY) == 1
+    _, _, settled = price_cache._load("ABC", tmp_path)
+    assert str(settled) == "2024-03-12"
+
+    # Still forming: not refetched again within PARTIAL_REFRESH
+    assert price_cache.refresh("ABC", providers=providers, cache_dir=tmp_path,
+                               now=MIDDAY + price_cache.PARTIAL_REFRESH / 2) == 0
+
+    provider.closes["2024-03-13"] = 12.5
+    assert price_cache.refresh("ABC", providers=providers, cache_dir=tmp_path, now=AFTER_CLOSE) == 1
+    assert str(provider.calls[-1]) == "2024-03-12"
+    bars = price_cache.load_bars("ABC", tmp_path)
+    assert bars["Close"].tolist() == [10.0, 11.0, 12.5]
+
+    # Final now: no more requests for the day
+    assert price_cache.refresh("ABC", providers=providers, cache_dir=tmp_path,
+                               now=AFTER_CLOSE + 4 * price_cache.PARTIAL_REFRESH) == 0
+
+
+def test_before_the_session_one_check_lasts_until_the_close(tmp_path):
+    provider = FakeProvider({"2024-03-11": 10.0, "2024-03-12": 11.0})
+    providers = [("fake", provider)]
+    morning = datetime(2024, 3, 13, 12, 0, tzinfo=timezone.utc)
+    assert price_cache.refresh("ABC", providers=providers, cache_dir=tmp_path, now=morning) == 1
+    assert price_cache.refresh("ABC", providers=providers, cache_dir=tmp_path, now=MIDDAY) == 0
+    assert price_cache.refresh("ABC", providers=providers, cache_dir=tmp_path, now=AFTER_CLOSE) == 1
+
+
+def test_legacy_cache_without_settled_is_refetched_in_full(tmp_path):
+    bars = _bars({"2024-03-11": 10.0, "2024-03-12": 11.0})
+    path = price_cache.cache_path("ABC", tmp_path)
+    np.savez_compressed(
+        path,
+        dates=bars.index.values.astype("datetime64[D]").astype("int32"),
+        open=bars["Open"].to_numpy(dtype="float32"), high=bars["High"].to_numpy(dtype="float32"),
+        low=bars["Low"].to_numpy(dtype="float32"), close=bars["Close"].to_numpy(dtype="float32"),
+        volume=bars["Volume"].to_numpy(dtype="int64"),
+        checked=np.array(np.datetime64("2024-03-12", "D").astype("int32")),
+    )
+    provider = FakeProvider({"2024-03-11": 10.0, "2024-03-12": 11.5})
+    assert price_cache.refresh("ABC", providers=[("fake", provider)], cache_dir=tmp_path, now=MIDDAY) == 1
+    assert provider.calls == [None]
+    assert price_cache.load_bars("ABC", tmp_path)["Close"].tolist() == [10.0, 11.5]
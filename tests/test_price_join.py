@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_join import asof_join
+
+
+@pytest.mark.parametrize("unit", ["ns", "s", "D"])
+def test_asof_join_with_coarse_index_resolution(unit):
+    dates = np.array(["2025-01-02", "2025-01-03", "2025-01-06"], dtype="datetime64[D]").astype(f"datetime64[{unit}]")
+    prices = pd.DataFrame({"Open": [1.0, 2.0, 3.0], "Close": [1.5, 2.5, 3.5]}, index=pd.DatetimeIndex(dates))
+    news = pd.DataFrame({"Datetime": ["2025-01-03 12:00:00 UTC", "2025-01-05 09:00:00 UTC", "2025-01-01 09:00:00 UTC"]})
+    out = asof_join(news, prices, policy="same_session", market_tz="UTC")
+    assert out["Close"].tolist()[:2] == [2.5, 2.5]
+    assert np.isnan(out["Close"].iloc[2])
+    assert list(out["Price Date"][:2]) == [pd.Timestamp("2025-01-03")] * 2
+
+
+def test_asof_join_previous_close_with_second_resolution():
+    index = pd.DatetimeIndex(np.array(["2025-01-02", "2025-01-03"], dtype="datetime64[s]"))
+    prices = pd.DataFrame({"Open": [1.0, 2.0], "Close": [1.5, 2.5]}, index=index)
+    # 20:00 UTC on Jan 3 is after the 16:00 New York close
+    news = pd.DataFrame({"Datetime": ["2025-01-03 15:00:00 UTC", "2025-01-03 22:00:00 UTC"]})
+    out = asof_join(news, prices, policy="previous_close")
+    assert out["Close"].tolist() == [1.5, 2.5]
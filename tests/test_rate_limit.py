@@ -0,0 +1,98 @@
+import requests
+
+import metrics
+from rate_limit import ProviderLimiter, call_with_retry
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _limiter():
+    return ProviderLimiter("test", rate=1000, capacity=1000)
+
+
+def _histogram_count(name):
+    return sum(sum(values[:-1]) for (hist_name, _), values in metrics.snapshot()["histograms"].items()
+               if hist_name == name)
+
+
+def test_untimed_call_leaves_the_histogram_to_the_callable(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", True)
+    metrics.reset()
+    attempts = []
+
+    def create():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("reset by peer")
+        with metrics.timer("api_call_seconds", provider="test"):
+            return "ok"
+
+    assert call_with_retry(_limiter(), create, base_delay=0, timed=False) == "ok"
+    assert len(attempts) == 2
+    assert _histogram_count("api_call_seconds") == 1
+    metrics.reset()
+
+
+def test_timed_call_records_each_attempt(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", True)
+    metrics.reset()
+    assert call_with_retry(_limiter(), lambda: "ok") == "ok"
+    assert _histogram_count("api_call_seconds") == 1
+    metrics.reset()
+
+
+def _failing(exc, calls):
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            raise exc
+        return "ok"
+    return fn
+
+
+def test_programming_errors_are_not_retried():
+    for exc in (TypeError("bad argument"), KeyError("missing")):
+        calls = []
+        try:
+            call_with_retry(_limiter(), _failing(exc, calls), base_delay=0)
+        except type(exc):
+            pass
+        else:
+            raise AssertionError(f"{exc!r} was swallowed")
+        assert calls == [1]
+
+
+def test_transient_and_server_errors_are_retried():
+    server_error = requests.HTTPError("502 Bad Gateway", response=FakeResponse(502))
+    for exc in (ConnectionError("reset"), TimeoutError("slow"), requests.ConnectionError("dns"), server_error):
+        calls = []
+        assert call_with_retry(_limiter(), _failing(exc, calls), base_delay=0) == "ok"
+        assert len(calls) == 2
+
+
+def test_client_errors_are_raised_at_once_unless_throttled():
+    calls = []
+    try:
+        call_with_retry(_limiter(), _failing(requests.HTTPError("404", response=FakeResponse(404)), calls), base_delay=0)
+    except requests.HTTPError:
+        pass
+    assert calls == [1]
+
+    calls = []
+    throttled = requests.HTTPError("429", response=FakeResponse(429, {"Retry-After": "0"}))
+    assert call_with_retry(_limiter(), _failing(throttled, calls), base_delay=0) == "ok"
+    assert len(calls) == 2
+
+
+def test_retry_on_adds_client_connection_errors():
+    class ClientConnectionError(Exception):
+        pass
+
+    calls = []
+    assert call_with_retry(_limiter(), _failing(ClientConnectionError(), calls), base_delay=0,
+                           retry_on=(ClientConnectionError,)) == "ok"
+    assert len(calls) == 2
@@ -0,0 +1,46 @@
+import refresher
+from refresher import BackgroundRefresher
+
+
+class FakeStore:
+    """refresh_many returns the next scripted bar count, or raises it if it is an exception"""
+
+    def __init__(self, written):
+        self.written = list(written)
+        self.calls = []
+
+    def refresh_many(self, tickers, interval, period, period_days, force=False):
+        self.calls.append((tuple(tickers), interval, force))
+        result = self.written.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_version_only_moves_when_bars_were_written():
+    store = FakeStore([3, 0, RuntimeError("rate limited"), 1])
+    bg = BackgroundRefresher(store)
+    key = bg.subscribe(["MSFT", "AAPL", "MSFT"], "5m", "1d", 1)
+    assert key == (("AAPL", "MSFT"), "5m") and bg.version(key) == 0
+
+    assert bg.refresh_once() == [key] and bg.version(key) == 1
+    assert bg.refresh_once() == [] and bg.version(key) == 1
+    assert bg.refresh_once() == [] and bg.version(key) == 1
+    assert bg.errors[key] == "rate limited"
+    assert bg.refresh_once() == [key] and bg.version(key) == 2
+    assert key not in bg.errors
+    assert store.calls == [(("AAPL", "MSFT"), "5m", True)] * 4
+
+
+def test_daily_panels_and_idle_subscriptions_are_not_refreshed(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(refresher.time, "monotonic", lambda: clock[0])
+    store = FakeStore([1])
+    bg = BackgroundRefresher(store, idle_timeout=60)
+    bg.subscribe(["AAPL"], "1d", "1y", 365)
+    minute = bg.subscribe(["AAPL"], "1m", "1d", 1)
+    assert bg.refresh_once() == [minute]
+
+    clock[0] += 61
+    assert bg.refresh_once() == []
+    assert bg.subscriptions == {} and len(store.calls) == 1
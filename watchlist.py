@@ -0,0 +1,68 @@
+# watchlist.py
+
+import numpy as np
+import pandas as pd
+
+SUMMARY_COLUMNS = ["Ticker", "Price", "Change %", "MA_9", "MA_20", "MA State", "Last Candle",
+                   "Above BB", "Below BB", "Last Bar"]
+
+
+def wide_panel(frames):
+    """{ticker: OHLCV frame} -> {field: wide DataFrame (time x ticker)} on the union of timestamps"""
+    frames = {t: f for t, f in frames.items() if f is not None and not f.empty}
+    if not frames:
+        return {}
+    stacked = pd.concat(frames, axis=1).sort_index()
+    return {field: stacked.xs(field, axis=1, level=1) for field in ["Open", "High", "Low", "Close", "Volume"]}
+
+
+def panel_indicators(panel, fast=9, slow=20, bb_k=2.0):
+    """MA_9, MA_20, Bollinger bands, candle sign and MA_Above for every ticker in one pass.
+
+    Same definitions as process_data (rolling windows with min_periods=1). A bar missing
+    for one ticker is a NaN that still occupies a window slot, so values can differ from
+    the per-ticker engine around gaps.
+    """
+    close, open_ = panel["Close"], panel["Open"]
+    slow_window = close.rolling(slow, min_periods=1)
+    ma_slow = slow_window.mean()
+    band = bb_k * slow_window.std()
+    ma_fast = close.rolling(fast, min_periods=1).mean()
+    return {
+        "MA_9": ma_fast,
+        "MA_20": ma_slow,
+        "BB_Upper": ma_slow + band,
+        "BB_Lower": ma_slow - band,
+        # +1 green, -1 red, 0 doji
+        "Candle": np.sign(close - open_),
+        "MA_Above": ma_fast > ma_slow,
+    }
+
+
+def summary_table(panel, indicators, zoom_npoints=50):
+    """One row per ticker: latest price and MA state plus Bollinger breaches in the last zoom_npoints bars"""
+    close = panel["Close"]
+    tail = close.tail(zoom_npoints)
+    above = (tail > indicators["BB_Upper"].tail(zoom_npoints)).sum()
+    below = (tail < indicators["BB_Lower"].tail(zoom_npoints)).sum()
+
+    def last_valid(frame):
+        # Latest non-NaN value per ticker, since tickers can stop printing at different bars
+        return frame.ffill().iloc[-1]
+
+    price = last_valid(close)
+    first = close.bfill().iloc[0]
+    candle = last_valid(close - panel["Open"])
+    ma_fast, ma_slow = last_valid(indicators["MA_9"]), last_valid(indicators["MA_20"])
+    return pd.DataFrame({
+        "Ticker": close.columns,
+        "Price": price.values,
+        "Change %": ((price / first - 1) * 100).values,
+        "MA_9": ma_fast.values,
+        "MA_20": ma_slow.values,
+        "MA State": np.where(ma_fast > ma_slow, "Above", "Below"),
+        "Last Candle": np.select([candle > 0, candle < 0], ["green", "red"], default="doji"),
+        "Above BB": above.values,
+        "Below BB": below.values,
+        "Last Bar": [close[t].last_valid_index() for t in close.columns],
+    }, columns=SUMMARY_COLUMNS)